@@ -1,15 +1,20 @@
 from functools import lru_cache
+from typing import Optional
+from fastapi import Request
 from ..services.template_service import TemplateService
 from ..services.spec_service import SpecService
 from ..services.auth_service import AuthService
 from ..services.agent_service import AgentService
 from ..cosmos_service import CosmosService
 from ..github_app import GitHubAppClient
+from ..services.llm_client import LLMClientPool, llm_clients
 from ..core.config import settings
 
 @lru_cache()
 def get_template_service() -> TemplateService:
-    return TemplateService()
+    service = TemplateService()
+    service.start_watching(settings.CATALOG_RELOAD_INTERVAL)
+    return service
 
 @lru_cache()
 def get_spec_service() -> SpecService:
@@ -32,3 +37,13 @@ def get_github_app_client() -> GitHubAppClient:
         return GitHubAppClient()
     except ValueError:
         return None
+
+async def get_llm_clients() -> LLMClientPool:
+    """Process-wide pool of Azure OpenAI clients"""
+    return llm_clients
+
+def cache_bypassed(request: Optional[Request]) -> bool:
+    """Honour ``Cache-Control: no-cache`` by regenerating instead of replaying cached LLM output."""
+    if request is None:
+        return False
+    return "no-cache" in request.headers.get("cache-control", "").lower()
@@ -19,7 +19,8 @@ async def assign_to_swe_agent(
     template_service: TemplateService = Depends(get_template_service)
 ):
     """Assign customization task to SWE agent"""
-    templates_data = template_service.get_all_templates()
+    template = template_service.get_template_by_id(template_id)
+    templates_data = [template] if template else []
     specs_data = []  # TODO: Get from spec service
     # Notify start if client provided a progress job id
     if x_progress_job:
@@ -39,7 +40,8 @@ async def resume_assignment_on_existing_repo(
     template_service: TemplateService = Depends(get_template_service)
 ):
     """Resume assignment flow assuming the repository already exists (manual fork path)."""
-    templates_data = template_service.get_all_templates()
+    template = template_service.get_template_by_id(template_id)
+    templates_data = [template] if template else []
     specs_data = []
     if x_progress_job:
         await broker.publish(x_progress_job, "start", {"template_id": template_id, "agent": request.agent_id, "resume": True})
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import Response
 import httpx
 import json
@@ -7,13 +7,14 @@ import os
 from typing import List, Dict, Any
 from ...models.schemas import DatasetSearchRequest, DatasetSearchResponse, NotebookGenerationRequest
 from ...core.config import settings
-from openai import OpenAI
+from ...api.dependencies import get_llm_clients
+from ...services.llm_client import LLMClientPool
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 @router.post("/search-datasets", response_model=DatasetSearchResponse)
-async def search_similar_datasets(request: DatasetSearchRequest):
+async def search_similar_datasets(request: DatasetSearchRequest, llm: LLMClientPool = Depends(get_llm_clients)):
     """Search for similar datasets on HuggingFace using Azure OpenAI for similarity matching"""
     
     try:
@@ -43,11 +44,7 @@ async def search_similar_datasets(request: DatasetSearchRequest):
         
         if request.query:
             try:
-                client = OpenAI(
-                    api_key=settings.AZURE_OPENAI_KEY,
-                    base_url=f"{settings.AZURE_OPENAI_ENDPOINT.rstrip('/')}/openai/v1/",
-                    default_query={"api-version": settings.API_VERSION}
-                )
+                client = llm.responses()
                 
                 dataset_descriptions = []
                 for dataset in datasets[:20]:
@@ -68,7 +65,7 @@ async def search_similar_datasets(request: DatasetSearchRequest):
                 
                 Return the 5 most relevant dataset IDs based on the query."""
                 
-                response = client.chat.completions.create(
+                response = await client.chat.completions.create(
                     model=settings.MODEL_NAME,
                     messages=[
                         {"role": "system", "content": system_prompt},
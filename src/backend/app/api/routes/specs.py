@@ -1,23 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi.responses import StreamingResponse
-from typing import List
+from typing import List, Optional
 import logging
 from ...models.schemas import (
-    Spec, SpecCreateRequest, CustomizationRequest, SWEAgentRequest, SpecAssignmentRequest,
+    Spec, SpecSummary, SpecCreateRequest, CustomizationRequest, SWEAgentRequest, SpecAssignmentRequest,
     SpecifyRequest, PlanRequest, TasksRequest, ConstitutionalValidationRequest,
     ConstitutionalValidationResponse, SpecKitInitRequest, SystemCheckResponse,
     ConstitutionPopulateRequest, ConstitutionPopulateResponse
 )
 from ...services.spec_service import SpecService
 from ...services.constitutional_service import ConstitutionalService
-from ...api.dependencies import get_spec_service
+from ...services.ndjson_scanner import NDJSONObjectScanner
+from ...services.llm_client import LLMClientPool
+from ...services.llm_cache import llm_cache
+from ...services.single_flight import llm_flights
+from ...services.llm_limiter import llm_priority, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from ...services.prompt_budget import prompt_budget
+from ...api.dependencies import cache_bypassed, get_spec_service, get_llm_clients
 from ...core.config import settings
-from openai import OpenAI
+from ..streaming import first_to_yield, stream_until_disconnect
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+
+def _spec_prompt_text(spec: Spec, override: Optional[str], *fields: str) -> str:
+    """Request override or the first non-empty spec field, fitted to SPEC_PROMPT_TOKENS."""
+    if override:
+        return prompt_budget.fit(override, settings.SPEC_PROMPT_TOKENS)
+    field = next((f for f in fields if getattr(spec, f, None)), fields[-1])
+    return prompt_budget.spec_field(spec, field, settings.SPEC_PROMPT_TOKENS)
+
+
 @router.get("/system-check")
 async def system_check():
     """System requirements check (web equivalent of specify check command)"""
@@ -50,15 +65,23 @@ async def system_check():
         messages=messages
     )
 
-@router.get("")
-async def get_specs(spec_service: SpecService = Depends(get_spec_service)):
-    """Get all specifications"""
-    return spec_service.get_all_specs()
+@router.get("", response_model=List[SpecSummary])
+async def get_specs(
+    response: Response,
+    limit: int = Query(settings.SPEC_LIST_PAGE_SIZE, ge=1, le=500),
+    continuation: Optional[str] = Query(None, description="X-Continuation-Token from the previous page"),
+    spec_service: SpecService = Depends(get_spec_service)
+):
+    """List specification summaries, newest first, one page at a time"""
+    summaries, next_token = await spec_service.list_spec_summaries(limit, continuation)
+    if next_token:
+        response.headers["X-Continuation-Token"] = next_token
+    return summaries
 
 @router.get("/{spec_id}")
 async def get_spec(spec_id: str, spec_service: SpecService = Depends(get_spec_service)):
     """Get a specific specification"""
-    spec = spec_service.get_spec_by_id(spec_id)
+    spec = await spec_service.get_spec_by_id(spec_id)
     if not spec:
         raise HTTPException(status_code=404, detail="Specification not found")
     return spec
@@ -66,23 +89,23 @@ async def get_spec(spec_id: str, spec_service: SpecService = Depends(get_spec_se
 @router.post("")
 async def create_spec(request: SpecCreateRequest, spec_service: SpecService = Depends(get_spec_service)):
     """Create a new specification"""
-    return spec_service.create_spec(request)
+    return await spec_service.create_spec(request)
 
 @router.put("/{spec_id}")
 async def update_spec(spec_id: str, request: SpecCreateRequest, spec_service: SpecService = Depends(get_spec_service)):
     """Update an existing specification"""
-    updated_spec = spec_service.update_spec(spec_id, request)
+    updated_spec = await spec_service.update_spec(spec_id, request)
     if not updated_spec:
         raise HTTPException(status_code=404, detail="Specification not found")
     return updated_spec
 
 @router.post("/{spec_id}/breakdown")
-async def generate_spec_task_breakdown(spec_id: str, request: CustomizationRequest, spec_service: SpecService = Depends(get_spec_service), http_request: Request = None):
+async def generate_spec_task_breakdown(spec_id: str, request: CustomizationRequest, spec_service: SpecService = Depends(get_spec_service), http_request: Request = None, llm: LLMClientPool = Depends(get_llm_clients)):
     """Generate task breakdown for a specification using Azure OpenAI"""
 
     try:
         logger.info(f"[breakdown] spec_id={spec_id} request={getattr(request, 'model_dump', lambda: request)() if hasattr(request,'model_dump') else str(request)[:256]}")
-        spec = spec_service.get_spec_by_id(spec_id)
+        spec = await spec_service.get_spec_by_id(spec_id)
         if not spec:
             raise HTTPException(status_code=404, detail="Specification not found")
 
@@ -96,15 +119,8 @@ async def generate_spec_task_breakdown(spec_id: str, request: CustomizationReque
         logger.info(f"[breakdown] Has API key: {bool(settings.AZURE_OPENAI_KEY)}")
         logger.info(f"[breakdown] API key length: {len(settings.AZURE_OPENAI_KEY) if settings.AZURE_OPENAI_KEY else 0}")
 
-        client = OpenAI(
-            api_key=settings.AZURE_OPENAI_KEY,
-            base_url=base_url,
-            default_query={"api-version": settings.API_VERSION},
-            timeout=120.0  # 2 minute timeout
-        )
+        client = llm.responses()
 
-        logger.info(f"[breakdown] OpenAI client created with base_url: {client.base_url}")
-        logger.info(f"[breakdown] OpenAI client default_query: {client._client.params.get('default_query', {})}")
 
         system_prompt = f"""You are a senior software project lead. Given a product spec/epic/PRD, produce a Work Breakdown Structure (WBS) tailored for a junior software engineer to execute.
 
@@ -126,7 +142,7 @@ Specification context:
 Title: {spec.title}
 Description: {spec.description}
 Tags: {', '.join(spec.tags)}
-Content (truncated):\n{(spec.content or '')[:8000]}
+Content:\n{prompt_budget.spec_field(spec, "content", settings.BREAKDOWN_CONTENT_TOKENS)}
 """
 
         user_prompt = f"""Generate the NDJSON task stream now based on the context above and these extra parameters:
@@ -156,94 +172,63 @@ Requirements:
             stream_flag = False
         logger.info(f"[breakdown] stream_flag={stream_flag}")
 
+        # Streaming and non-streaming calls share entries: both cache the task lines
+        cache_key = llm_cache.key("breakdown", settings.MODEL_NAME, system_prompt, user_prompt)
+        cache_scope = llm_cache.key("breakdown", settings.MODEL_NAME, system_prompt)
+        cached, prompt_vector = (None, None)
+        if not cache_bypassed(http_request):
+            cached, prompt_vector = await llm_cache.lookup(cache_key, cache_scope, user_prompt)
+
+        if stream_flag and cached is not None:
+            logger.info(f"[breakdown] replaying {len(cached)} cached tasks")
+
+            async def replay_stream():
+                yield "\n"
+                for line in cached:
+                    yield line + "\n"
+            return StreamingResponse(replay_stream(), media_type="text/plain")
+
+        if cached is not None:
+            import json
+            return {"tasks": [json.loads(line) for line in cached]}
+
         if stream_flag:
-            def token_stream():
-                logger.warning("[breakdown] starting streaming with Azure OpenAI Responses API")
-                logger.info(f"[breakdown] === MAKING API CALL ===")
-                logger.info(f"[breakdown] Model: {settings.MODEL_NAME}")
-                logger.info(f"[breakdown] Base URL: {client.base_url}")
-                logger.info(f"[breakdown] API Version in query: {client._client.params.get('default_query', {}).get('api-version')}")
-                logger.info(f"[breakdown] About to call client.responses.create...")
-                stream = client.responses.create(
-                    model=settings.MODEL_NAME,
-                    instructions=system_prompt,
-                    input=[
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "input_text", "text": user_prompt},
-                            ],
-                        }
-                    ],
-                    stream=True,
-                    max_output_tokens=8000
-                )
+            async def stream_attempt(model, leftovers, priority=PRIORITY_INTERACTIVE):
+                """One streaming generation; yields each task object as soon as it is complete."""
+                logger.info(f"[breakdown] streaming attempt with model={model} base_url={client.base_url}")
 
-                buf = ""
-                yielded = 0
+                produced = 0
                 events = 0
                 types_seen = set()
-                # Immediately send a heartbeat to improve TTFB for the client
-                try:
-                    yield "\n"
-                except Exception:
-                    pass
-
-                timeout_occurred = False
-
-                def extract_objects(s: str):
-                    out = []
-                    i = 0
-                    n = len(s)
-                    while i < n:
-                        # find start of object
-                        if s[i] != '{':
-                            i += 1
-                            continue
-                        depth = 0
-                        j = i
-                        in_str = False
-                        esc = False
-                        while j < n:
-                            ch = s[j]
-                            if in_str:
-                                if esc:
-                                    esc = False
-                                elif ch == '\\':
-                                    esc = True
-                                elif ch == '"':
-                                    in_str = False
-                            else:
-                                if ch == '"':
-                                    in_str = True
-                                elif ch == '{':
-                                    depth += 1
-                                elif ch == '}':
-                                    depth -= 1
-                                    if depth == 0:
-                                        out.append(s[i:j+1])
-                                        # skip trailing comma/newlines/spaces
-                                        k = j+1
-                                        while k < n and s[k] in ' \n\r\t,]':
-                                            k += 1
-                                        return out, s[k:]
-                            j += 1
-                        # incomplete object
-                        break
-                    return out, s
+                scanner = NDJSONObjectScanner()
+                received_delta = False
 
                 # stream loop for Azure OpenAI Responses API
                 import time
                 start_time = time.time()
                 max_wait_time = 120  # 2 minutes max
 
+                stream = None
                 try:
-                    for event in stream:
+                    with llm_priority(priority):
+                        stream = await client.responses.create(
+                            model=model,
+                            instructions=system_prompt,
+                            input=[
+                                {
+                                    "role": "user",
+                                    "content": [
+                                        {"type": "input_text", "text": user_prompt},
+                                    ],
+                                }
+                            ],
+                            stream=True,
+                            max_output_tokens=8000
+                        )
+                    async for event in stream:
                         # Check for timeout
                         if time.time() - start_time > max_wait_time:
-                            logger.warning(f"[breakdown] streaming timeout after {max_wait_time}s")
-                            timeout_occurred = True
-                            break
+                            raise TimeoutError(f"streaming timeout after {max_wait_time}s")
 
                         et = getattr(event, "type", None) or event.get("type")
                         events += 1
@@ -254,15 +239,10 @@ Requirements:
                                 pass
 
                         if et == "response.output_text.delta":
-                            buf += (getattr(event, "delta", None) or event.get("delta", ""))
-                            while True:
-                                objs, buf2 = extract_objects(buf)
-                                if not objs:
-                                    break
-                                buf = buf2
-                                for obj in objs:
-                                    yield obj + "\n"
-                                    yielded += 1
+                            received_delta = True
+                            for obj in scanner.feed(getattr(event, "delta", None) or event.get("delta", "")):
+                                yield obj
+                                produced += 1
                         elif et == "response.completed":
                             # try full output_text from final event
                             try:
@@ -284,49 +264,82 @@ Requirements:
                                                 full_text = ''.join(pieces)
                                         except Exception:
                                             pass
-                                if full_text:
-                                    buf += full_text
+                                # The final text repeats every delta; only use it if none arrived
+                                if full_text and not received_delta:
+                                    for obj in scanner.feed(full_text):
+                                        yield obj
+                                        produced += 1
                             except Exception:
                                 pass
-                            logger.warning(f"[breakdown] stream completed, events={events}, types_seen={list(types_seen)}, yielded={yielded}")
+                            logger.warning(f"[breakdown] stream completed, model={model}, events={events}, types_seen={list(types_seen)}, yielded={produced}")
                             break
+                finally:
+                    # Also runs on client disconnect or a lost hedge: release the upstream connection
+                    if stream is not None:
+                        await stream.close()
+
+                leftover = scanner.remainder().strip()
+                if leftover and produced == 0:
+                    leftovers.append(leftover)
+
+            async def token_stream():
+                # Immediately send a heartbeat to improve TTFB for the client
+                yield "\n"
+
+                logger.warning("[breakdown] starting streaming with Azure OpenAI Responses API")
+
+                yielded = 0
+                timeout_occurred = False
+                emitted = []
+                leftovers = []
+
+                # Past the time-to-first-object deadline a hedged request races the
+                # first one (optionally on a secondary deployment); the first to
+                # produce a task wins and the other is cancelled. The hedge is extra
+                # load, so it queues behind other users' first attempts
+                attempts = [lambda: stream_attempt(settings.MODEL_NAME, leftovers)]
+                if settings.BREAKDOWN_HEDGE_AFTER > 0:
+                    attempts.append(lambda: stream_attempt(
+                        settings.BREAKDOWN_HEDGE_MODEL or settings.MODEL_NAME, leftovers, PRIORITY_BACKGROUND
+                    ))
+                try:
+                    async for obj in first_to_yield(attempts, settings.BREAKDOWN_HEDGE_AFTER):
+                        emitted.append(obj)
+                        yield obj + "\n"
+                        yielded += 1
                 except Exception as stream_error:
                     logger.error(f"[breakdown] streaming error: {stream_error}")
                     timeout_occurred = True
 
-                # flush remaining
-                while True:
-                    objs, buf2 = extract_objects(buf)
-                    if not objs:
-                        break
-                    buf = buf2
-                    for obj in objs:
-                        yield obj + "\n"
-                        yielded += 1
+                # Only a clean, complete generation is worth replaying later
+                complete = yielded > 0 and not timeout_occurred
 
-                if buf.strip() and yielded == 0:
+                if leftovers and yielded == 0:
                     # last resort, emit leftover line so client gets something
-                    yield buf.strip() + "\n"
+                    yield leftovers[0] + "\n"
                     yielded += 1
 
-                logger.warning(f"[breakdown] stream completed, events={events}, yielded={yielded}, timeout={timeout_occurred}")
+                logger.warning(f"[breakdown] stream completed, yielded={yielded}, timeout={timeout_occurred}")
                 if yielded == 0 or timeout_occurred:
                     logger.warning("[breakdown] streaming produced 0 lines; falling back to non-stream request")
+                    emitted = []
                     try:
                         logger.info("[breakdown] making fallback non-streaming responses call")
-                        resp2 = client.responses.create(
-                            model=settings.MODEL_NAME,
-                            instructions=system_prompt,
-                            input=[
-                                {
-                                    "role": "user",
-                                    "content": [
-                                        {"type": "input_text", "text": user_prompt},
-                                    ],
-                                }
-                            ],
-                            max_output_tokens=8000
-                        )
+                        # Queue behind first attempts so fallbacks don't add to a 429 burst
+                        with llm_priority(PRIORITY_BACKGROUND):
+                            resp2 = await client.responses.create(
+                                model=settings.MODEL_NAME,
+                                instructions=system_prompt,
+                                input=[
+                                    {
+                                        "role": "user",
+                                        "content": [
+                                            {"type": "input_text", "text": user_prompt},
+                                        ],
+                                    }
+                                ],
+                                max_output_tokens=8000
+                            )
                         text = getattr(resp2, 'output_text', None)
                         if not text:
                             pieces = []
@@ -346,10 +359,13 @@ Requirements:
                                 if isinstance(arr, list):
                                     for obj in arr:
                                         try:
-                                            yield _json.dumps(obj) + "\n"
-                                            yielded += 1
+                                            line = _json.dumps(obj)
                                         except Exception:
                                             continue
+                                        emitted.append(line)
+                                        yield line + "\n"
+                                        yielded += 1
+                                    complete = bool(emitted)
                             except Exception:
                                 # maybe NDJSON already
                                 for line in (text.splitlines() if text else []):
@@ -360,17 +376,23 @@ Requirements:
                                     yielded += 1
                     except Exception as fe:
                         logger.error(f"[breakdown] fallback non-stream failed: {fe}")
-            return StreamingResponse(token_stream(), media_type="text/plain")
+
+                if complete:
+                    llm_cache.put(cache_key, emitted, cache_scope, prompt_vector)
+            # Identical concurrent breakdowns subscribe to one upstream generation
+            return StreamingResponse(
+                stream_until_disconnect(http_request, llm_flights.stream(cache_key, token_stream)),
+                media_type="text/plain",
+            )
 
         logger.info("[breakdown] making non-streaming responses call")
         logger.info(f"[breakdown] === MAKING NON-STREAMING API CALL ===")
         logger.info(f"[breakdown] Model: {settings.MODEL_NAME}")
         logger.info(f"[breakdown] Base URL: {client.base_url}")
-        logger.info(f"[breakdown] API Version in query: {client._client.params.get('default_query', {}).get('api-version')}")
         logger.info(f"[breakdown] About to call client.responses.create...")
 
         try:
-            response = client.responses.create(
+            response = await llm_flights.do(cache_key, lambda: client.responses.create(
                 model=settings.MODEL_NAME,
                 instructions=system_prompt,
                 input=[
@@ -382,7 +404,7 @@ Requirements:
                     }
                 ],
                 max_output_tokens=8000
-            )
+            ))
             logger.info(f"[breakdown] API call successful, response type: {type(response)}")
         except Exception as api_error:
             logger.error(f"[breakdown] API call failed: {api_error}")
@@ -417,6 +439,8 @@ Requirements:
                 tasks = tasks["tasks"]
             elif isinstance(tasks, str):
                 tasks = json.loads(tasks)
+            if isinstance(tasks, list) and tasks:
+                llm_cache.put(cache_key, [json.dumps(t) for t in tasks], cache_scope, prompt_vector)
             return {"tasks": tasks}
         except Exception:
             # Try NDJSON fallback
@@ -430,6 +454,7 @@ Requirements:
                 except Exception:
                     continue
             if tasks:
+                llm_cache.put(cache_key, [json.dumps(t) for t in tasks], cache_scope, prompt_vector)
                 return {"tasks": tasks}
             return {
                 "tasks": [
@@ -486,11 +511,11 @@ Requirements:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/{spec_id}/enhance")
-async def enhance_spec(spec_id: str, request: Request, spec_service: SpecService = Depends(get_spec_service)):
+async def enhance_spec(spec_id: str, request: Request, spec_service: SpecService = Depends(get_spec_service), llm: LLMClientPool = Depends(get_llm_clients)):
     """Enhance specification content to be tailored for coding agents using Azure OpenAI"""
 
     try:
-        spec = spec_service.get_spec_by_id(spec_id)
+        spec = await spec_service.get_spec_by_id(spec_id)
         if not spec:
             raise HTTPException(status_code=404, detail="Specification not found")
 
@@ -504,15 +529,8 @@ async def enhance_spec(spec_id: str, request: Request, spec_service: SpecService
         logger.info(f"[enhance] Has API key: {bool(settings.AZURE_OPENAI_KEY)}")
         logger.info(f"[enhance] API key length: {len(settings.AZURE_OPENAI_KEY) if settings.AZURE_OPENAI_KEY else 0}")
 
-        client = OpenAI(
-            api_key=settings.AZURE_OPENAI_KEY,
-            base_url=base_url,
-            default_query={"api-version": settings.API_VERSION},
-            timeout=120.0  # 2 minute timeout
-        )
+        client = llm.responses()
 
-        logger.info(f"[enhance] OpenAI client created with base_url: {client.base_url}")
-        logger.info(f"[enhance] OpenAI client default_query: {client._client.params.get('default_query', {})}")
 
         system_prompt = """You are an AI assistant that transforms user requirements into a detailed feature specification following the spec-kit methodology. Your task is to take functional requirements and create a comprehensive specification that focuses on WHAT users need and WHY, not HOW to implement it.
 
@@ -621,7 +639,7 @@ IMPORTANT: Do not end your response with questions or offers to help further. Pr
 
 **Project Title**: {spec.title}
 **Project Description**: {spec.description}
-**User Requirements**: {spec.content}
+**User Requirements**: {_spec_prompt_text(spec, None, "content")}
 
 Create a complete specification that:
 1. Focuses on WHAT users need and WHY (not HOW to implement)
@@ -633,39 +651,49 @@ Create a complete specification that:
 
 Generate the complete specification in markdown format following the template structure. Do not end with questions or offers to help further - provide a complete specification ready for the planning phase."""
 
+        # Concurrent enhancements of the same spec share one generation; the id is part
+        # of the key because the shared call also saves the result to that spec
+        flight_key = llm_cache.key("enhance", spec_id, settings.MODEL_NAME, system_prompt, user_prompt)
+
         # If streaming requested, stream token deltas as plain text
         stream_flag = request.query_params.get("stream") in {"1", "true", "True"}
         if stream_flag:
-            def token_stream():
+            async def token_stream():
                 full = []
+                completed = False
                 logger.info(f"[enhance] starting streaming responses call with model={settings.MODEL_NAME}")
-                stream = client.responses.create(
-                    model=settings.MODEL_NAME,
-                    instructions=system_prompt,
-                    input=[
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "input_text", "text": user_prompt},
-                            ],
-                        }
-                    ],
-                    stream=True,
-                    max_output_tokens=8000
-                )
+                with llm_priority(PRIORITY_INTERACTIVE):
+                    stream = await client.responses.create(
+                        model=settings.MODEL_NAME,
+                        instructions=system_prompt,
+                        input=[
+                            {
+                                "role": "user",
+                                "content": [
+                                    {"type": "input_text", "text": user_prompt},
+                                ],
+                            }
+                        ],
+                        stream=True,
+                        max_output_tokens=8000
+                    )
                 try:
-                    for event in stream:
+                    async for event in stream:
                         et = getattr(event, "type", None) or event.get("type")
                         if et == "response.output_text.delta":
                             delta = getattr(event, "delta", None) or event.get("delta", "")
                             full.append(delta)
                             yield delta
                         elif et == "response.completed":
+                            completed = True
                             break
                 finally:
+                    await stream.close()
+                # A disconnected client cancels the stream; don't save a truncated spec
+                if completed:
                     try:
                         enhanced_text = "".join(full)
-                        spec_service.update_spec(spec_id, SpecCreateRequest(
+                        await spec_service.update_spec(spec_id, SpecCreateRequest(
                             title=spec.title,
                             description=spec.description,
                             content=enhanced_text,
@@ -673,44 +701,50 @@ Generate the complete specification in markdown format following the template st
                         ))
                     except Exception as _:
                         logger.exception("Failed to persist enhanced spec after stream")
-            return StreamingResponse(token_stream(), media_type="text/plain")
+            return StreamingResponse(
+                stream_until_disconnect(request, llm_flights.stream(flight_key, token_stream)),
+                media_type="text/plain",
+            )
 
         # Otherwise do a single-shot non-streaming call
         logger.info(f"[enhance] making non-streaming responses call")
-        response = client.responses.create(
-            model=settings.MODEL_NAME,
-            instructions=system_prompt,
-            input=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "input_text", "text": user_prompt},
-                    ],
-                }
-            ],
-            max_output_tokens=8000
-        )
+        async def enhance_once():
+            response = await client.responses.create(
+                model=settings.MODEL_NAME,
+                instructions=system_prompt,
+                input=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "input_text", "text": user_prompt},
+                        ],
+                    }
+                ],
+                max_output_tokens=8000
+            )
 
-        enhanced_content = getattr(response, "output_text", None)
-        if not enhanced_content:
-            try:
-                parts = []
-                for item in getattr(response, "output", []) or []:
-                    for c in getattr(item, "content", []) or []:
-                        if getattr(c, "type", None) in ("text", "output_text"):
-                            parts.append(getattr(c, "text", ""))
-                enhanced_content = "".join(parts).strip()
-            except Exception:
-                enhanced_content = ""
+            enhanced_content = getattr(response, "output_text", None)
+            if not enhanced_content:
+                try:
+                    parts = []
+                    for item in getattr(response, "output", []) or []:
+                        for c in getattr(item, "content", []) or []:
+                            if getattr(c, "type", None) in ("text", "output_text"):
+                                parts.append(getattr(c, "text", ""))
+                    enhanced_content = "".join(parts).strip()
+                except Exception:
+                    enhanced_content = ""
 
-        logger.info(f"[enhance] received enhanced content length: {len(enhanced_content) if enhanced_content else 0} chars")
+            logger.info(f"[enhance] received enhanced content length: {len(enhanced_content) if enhanced_content else 0} chars")
 
-        enhanced_spec = spec_service.update_spec(spec_id, SpecCreateRequest(
-            title=spec.title,
-            description=spec.description,
-            content=enhanced_content,
-            tags=spec.tags
-        ))
+            return await spec_service.update_spec(spec_id, SpecCreateRequest(
+                title=spec.title,
+                description=spec.description,
+                content=enhanced_content,
+                tags=spec.tags
+            ))
+
+        enhanced_spec = await llm_flights.do(flight_key, enhance_once)
 
         return {"message": "Specification enhanced successfully", "spec": enhanced_spec}
 
@@ -719,21 +753,15 @@ Generate the complete specification in markdown format following the template st
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/{spec_id}/specify")
-async def specify_phase(spec_id: str, request: SpecifyRequest, spec_service: SpecService = Depends(get_spec_service)):
+async def specify_phase(spec_id: str, request: SpecifyRequest, spec_service: SpecService = Depends(get_spec_service), llm: LLMClientPool = Depends(get_llm_clients)):
     """Handle the /specify phase - Generate proper specification using spec template prompt"""
     try:
-        spec = spec_service.get_spec_by_id(spec_id)
+        spec = await spec_service.get_spec_by_id(spec_id)
         if not spec:
             raise HTTPException(status_code=404, detail="Specification not found")
 
         # Use Azure OpenAI to generate a proper specification using the spec template prompt
-        base_url = f"{settings.AZURE_OPENAI_ENDPOINT.rstrip('/')}/openai/v1/"
-        client = OpenAI(
-            api_key=settings.AZURE_OPENAI_KEY,
-            base_url=base_url,
-            default_query={"api-version": settings.API_VERSION},
-            timeout=120.0
-        )
+        client = llm.responses()
 
         # Spec template prompt for context
         spec_template_prompt = """# Feature Specification: [FEATURE NAME]
@@ -871,7 +899,7 @@ The specification should be ready for the planning phase."""
 
 Generate a complete specification following the template structure above. Focus on user scenarios, functional requirements, and acceptance criteria. Avoid implementation details."""
 
-        response = client.responses.create(
+        response = await client.responses.create(
             model=settings.MODEL_NAME,
             instructions=system_prompt,
             input=[
@@ -902,9 +930,8 @@ Generate a complete specification following the template structure above. Focus
         def slugify(text: str) -> str:
             return re.sub(r'[^a-zA-Z0-9-]', '-', text.lower()).strip('-')[:50]
 
-        # Generate feature number (simple incrementing)
-        all_specs = spec_service.get_all_specs()
-        feature_num = str(len([s for s in all_specs if s.feature_number]) + 1).zfill(3)
+        # Keep the number allocated at creation; allocate one for specs that predate it
+        feature_num = spec.feature_number or await spec_service.allocate_feature_number()
 
         # Create branch name from title
         branch_name = f"{feature_num}-{slugify(spec.title)}"
@@ -944,7 +971,7 @@ Generate a complete specification following the template structure above. Focus
         else:
             logger.info("No template_id provided in request")
 
-        updated_spec = spec_service.update_spec_phase(
+        updated_spec = await spec_service.update_spec_phase(
             spec_id,
             phase="specification",
             specification=generated_specification,
@@ -967,10 +994,10 @@ Generate a complete specification following the template structure above. Focus
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/{spec_id}/plan")
-async def plan_phase(spec_id: str, request: PlanRequest, spec_service: SpecService = Depends(get_spec_service)):
+async def plan_phase(spec_id: str, request: PlanRequest, spec_service: SpecService = Depends(get_spec_service), http_request: Request = None, llm: LLMClientPool = Depends(get_llm_clients)):
     """Handle the /plan phase - Create technical implementation plan"""
     try:
-        spec = spec_service.get_spec_by_id(spec_id)
+        spec = await spec_service.get_spec_by_id(spec_id)
         if not spec:
             raise HTTPException(status_code=404, detail="Specification not found")
 
@@ -978,20 +1005,14 @@ async def plan_phase(spec_id: str, request: PlanRequest, spec_service: SpecServi
             raise HTTPException(status_code=400, detail="Must complete specification phase first")
 
         # Use AI to generate technical plan based on specification and tech stack
-        base_url = f"{settings.AZURE_OPENAI_ENDPOINT.rstrip('/')}/openai/v1/"
-        client = OpenAI(
-            api_key=settings.AZURE_OPENAI_KEY,
-            base_url=base_url,
-            default_query={"api-version": settings.API_VERSION},
-            timeout=120.0
-        )
+        client = llm.responses()
 
         system_prompt = """You are a senior technical architect. Given a specification and technology requirements, create a comprehensive technical implementation plan.
 
 IMPORTANT: Do not end your response with questions or offers to help further. Provide a complete, detailed implementation plan without asking if the user would like additional assistance or if you can do anything else."""
 
         # Use specification from request if provided, otherwise from spec
-        specification_content = request.specification or spec.specification or spec.content
+        specification_content = _spec_prompt_text(spec, request.specification, "specification", "content")
         
         # Build constitution gates context
         gates_context = ""
@@ -1021,33 +1042,40 @@ Please provide:
 
 Format the response in markdown."""
 
-        response = client.responses.create(
-            model=settings.MODEL_NAME,
-            instructions=system_prompt,
-            input=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "input_text", "text": user_prompt},
-                    ],
-                }
-            ],
-            max_output_tokens=8000
-        )
+        cache_key = llm_cache.key("plan", settings.MODEL_NAME, system_prompt, user_prompt)
+        plan_content = None if cache_bypassed(http_request) else llm_cache.get(cache_key)
+        if plan_content is None:
+            response = await client.responses.create(
+                model=settings.MODEL_NAME,
+                instructions=system_prompt,
+                input=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "input_text", "text": user_prompt},
+                        ],
+                    }
+                ],
+                max_output_tokens=8000
+            )
 
-        plan_content = getattr(response, "output_text", None)
-        if not plan_content:
-            try:
-                parts = []
-                for item in getattr(response, "output", []) or []:
-                    for c in getattr(item, "content", []) or []:
-                        if getattr(c, "type", None) in ("text", "output_text"):
-                            parts.append(getattr(c, "text", ""))
-                plan_content = "".join(parts).strip()
-            except Exception:
+            plan_content = getattr(response, "output_text", None)
+            if not plan_content:
+                try:
+                    parts = []
+                    for item in getattr(response, "output", []) or []:
+                        for c in getattr(item, "content", []) or []:
+                            if getattr(c, "type", None) in ("text", "output_text"):
+                                parts.append(getattr(c, "text", ""))
+                    plan_content = "".join(parts).strip()
+                except Exception:
+                    plan_content = None
+            if plan_content:
+                llm_cache.put(cache_key, plan_content)
+            elif plan_content is None:
                 plan_content = "# Technical Implementation Plan\n\nPlan generation failed."
 
-        updated_spec = spec_service.update_spec_phase(
+        updated_spec = await spec_service.update_spec_phase(
             spec_id,
             phase="plan",
             plan=plan_content
@@ -1064,10 +1092,10 @@ Format the response in markdown."""
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/{spec_id}/tasks")
-async def tasks_phase(spec_id: str, request: TasksRequest, spec_service: SpecService = Depends(get_spec_service)):
+async def tasks_phase(spec_id: str, request: TasksRequest, spec_service: SpecService = Depends(get_spec_service), http_request: Request = None, llm: LLMClientPool = Depends(get_llm_clients)):
     """Handle the /tasks phase - Break down into actionable implementation tasks"""
     try:
-        spec = spec_service.get_spec_by_id(spec_id)
+        spec = await spec_service.get_spec_by_id(spec_id)
         if not spec:
             raise HTTPException(status_code=404, detail="Specification not found")
 
@@ -1075,8 +1103,8 @@ async def tasks_phase(spec_id: str, request: TasksRequest, spec_service: SpecSer
             raise HTTPException(status_code=400, detail="Must complete plan phase first")
 
         # Build comprehensive context from the request
-        specification_content = request.specification or spec.specification or spec.content
-        plan_content = request.plan or spec.plan
+        specification_content = _spec_prompt_text(spec, request.specification, "specification", "content")
+        plan_content = _spec_prompt_text(spec, request.plan, "plan")
         
         # Build constitution context
         constitution_context = ""
@@ -1142,13 +1170,7 @@ Plan: {plan_content}
         )
 
         # Reuse existing task breakdown logic
-        base_url = f"{settings.AZURE_OPENAI_ENDPOINT.rstrip('/')}/openai/v1/"
-        client = OpenAI(
-            api_key=settings.AZURE_OPENAI_KEY,
-            base_url=base_url,
-            default_query={"api-version": settings.API_VERSION},
-            timeout=120.0
-        )
+        client = llm.responses()
 
         system_prompt = f"""You are a senior software project lead following the spec-kit methodology. Given a comprehensive specification, technical plan, and constitutional requirements, produce actionable implementation tasks following the task template structure.
 
@@ -1226,32 +1248,35 @@ Requirements:
 CRITICAL: Return ONLY a valid JSON array. Do not include any markdown, explanations, or other text. Start with [ and end with ]. Example:
 [{{"id":"T001","title":"Setup project structure","description":"Create basic FastAPI project","acceptanceCriteria":["Project created","Dependencies installed"],"estimatedTime":"2-3 hours","priority":"high","status":"pending","phase":"setup","parallel":false,"filePath":"src/main.py"}}]"""
 
-        response = client.responses.create(
-            model=settings.MODEL_NAME,
-            instructions=system_prompt,
-            input=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "input_text", "text": user_prompt},
-                    ],
-                }
-            ],
-            max_output_tokens=8000
-        )
-
         import json
-        tasks_json = getattr(response, "output_text", None)
-        if not tasks_json:
-            try:
-                parts = []
-                for item in getattr(response, "output", []) or []:
-                    for c in getattr(item, "content", []) or []:
-                        if getattr(c, "type", None) in ("text", "output_text"):
-                            parts.append(getattr(c, "text", ""))
-                tasks_json = "".join(parts).strip()
-            except Exception:
-                tasks_json = ""
+        cache_key = llm_cache.key("tasks", settings.MODEL_NAME, system_prompt, user_prompt)
+        tasks_json = None if cache_bypassed(http_request) else llm_cache.get(cache_key)
+        if tasks_json is None:
+            response = await client.responses.create(
+                model=settings.MODEL_NAME,
+                instructions=system_prompt,
+                input=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "input_text", "text": user_prompt},
+                        ],
+                    }
+                ],
+                max_output_tokens=8000
+            )
+
+            tasks_json = getattr(response, "output_text", None)
+            if not tasks_json:
+                try:
+                    parts = []
+                    for item in getattr(response, "output", []) or []:
+                        for c in getattr(item, "content", []) or []:
+                            if getattr(c, "type", None) in ("text", "output_text"):
+                                parts.append(getattr(c, "text", ""))
+                    tasks_json = "".join(parts).strip()
+                except Exception:
+                    tasks_json = ""
 
         logger.info(f"[tasks] Raw AI response length: {len(tasks_json) if tasks_json else 0}")
         logger.info("[tasks] Raw AI response preview: " + (tasks_json[:500] if tasks_json else 'None') + "...")
@@ -1291,6 +1316,7 @@ CRITICAL: Return ONLY a valid JSON array. Do not include any markdown, explanati
                 logger.warning(f"[tasks] Only {len(tasks)} tasks generated, expected 15-25")
             
             logger.info(f"[tasks] Final tasks count: {len(tasks)}")
+            llm_cache.put(cache_key, tasks_json)
             
         except Exception as e:
             logger.error(f"[tasks] JSON parsing failed: {e}")
@@ -1333,7 +1359,7 @@ CRITICAL: Return ONLY a valid JSON array. Do not include any markdown, explanati
                 ]
                 logger.warning(f"[tasks] Using final fallback tasks: {len(tasks)} tasks")
 
-        updated_spec = spec_service.update_spec_phase(
+        updated_spec = await spec_service.update_spec_phase(
             spec_id,
             phase="tasks",
             tasks=tasks
@@ -1354,7 +1380,7 @@ CRITICAL: Return ONLY a valid JSON array. Do not include any markdown, explanati
 async def assign_spec_to_swe_agent(spec_id: str, request: SpecAssignmentRequest, spec_service: SpecService = Depends(get_spec_service)):
     """Assign specification implementation to SWE agent"""
     try:
-        spec = spec_service.get_spec_by_id(spec_id)
+        spec = await spec_service.get_spec_by_id(spec_id)
         if not spec:
             raise HTTPException(status_code=404, detail="Specification not found")
 
@@ -1591,7 +1617,7 @@ async def spec_kit_init(request: SpecKitInitRequest):
 @router.get("/{spec_id}/versions")
 async def get_spec_versions(spec_id: str, spec_service: SpecService = Depends(get_spec_service)):
     """Get version history for a specification"""
-    versions = spec_service.get_spec_versions(spec_id)
+    versions = await spec_service.get_spec_versions(spec_id)
     return {"spec_id": spec_id, "versions": versions}
 
 @router.get("/constitution")
@@ -1628,7 +1654,7 @@ async def update_constitution(request: dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/constitution/populate")
-async def populate_constitution(request: ConstitutionPopulateRequest):
+async def populate_constitution(request: ConstitutionPopulateRequest, http_request: Request = None, llm: LLMClientPool = Depends(get_llm_clients)):
     """Populate constitutional framework using AI based on project requirements"""
 
     try:
@@ -1645,12 +1671,7 @@ async def populate_constitution(request: ConstitutionPopulateRequest):
         logger.info(f"[populate_constitution] Full base_url: {base_url}")
         logger.info(f"[populate_constitution] Has API key: {bool(settings.AZURE_OPENAI_KEY)}")
 
-        client = OpenAI(
-            api_key=settings.AZURE_OPENAI_KEY,
-            base_url=base_url,
-            default_query={"api-version": settings.API_VERSION},
-            timeout=120.0
-        )
+        client = llm.responses()
 
         system_prompt = """You are an AI assistant that creates constitutional frameworks for software projects based on spec-kit methodology. Your task is to generate a comprehensive constitutional document that enforces architectural discipline and development practices."""
 
@@ -1793,31 +1814,36 @@ Instructions:
 Generate the complete constitutional framework in markdown format."""
 
         logger.info(f"[populate_constitution] making responses call")
-        response = client.responses.create(
-            model=settings.MODEL_NAME,
-            instructions=system_prompt,
-            input=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "input_text", "text": user_prompt},
-                    ],
-                }
-            ],
-            max_output_tokens=8000
-        )
+        cache_key = llm_cache.key("constitution", settings.MODEL_NAME, system_prompt, user_prompt)
+        constitution_content = None if cache_bypassed(http_request) else llm_cache.get(cache_key)
+        if constitution_content is None:
+            response = await client.responses.create(
+                model=settings.MODEL_NAME,
+                instructions=system_prompt,
+                input=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "input_text", "text": user_prompt},
+                        ],
+                    }
+                ],
+                max_output_tokens=8000
+            )
 
-        constitution_content = getattr(response, "output_text", None)
-        if not constitution_content:
-            try:
-                parts = []
-                for item in getattr(response, "output", []) or []:
-                    for c in getattr(item, "content", []) or []:
-                        if getattr(c, "type", None) in ("text", "output_text"):
-                            parts.append(getattr(c, "text", ""))
-                constitution_content = "".join(parts).strip()
-            except Exception:
-                constitution_content = ""
+            constitution_content = getattr(response, "output_text", None)
+            if not constitution_content:
+                try:
+                    parts = []
+                    for item in getattr(response, "output", []) or []:
+                        for c in getattr(item, "content", []) or []:
+                            if getattr(c, "type", None) in ("text", "output_text"):
+                                parts.append(getattr(c, "text", ""))
+                    constitution_content = "".join(parts).strip()
+                except Exception:
+                    constitution_content = ""
+            if constitution_content:
+                llm_cache.put(cache_key, constitution_content)
 
         logger.info(f"[populate_constitution] received constitution content length: {len(constitution_content) if constitution_content else 0} chars")
 
@@ -1,14 +1,18 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
 from typing import List, Optional
 from ...models.schemas import Template, FilterOptions, CustomizationRequest, TaskBreakdownResponse
 from ...services.template_service import TemplateService
-from ...api.dependencies import get_template_service
+from ...services.response_cache import response_cache, normalize_query
+from ...services.llm_client import LLMClientPool
+from ...services.llm_cache import llm_cache
+from ...api.dependencies import cache_bypassed, get_template_service, get_llm_clients
 from ...data.static_data import patterns_data
 
 router = APIRouter()
 
 @router.get("", response_model=List[Template])
 async def get_templates(
+    request: Request,
     search: Optional[str] = Query(None, description="Search templates by title or description"),
     task: Optional[str] = Query(None, description="Filter by task type"),
     language: Optional[str] = Query(None, description="Filter by programming language"),
@@ -16,15 +20,37 @@ async def get_templates(
     model: Optional[str] = Query(None, description="Filter by AI model"),
     database: Optional[str] = Query(None, description="Filter by database"),
     sort: Optional[str] = Query("Most Popular", description="Sort order"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Maximum number of templates to return; all matches when omitted"),
+    offset: int = Query(0, ge=0, description="Number of matching templates to skip"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor; overrides offset"),
     template_service: TemplateService = Depends(get_template_service)
 ):
-    filtered = template_service.filter_templates(search, task, language, collection, model, database, sort)
-    return [t.model_dump() for t in filtered]
+    def build():
+        page = template_service.page_templates(
+            search, task, language, collection, model, database, sort,
+            offset=offset, limit=limit, cursor=cursor
+        )
+        headers = {"X-Total-Count": str(page.total)}
+        if page.next_cursor:
+            headers["X-Next-Cursor"] = page.next_cursor
+        return [t.model_dump() for t in page.items], headers
+
+    key = ("templates", normalize_query(
+        search=search.casefold() if search else None, task=task, language=language,
+        collection=collection, model=model, database=database, sort=sort,
+        limit=limit, offset=offset, cursor=cursor,
+    ))
+    try:
+        return response_cache.respond(request, key, template_service.catalog_version, build)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/featured", response_model=List[Template])
-async def get_featured_templates(template_service: TemplateService = Depends(get_template_service)):
-    featured = template_service.get_featured_templates()
-    return [t.model_dump() for t in featured]
+async def get_featured_templates(request: Request, template_service: TemplateService = Depends(get_template_service)):
+    def build():
+        return [t.model_dump() for t in template_service.get_featured_templates()], None
+
+    return response_cache.respond(request, ("featured",), template_service.catalog_version, build)
 
 @router.get("/{template_id}", response_model=Template)
 async def get_template(template_id: str, template_service: TemplateService = Depends(get_template_service)):
@@ -34,10 +60,9 @@ async def get_template(template_id: str, template_service: TemplateService = Dep
     return t.model_dump()
 
 @router.post("/{template_id}/breakdown")
-async def generate_task_breakdown(template_id: str, request: CustomizationRequest):
+async def generate_task_breakdown(template_id: str, request: CustomizationRequest, http_request: Request = None, llm: LLMClientPool = Depends(get_llm_clients)):
     """Generate task breakdown using Azure OpenAI"""
     from ...core.config import settings
-    from openai import AzureOpenAI
     
     try:
         template_service = get_template_service()
@@ -50,11 +75,7 @@ async def generate_task_breakdown(template_id: str, request: CustomizationReques
                 raise HTTPException(status_code=404, detail="Template or pattern not found")
         
         try:
-            client = AzureOpenAI(
-                api_key=settings.AZURE_OPENAI_KEY,
-                api_version=settings.API_VERSION,
-                azure_endpoint=settings.AZURE_OPENAI_ENDPOINT
-            )
+            client = llm.azure()
             
             if template:
                 system_prompt = f"""You are an AI assistant that helps break down template customization tasks into actionable steps.
@@ -98,19 +119,22 @@ Return exactly 5 tasks in JSON format with this structure:
   }}
 ]"""
 
-            response = client.chat.completions.create(
-                model=settings.MODEL_NAME,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2000
-            )
+            cache_key = llm_cache.key("template-breakdown", settings.MODEL_NAME, system_prompt, user_prompt)
+            tasks_json = None if cache_bypassed(http_request) else llm_cache.get(cache_key)
+            if tasks_json is None:
+                response = await client.chat.completions.create(
+                    model=settings.MODEL_NAME,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=0.7,
+                    max_tokens=2000
+                )
+
+                tasks_json = response.choices[0].message.content.strip()
             
             import json
-            tasks_json = response.choices[0].message.content.strip()
-            
             if tasks_json.startswith("```json"):
                 tasks_json = tasks_json[7:-3].strip()
             elif tasks_json.startswith("```"):
@@ -118,6 +142,7 @@ Return exactly 5 tasks in JSON format with this structure:
             
             try:
                 tasks = json.loads(tasks_json)
+                llm_cache.put(cache_key, tasks_json)
                 return {"tasks": tasks}
             except json.JSONDecodeError:
                 if template:
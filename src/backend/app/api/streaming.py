@@ -0,0 +1,120 @@
+"""
+Helpers for streaming responses that proxy a model stream.
+"""
+from typing import AsyncGenerator, Callable, Dict, List, Optional
+import asyncio
+import logging
+
+from fastapi import Request
+
+logger = logging.getLogger(__name__)
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def stream_until_disconnect(request: Optional[Request], chunks: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
+    """
+    Relay ``chunks`` until the client goes away, then cancel the producer.
+
+    Starlette only notices a disconnect when the next write fails, which can
+    be a long time while the model is still thinking. Watching the receive
+    channel cancels the upstream request as soon as the client leaves.
+    """
+    if request is None:
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        while True:
+            next_chunk = asyncio.ensure_future(chunks.__anext__())
+            await asyncio.wait({next_chunk, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_chunk.done():
+                logger.info("Client disconnected; cancelling upstream stream")
+                next_chunk.cancel()
+                try:
+                    await next_chunk
+                except (asyncio.CancelledError, StopAsyncIteration):
+                    pass
+                return
+            try:
+                chunk = next_chunk.result()
+            except StopAsyncIteration:
+                return
+            yield chunk
+    finally:
+        disconnected.cancel()
+        await chunks.aclose()
+
+
+async def _discard(pending: Dict["asyncio.Future", AsyncGenerator[str, None]]) -> None:
+    for step, attempt in pending.items():
+        step.cancel()
+        try:
+            await step
+        except BaseException:
+            pass
+        await attempt.aclose()
+
+
+async def first_to_yield(
+    attempts: List[Callable[[], AsyncGenerator[str, None]]],
+    hedge_after: float,
+) -> AsyncGenerator[str, None]:
+    """
+    Hedge slow generations: start ``attempts[0]`` and, whenever no attempt
+    has produced its first chunk within ``hedge_after`` seconds (or the
+    running ones all failed), start the next. The first attempt to yield a
+    chunk wins and is relayed to the end; the others are cancelled. An
+    attempt that completes without output is an answer, not a failure, so
+    it does not start another attempt before the deadline.
+    """
+    pending: Dict["asyncio.Future", AsyncGenerator[str, None]] = {}
+    queued = list(attempts)
+    winner: Optional[AsyncGenerator[str, None]] = None
+    first_chunk = None
+    deadline_passed = False
+    empty = False
+    try:
+        while winner is None and (pending or (queued and not empty)):
+            if queued and (deadline_passed or not (pending or empty)):
+                attempt = queued.pop(0)()
+                pending[asyncio.ensure_future(attempt.__anext__())] = attempt
+                if len(pending) > 1:
+                    logger.info(f"No output after {hedge_after}s; hedging with attempt {len(attempts) - len(queued)}")
+            done, _ = await asyncio.wait(
+                pending,
+                timeout=hedge_after if queued and hedge_after > 0 else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            deadline_passed = not done
+            for step in done:
+                attempt = pending.pop(step)
+                try:
+                    first_chunk = step.result()
+                except StopAsyncIteration:
+                    empty = True
+                    continue
+                except Exception as e:
+                    logger.warning(f"Attempt failed before producing output: {e}")
+                    await attempt.aclose()
+                    continue
+                winner = attempt
+                break
+    finally:
+        await _discard(pending)
+
+    if winner is None:
+        return
+    try:
+        yield first_chunk
+        async for chunk in winner:
+            yield chunk
+    finally:
+        await winner.aclose()
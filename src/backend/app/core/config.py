@@ -18,11 +18,47 @@ class Settings:
     API_VERSION: str = os.getenv("API_VERSION", "preview")
     MODEL_NAME: str = os.getenv("MODEL_NAME", "gpt-5-nano")
     
+    LLM_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", "120"))
+    LLM_CONNECT_TIMEOUT: float = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "200"))
+    LLM_MAX_KEEPALIVE: int = int(os.getenv("LLM_MAX_KEEPALIVE", "50"))
+    LLM_KEEPALIVE_EXPIRY: float = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "120"))
+    LLM_HTTP2: bool = os.getenv("LLM_HTTP2", "true").lower() in ("1", "true", "yes")
+    
+    LLM_CACHE_TTL: float = float(os.getenv("LLM_CACHE_TTL", "3600"))
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "256"))
+    LLM_CACHE_SIMILARITY: float = float(os.getenv("LLM_CACHE_SIMILARITY", "0"))
+    LLM_EMBEDDING_MODEL: str = os.getenv("LLM_EMBEDDING_MODEL", "")
+    
+    LLM_CONCURRENCY_INITIAL: int = int(os.getenv("LLM_CONCURRENCY_INITIAL", "8"))
+    LLM_CONCURRENCY_MIN: int = int(os.getenv("LLM_CONCURRENCY_MIN", "1"))
+    LLM_CONCURRENCY_MAX: int = int(os.getenv("LLM_CONCURRENCY_MAX", "64"))
+    LLM_TOKEN_HEADROOM: int = int(os.getenv("LLM_TOKEN_HEADROOM", "4000"))
+    LLM_LIMITER_REDIS_URL: str = os.getenv("LLM_LIMITER_REDIS_URL", "")
+    LLM_LIMITER_REDIS_KEY: str = os.getenv("LLM_LIMITER_REDIS_KEY", "llm_limiter:leases")
+    
+    BREAKDOWN_HEDGE_AFTER: float = float(os.getenv("BREAKDOWN_HEDGE_AFTER", "0"))
+    BREAKDOWN_HEDGE_MODEL: str = os.getenv("BREAKDOWN_HEDGE_MODEL", "")
+    
+    SPEC_PROMPT_TOKENS: int = int(os.getenv("SPEC_PROMPT_TOKENS", "8000"))
+    BREAKDOWN_CONTENT_TOKENS: int = int(os.getenv("BREAKDOWN_CONTENT_TOKENS", "2000"))
+    
     DEVIN_API_BASE_URL: str = os.getenv("DEVIN_API_BASE_URL", "https://api.devin.ai")
     
     HF_API_TOKEN: str = os.getenv("HF_TOKEN", "")
     
+    CATALOG_RELOAD_INTERVAL: float = float(os.getenv("CATALOG_RELOAD_INTERVAL", "30"))
+    
     COSMOS_CONNECTION_STRING: str = os.getenv("COSMOS_CONNECTION_STRING", "")
     COSMOS_DATABASE_ID: str = os.getenv("COSMOS_DATABASE_ID", "aifoundry")
+    COSMOS_SUMMARY_CONTAINER_ID: str = os.getenv("COSMOS_SUMMARY_CONTAINER_ID", "spec_summaries")
+    SPEC_LIST_PAGE_SIZE: int = int(os.getenv("SPEC_LIST_PAGE_SIZE", "100"))
+    SPEC_CACHE_TTL: float = float(os.getenv("SPEC_CACHE_TTL", "300"))
+    SPEC_CACHE_MAX_ENTRIES: int = int(os.getenv("SPEC_CACHE_MAX_ENTRIES", "512"))
+    SPEC_CACHE_REDIS_URL: str = os.getenv("SPEC_CACHE_REDIS_URL", "")
+    SPEC_CHANGE_FEED_INTERVAL: float = float(os.getenv("SPEC_CHANGE_FEED_INTERVAL", "5"))
+    SPEC_HISTORY_SNAPSHOT_EVERY: int = int(os.getenv("SPEC_HISTORY_SNAPSHOT_EVERY", "10"))
+    FEATURE_NUMBER_BLOCK_SIZE: int = int(os.getenv("FEATURE_NUMBER_BLOCK_SIZE", "1"))
 
 settings = Settings()
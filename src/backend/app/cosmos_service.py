@@ -3,8 +3,9 @@ import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 from pydantic import BaseModel
-from azure.cosmos import CosmosClient, PartitionKey
+from azure.cosmos.aio import ContainerProxy
 from azure.cosmos.exceptions import CosmosResourceNotFoundError
+from .services.cosmos_client import connection_string_clients
 
 logger = logging.getLogger(__name__)
 
@@ -44,28 +45,14 @@ class CosmosService:
             return
         
         self.mock_mode = False
-        self.client = CosmosClient.from_connection_string(self.connection_string)
-        self.database_name = os.getenv("COSMOS_DATABASE_ID", "aifoundry")
         self.assignments_container_name = "agent_assignments"
         self.sessions_container_name = "user_sessions"
-        
-        self._ensure_database_and_containers()
     
-    def _ensure_database_and_containers(self):
+    async def _container(self, name: str) -> ContainerProxy:
+        # Pooled async client on COSMOS_CONNECTION_STRING, as before the move to
+        # azure.cosmos.aio; the container is created on first use and cached
         try:
-            database = self.client.create_database_if_not_exists(id=self.database_name)
-            
-            database.create_container_if_not_exists(
-                id=self.assignments_container_name,
-                partition_key=PartitionKey(path="/user_id")
-            )
-            
-            database.create_container_if_not_exists(
-                id=self.sessions_container_name,
-                partition_key=PartitionKey(path="/user_id")
-            )
-            
-            logger.info("Cosmos DB database and containers initialized successfully")
+            return await connection_string_clients.container(name, "/user_id")
         except Exception as e:
             logger.error(f"Failed to initialize Cosmos DB: {e}")
             raise
@@ -111,9 +98,8 @@ class CosmosService:
         )
         
         try:
-            database = self.client.get_database_client(self.database_name)
-            container = database.get_container_client(self.assignments_container_name)
-            container.create_item(body=assignment.model_dump())
+            container = await self._container(self.assignments_container_name)
+            await container.create_item(body=assignment.model_dump())
             
             await self._update_user_session(user_id, user_login, assignment_id)
             
@@ -171,11 +157,10 @@ class CosmosService:
             return
         
         try:
-            database = self.client.get_database_client(self.database_name)
-            container = database.get_container_client(self.sessions_container_name)
+            container = await self._container(self.sessions_container_name)
             
             try:
-                session_data = container.read_item(item=user_id, partition_key=user_id)
+                session_data = await container.read_item(item=user_id, partition_key=user_id)
                 session = UserSession(**session_data)
                 session.assignments.append(assignment_id)
                 session.updated_at = datetime.now().isoformat()
@@ -189,7 +174,7 @@ class CosmosService:
                     updated_at=datetime.now().isoformat()
                 )
             
-            container.upsert_item(body=session.model_dump())
+            await container.upsert_item(body=session.model_dump())
         except Exception as e:
             logger.error(f"Failed to update user session: {e}")
     
@@ -198,15 +183,14 @@ class CosmosService:
             return []
         
         try:
-            database = self.client.get_database_client(self.database_name)
-            container = database.get_container_client(self.assignments_container_name)
+            container = await self._container(self.assignments_container_name)
             
             query = "SELECT * FROM c WHERE c.user_id = @user_id ORDER BY c.created_at DESC"
-            items = list(container.query_items(
+            items = [item async for item in container.query_items(
                 query=query,
                 parameters=[{"name": "@user_id", "value": user_id}],
                 partition_key=user_id
-            ))
+            )]
             
             return [AgentAssignment(**item) for item in items]
         except Exception as e:
@@ -1,13 +1,20 @@
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from typing import Optional
+import asyncio
 import logging
 
 from .api.routes import auth, templates, specs, users, agents, progress, github, post_training
 from .data.static_data import learning_resources_data, patterns_data
-from .models.schemas import LearningResource
-from .api.dependencies import get_template_service
+from .models.schemas import LearningResource, FacetCounts
+from .api.dependencies import get_template_service, get_spec_service
 from .services.rate_limiter import check_azure_openai_rate_limit
+from .services.response_cache import response_cache, normalize_query, STATIC_DATA_VERSION
+from .services.llm_client import llm_clients
+from .services.cosmos_client import connection_string_clients, cosmos_clients, cosmos_endpoint
+from .core.config import settings
 
 # Configure logging
 logging.basicConfig(
@@ -27,7 +34,27 @@ logging.getLogger("openai").setLevel(logging.DEBUG)
 logger = logging.getLogger(__name__)
 logger.info("Starting AIFoundry.app API with enhanced logging")
 
-app = FastAPI(title="AIFoundry.app API", description="API for AI App Templates")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    background = []
+    if cosmos_endpoint():
+        spec_service = get_spec_service()
+        # Evict cached specs updated by other workers
+        background.append(asyncio.create_task(spec_service.follow_change_feed(settings.SPEC_CHANGE_FEED_INTERVAL)))
+        # Index specs whose summaries are missing or stale (e.g. written before the index existed)
+        background.append(asyncio.create_task(spec_service.reconcile_summaries()))
+    yield
+    for task in background:
+        task.cancel()
+    # Stop the catalog watcher thread, if the template service was ever created
+    if get_template_service.cache_info().currsize:
+        get_template_service().stop_watching()
+    # Close pooled Azure OpenAI and Cosmos DB connections
+    await llm_clients.aclose()
+    await cosmos_clients.aclose()
+    await connection_string_clients.aclose()
+
+app = FastAPI(title="AIFoundry.app API", description="API for AI App Templates", lifespan=lifespan)
 
 # Disable CORS. Do not remove this for full-stack development.
 app.add_middleware(
@@ -36,6 +63,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Continuation-Token", "X-Total-Count", "X-Next-Cursor"],
 )
 
 # Rate limiting middleware for Azure OpenAI endpoints
@@ -100,18 +128,60 @@ async def rate_limit_status(request: Request):
         "reset_time": "Rate limit resets every hour"
     }
 
+@app.get("/api/llm/metrics")
+async def llm_metrics():
+    """Azure OpenAI concurrency limiter, response cache and in-flight generation metrics"""
+    from .services.llm_limiter import llm_limiter
+    from .services.llm_cache import llm_cache
+    from .services.single_flight import llm_flights
+
+    return {
+        "limiter": llm_limiter.snapshot(),
+        "cache": {"hits": llm_cache.hits, "similar_hits": llm_cache.similar_hits, "misses": llm_cache.misses},
+        "generations": {"in_flight": llm_flights.in_flight, "coalesced": llm_flights.coalesced},
+    }
+
 @app.get("/api/learning-resources")
-async def get_learning_resources():
+async def get_learning_resources(request: Request):
     """Get learning resources"""
-    return [LearningResource(**resource) for resource in learning_resources_data]
+    def build():
+        return [LearningResource(**resource).model_dump() for resource in learning_resources_data], None
+
+    return response_cache.respond(request, ("learning-resources",), STATIC_DATA_VERSION, build)
 
 @app.get("/api/filters")
-async def get_filters():
+async def get_filters(request: Request):
     """Get filter options"""
     template_service = get_template_service()
-    return template_service.get_filter_options().model_dump()
+
+    def build():
+        return template_service.get_filter_options().model_dump(), None
+
+    return response_cache.respond(request, ("filters",), template_service.catalog_version, build)
+
+@app.get("/api/filters/counts", response_model=FacetCounts)
+async def get_filter_counts(
+    request: Request,
+    search: Optional[str] = Query(None),
+    task: Optional[str] = Query(None),
+    language: Optional[str] = Query(None),
+    collection: Optional[str] = Query(None),
+    model: Optional[str] = Query(None),
+    database: Optional[str] = Query(None),
+):
+    """Get per-option template counts for the current filter selection"""
+    template_service = get_template_service()
+
+    def build():
+        return template_service.get_facet_counts(search, task, language, collection, model, database).model_dump(), None
+
+    key = ("filter-counts", normalize_query(
+        search=search.casefold() if search else None, task=task, language=language,
+        collection=collection, model=model, database=database,
+    ))
+    return response_cache.respond(request, key, template_service.catalog_version, build)
 
 @app.get("/api/patterns")
-async def get_patterns():
+async def get_patterns(request: Request):
     """Get multi-agent patterns"""
-    return patterns_data
+    return response_cache.respond(request, ("patterns",), STATIC_DATA_VERSION, lambda: (patterns_data, None))
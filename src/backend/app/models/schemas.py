@@ -38,6 +38,11 @@ class Template(BaseModel):
     created_at: str
     planning: Optional[PlanningInfo] = None
 
+class TemplatePage(BaseModel):
+    items: List[Template]
+    total: int
+    next_cursor: Optional[str] = None
+
 class FilterOptions(BaseModel):
     tasks: List[str]
     languages: List[str]
@@ -46,6 +51,15 @@ class FilterOptions(BaseModel):
     databases: List[str]
     patterns: List[str]
 
+class FacetCounts(BaseModel):
+    total: int
+    tasks: Dict[str, int]
+    languages: Dict[str, int]
+    collections: Dict[str, int]
+    models: Dict[str, int]
+    databases: Dict[str, int]
+    patterns: Dict[str, int]
+
 class LearningResource(BaseModel):
     id: str
     title: str
@@ -125,6 +139,20 @@ class Spec(BaseModel):
     # Template planning data
     planning: Optional[PlanningInfo] = None
 
+class SpecSummary(BaseModel):
+    """Listing projection of a Spec: no content, plan or tasks."""
+    id: str
+    title: str
+    description: str
+    created_at: str
+    updated_at: str
+    tags: List[str]
+    phase: str = "specification"
+    branch_name: Optional[str] = None
+    feature_number: Optional[str] = None
+    version: int = 1
+    constitutional_compliance: Dict[str, Any] = {}
+
 class SpecCreateRequest(BaseModel):
     title: str
     description: str
@@ -10,9 +10,49 @@ from ..github_service import GitHubService
 from ..progress import broker
 from ..cosmos_service import CosmosService
 from ..core.config import settings
+from .prompt_budget import fit_fields
 
 logger = logging.getLogger(__name__)
 
+# Devin API rejects prompts over 30,000 characters; leave a buffer for safety
+DEVIN_PROMPT_LIMIT = 29000
+
+
+def _devin_prompt(title: str, item_type: str, customization: CustomizationRequest, fork_repo_url: str) -> str:
+    def build(scenario: str, additional: str) -> str:
+        return f"""
+You are Devin. Implement the following customization for the {title} {item_type}.
+
+Customer: {customization.company_name}
+Industry: {customization.industry}
+Use Case: {customization.use_case}
+Brand Theme: {customization.brand_theme}
+Primary Color: {customization.primary_color}
+
+Scenario:
+{scenario}
+
+Additional Requirements:
+{additional}
+
+Repository to work in (forked from template):
+{fork_repo_url}
+
+Tasks:
+- Review repository and agents.md for context.
+- Apply customizations and open a pull request.
+- Document changes in the PR description.
+""".strip()
+
+    prompt = build(customization.customer_scenario, customization.additional_requirements)
+    if len(prompt) > DEVIN_PROMPT_LIMIT:
+        # Shorten the free-text fields, not the tail: the repo URL and tasks must survive
+        logger.warning(f"[agent_service] Prompt is too long ({len(prompt)} chars), fitting free-text fields to the Devin API limit")
+        budget = DEVIN_PROMPT_LIMIT - len(build("", ""))
+        prompt = build(*fit_fields([customization.customer_scenario, customization.additional_requirements], budget, measure=len))
+    return prompt
+
+
 class AgentService:
     def __init__(self):
         self.cosmos_service = CosmosService()
@@ -409,36 +449,8 @@ class AgentService:
                 logger.warning(f"Failed to create agents.md: {file_result.get('error')}")
 
             fork_repo_url = f"https://github.com/{(request.customization.owner.strip() or user_login)}/{final_repo_name}"
-            prompt = f"""
-You are Devin. Implement the following customization for the {title} {item_type}.
-
-Customer: {request.customization.company_name}
-Industry: {request.customization.industry}
-Use Case: {request.customization.use_case}
-Brand Theme: {request.customization.brand_theme}
-Primary Color: {request.customization.primary_color}
-
-Scenario:
-{request.customization.customer_scenario}
-
-Additional Requirements:
-{request.customization.additional_requirements}
-
-Repository to work in (forked from template):
-{fork_repo_url}
-
-Tasks:
-- Review repository and agents.md for context.
-- Apply customizations and open a pull request.
-- Document changes in the PR description.
-""".strip()
-
-            # Validate prompt length (Devin API has a 30,000 character limit)
+            prompt = _devin_prompt(title, item_type, request.customization, fork_repo_url)
             logger.info(f"[agent_service] Prompt length: {len(prompt)} characters")
-            if len(prompt) > 29000:  # Leave buffer for safety
-                logger.warning(f"[agent_service] Prompt is too long ({len(prompt)} chars), truncating to fit Devin API limit...")
-                prompt = prompt[:28000] + "...\n\n[Content truncated due to Devin API length limits]"
-                logger.info(f"[agent_service] Truncated prompt length: {len(prompt)} characters")
 
             devin_payload = {"prompt": prompt, "idempotent": True}
             headers = {"Authorization": f"Bearer {request.api_key}", "Content-Type": "application/json"}
@@ -641,29 +653,7 @@ Tasks:
         # Start Devin session
         prompt_title = getattr(item, 'title', item.get('title', 'template') if isinstance(item, dict) else 'template')
         fork_repo_url = f"https://github.com/{owner}/{repo}"
-        prompt = f"""
-You are Devin. Implement the following customization for the {prompt_title} {item_type}.
-
-Customer: {request.customization.company_name}
-Industry: {request.customization.industry}
-Use Case: {request.customization.use_case}
-Brand Theme: {request.customization.brand_theme}
-Primary Color: {request.customization.primary_color}
-
-Scenario:
-{request.customization.customer_scenario}
-
-Additional Requirements:
-{request.customization.additional_requirements}
-
-Repository to work in (forked from template):
-{fork_repo_url}
-
-Tasks:
-- Review repository and agents.md for context.
-- Apply customizations and open a pull request.
-- Document changes in the PR description.
-""".strip()
+        prompt = _devin_prompt(prompt_title, item_type, request.customization, fork_repo_url)
 
         devin_payload = {"prompt": prompt, "idempotent": True}
         headers = {"Authorization": f"Bearer {request.api_key}", "Content-Type": "application/json"}
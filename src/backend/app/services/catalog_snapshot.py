@@ -0,0 +1,119 @@
+"""
+Immutable, fully indexed view of the template catalog.
+
+A snapshot is built completely before it is published, so a reader holding
+a reference always sees one consistent catalog and its indexes.
+"""
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from pathlib import Path
+import hashlib
+import json
+import logging
+
+from ..models.schemas import Template
+from .catalog_store import CatalogStore
+from .search_index import SearchIndex
+from .facet_index import FacetIndex
+
+logger = logging.getLogger(__name__)
+
+SORT_KEYS: Dict[str, Callable[[Template], object]] = {
+    "Most Popular": lambda t: t.star_count,
+    "Most Recent": lambda t: t.created_at or "",
+    "Most Forked": lambda t: t.fork_count,
+}
+
+# (mtime_ns, size) per source file, None when the file is missing
+SourceStamp = Tuple[Optional[Tuple[int, int]], ...]
+
+
+def source_stamp(*paths: Path) -> SourceStamp:
+    stamp = []
+    for path in paths:
+        try:
+            st = path.stat()
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def _read_bytes(path: Path) -> Optional[bytes]:
+    try:
+        return path.read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+class CatalogSnapshot:
+    __slots__ = (
+        "version", "stamp", "store", "by_id",
+        "search_index", "facet_index", "sort_orders", "sort_ranks",
+    )
+
+    def __init__(self, store: CatalogStore, version: str = "", stamp: SourceStamp = ()):
+        self.version = version
+        self.stamp = stamp
+        self.store = store
+        rows = list(store)
+        self.by_id: Dict[str, int] = {row.id: i for i, row in enumerate(rows)}
+        self.search_index = SearchIndex(rows)
+        self.facet_index = FacetIndex(rows)
+        self.sort_orders, self.sort_ranks = self._build_sort_orders(rows)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def template(self, ordinal: int) -> Template:
+        return self.store.materialize(ordinal)
+
+    def get(self, template_id: str) -> Optional[Template]:
+        ordinal = self.by_id.get(template_id)
+        return None if ordinal is None else self.store.materialize(ordinal)
+
+    @staticmethod
+    def _build_sort_orders(items: Sequence) -> Tuple[Dict[str, List[int]], Dict[str, List[int]]]:
+        natural = list(range(len(items)))
+        orders = {"": natural}
+        for name, key in SORT_KEYS.items():
+            orders[name] = sorted(natural, key=lambda i: key(items[i]), reverse=True)
+        ranks = {}
+        for name, order in orders.items():
+            rank = [0] * len(order)
+            for position, ordinal in enumerate(order):
+                rank[ordinal] = position
+            ranks[name] = rank
+        return orders, ranks
+
+    @classmethod
+    def load(cls, catalog_path: Path, featured_path: Path) -> "CatalogSnapshot":
+        """
+        Build a snapshot from catalog.json and featured.json. Raises on
+        unreadable JSON so a caller can keep serving its previous snapshot.
+        """
+        stamp = source_stamp(catalog_path, featured_path)
+        catalog_bytes = _read_bytes(catalog_path)
+        featured_bytes = _read_bytes(featured_path)
+
+        raw: List[Dict] = []
+        if catalog_bytes is not None:
+            raw = json.loads(catalog_bytes)
+        else:
+            logger.warning("catalog.json not found; returning empty catalog")
+
+        featured_urls = set(json.loads(featured_bytes)) if featured_bytes is not None else set()
+
+        store = CatalogStore()
+        for obj in raw:
+            try:
+                is_featured = obj.get("github_url") in featured_urls or obj.get("is_featured", False)
+                obj["is_featured"] = bool(is_featured)
+                store.append(Template(**obj))
+            except Exception as e:
+                logger.warning(f"Skipping invalid template: {e}")
+
+        digest = hashlib.sha256()
+        digest.update(catalog_bytes or b"")
+        digest.update(b"\0")
+        digest.update(featured_bytes or b"")
+        return cls(store, version=digest.hexdigest()[:16], stamp=stamp)
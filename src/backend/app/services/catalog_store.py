@@ -0,0 +1,134 @@
+"""
+Columnar, string-interned storage for the template catalog.
+
+Every string is stored once in a shared table and referenced by integer
+code; list fields (tags, languages, models, databases) are flattened into
+one code array with per-row offsets. ``TemplateRow`` is a lightweight view
+for indexing and ``materialize`` builds a ``Template`` only when a row is
+actually returned to a client.
+"""
+from array import array
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from ..models.schemas import Template, PlanningInfo
+
+_SCALAR_STR_FIELDS = ("id", "title", "description", "collection", "task", "github_url", "icon", "created_at")
+_LIST_FIELDS = ("tags", "languages", "models", "databases")
+_NO_PATTERN = -1
+
+
+class _ListColumn:
+    __slots__ = ("offsets", "codes")
+
+    def __init__(self):
+        self.offsets = array("I", [0])
+        self.codes = array("I")
+
+    def append(self, codes: Sequence[int]) -> None:
+        self.codes.extend(codes)
+        self.offsets.append(len(self.codes))
+
+    def get(self, row: int) -> array:
+        return self.codes[self.offsets[row]:self.offsets[row + 1]]
+
+
+class CatalogStore:
+    def __init__(self):
+        self._strings: List[str] = []
+        self._string_codes: Dict[str, int] = {}
+        self._str_columns: Dict[str, array] = {name: array("I") for name in _SCALAR_STR_FIELDS}
+        self._list_columns: Dict[str, _ListColumn] = {name: _ListColumn() for name in _LIST_FIELDS}
+        self._pattern = array("i")
+        self._fork_count = array("q")
+        self._star_count = array("q")
+        self._is_featured = bytearray()
+        # Planning blocks are sparse and nested; keep them as plain dicts
+        self._planning: Dict[int, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._fork_count)
+
+    def __iter__(self) -> Iterator["TemplateRow"]:
+        return (TemplateRow(self, i) for i in range(len(self)))
+
+    def _intern(self, value: str) -> int:
+        code = self._string_codes.get(value)
+        if code is None:
+            code = len(self._strings)
+            self._strings.append(value)
+            self._string_codes[value] = code
+        return code
+
+    def string(self, code: int) -> str:
+        return self._strings[code]
+
+    def append(self, t: Template) -> int:
+        row = len(self)
+        for name in _SCALAR_STR_FIELDS:
+            self._str_columns[name].append(self._intern(getattr(t, name)))
+        for name in _LIST_FIELDS:
+            self._list_columns[name].append([self._intern(v) for v in getattr(t, name)])
+        self._pattern.append(self._intern(t.pattern) if t.pattern is not None else _NO_PATTERN)
+        self._fork_count.append(t.fork_count)
+        self._star_count.append(t.star_count)
+        self._is_featured.append(1 if t.is_featured else 0)
+        if t.planning is not None:
+            self._planning[row] = t.planning.model_dump()
+        return row
+
+    def row(self, i: int) -> "TemplateRow":
+        return TemplateRow(self, i)
+
+    def scalar(self, name: str, i: int):
+        if name in self._str_columns:
+            return self._strings[self._str_columns[name][i]]
+        if name == "pattern":
+            code = self._pattern[i]
+            return None if code == _NO_PATTERN else self._strings[code]
+        if name == "fork_count":
+            return self._fork_count[i]
+        if name == "star_count":
+            return self._star_count[i]
+        if name == "is_featured":
+            return bool(self._is_featured[i])
+        raise AttributeError(name)
+
+    def list_field(self, name: str, i: int) -> List[str]:
+        strings = self._strings
+        return [strings[c] for c in self._list_columns[name].get(i)]
+
+    def planning(self, i: int) -> Optional[dict]:
+        return self._planning.get(i)
+
+    def materialize(self, i: int) -> Template:
+        data = {name: self.scalar(name, i) for name in _SCALAR_STR_FIELDS}
+        for name in _LIST_FIELDS:
+            data[name] = self.list_field(name, i)
+        data["pattern"] = self.scalar("pattern", i)
+        data["fork_count"] = self._fork_count[i]
+        data["star_count"] = self._star_count[i]
+        data["is_featured"] = bool(self._is_featured[i])
+        planning = self._planning.get(i)
+        data["planning"] = PlanningInfo.model_construct(**planning) if planning is not None else None
+        # Rows were validated on load; skip re-validation
+        return Template.model_construct(**data)
+
+
+class TemplateRow:
+    """Read-only attribute view of one catalog row, shaped like ``Template``."""
+
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, store: CatalogStore, index: int):
+        self._store = store
+        self._index = index
+
+    def __getattr__(self, name: str):
+        if name in _LIST_FIELDS:
+            return self._store.list_field(name, self._index)
+        if name == "planning":
+            return self._store.planning(self._index)
+        return self._store.scalar(name, self._index)
+
+    def materialize(self) -> Template:
+        return self._store.materialize(self._index)
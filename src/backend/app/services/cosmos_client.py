@@ -0,0 +1,111 @@
+"""
+Process-wide async Cosmos DB client.
+
+Each pool holds one ``azure.cosmos.aio`` client (and its connection pool),
+so Cosmos round trips are awaited instead of blocking the event loop.
+Container proxies are created once and cached. SpecService authenticates
+against ``COSMOS_ENDPOINT`` (AAD, then key, then connection string);
+CosmosService keeps connecting with ``COSMOS_CONNECTION_STRING`` only, so
+the two may point at different accounts. Closed from the app lifespan on
+shutdown.
+"""
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import logging
+import os
+
+from azure.cosmos import PartitionKey
+from azure.cosmos.aio import ContainerProxy, CosmosClient
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def cosmos_endpoint() -> Optional[str]:
+    return getattr(settings, 'COSMOS_ENDPOINT', os.getenv('COSMOS_ENDPOINT'))
+
+
+class CosmosClientPool:
+    def __init__(self, connection_string_only: bool = False):
+        self.connection_string_only = connection_string_only
+        self._client: Optional[CosmosClient] = None
+        self._credential = None
+        self._containers: Dict[Tuple[str, str], ContainerProxy] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _create_client(self) -> Optional[CosmosClient]:
+        endpoint = None if self.connection_string_only else cosmos_endpoint()
+        if endpoint:
+            try:
+                from azure.identity.aio import DefaultAzureCredential
+
+                self._credential = DefaultAzureCredential()
+                logger.info("Using AAD authentication for Cosmos DB")
+                return CosmosClient(endpoint, self._credential)
+            except Exception as aad_error:
+                logger.warning(f"AAD authentication failed: {aad_error}")
+                key = getattr(settings, 'COSMOS_KEY', os.getenv('COSMOS_KEY'))
+                if key and not settings.COSMOS_CONNECTION_STRING:
+                    logger.info("Using key-based authentication for Cosmos DB")
+                    return CosmosClient(endpoint, key)
+        if settings.COSMOS_CONNECTION_STRING:
+            logger.info("Using connection string authentication for Cosmos DB")
+            return CosmosClient.from_connection_string(settings.COSMOS_CONNECTION_STRING)
+        return None
+
+    async def client(self) -> Optional[CosmosClient]:
+        loop = asyncio.get_running_loop()
+        # The client's sessions belong to the loop that opened them
+        if self._loop is not loop:
+            await self._close_stale(self._loop)
+            self._client = self._create_client()
+            self._containers = {}
+            self._loop = loop
+        return self._client
+
+    async def _close_stale(self, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """Close the client and credential opened on a previous event loop."""
+        for resource in (self._client, self._credential):
+            if resource is None:
+                continue
+            try:
+                if loop is not None and loop.is_running():
+                    # Still serving another thread: close it there
+                    await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(resource.close(), loop))
+                else:
+                    await resource.close()
+            except Exception as e:
+                logger.debug(f"Closing stale Cosmos DB client failed: {e}")
+        self._client = self._credential = None
+
+    async def container(self, container_id: str, partition_key: str, **options: Any) -> Optional[ContainerProxy]:
+        """The named container (created if missing), or None when Cosmos is not configured."""
+        client = await self.client()
+        if client is None:
+            return None
+        database_id = settings.COSMOS_DATABASE_ID
+        proxy = self._containers.get((database_id, container_id))
+        if proxy is None:
+            database = await client.create_database_if_not_exists(id=database_id)
+            proxy = await database.create_container_if_not_exists(
+                id=container_id,
+                partition_key=PartitionKey(path=partition_key),
+                **options
+            )
+            self._containers[(database_id, container_id)] = proxy
+        return proxy
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+        if self._credential is not None:
+            await self._credential.close()
+        self._client = self._credential = None
+        self._containers = {}
+        self._loop = None
+
+
+# Global Cosmos client pool instances: SpecService's, and CosmosService's
+cosmos_clients = CosmosClientPool()
+connection_string_clients = CosmosClientPool(connection_string_only=True)
@@ -0,0 +1,121 @@
+"""
+Bitmap facet index for the template catalog.
+
+Each facet value maps to a Python int whose bit ``i`` is set when the
+template at ordinal ``i`` carries that value, so combining filters is a
+chain of bitwise ANDs and counting matches is ``int.bit_count``.
+"""
+from typing import Dict, Iterable, List, Optional
+
+from ..models.schemas import Template, FilterOptions, FacetCounts
+
+# Facet name -> FilterOptions / FacetCounts field
+FACETS = {
+    "task": "tasks",
+    "language": "languages",
+    "collection": "collections",
+    "model": "models",
+    "database": "databases",
+    "pattern": "patterns",
+}
+
+_BYTE_BITS = [tuple(b for b in range(8) if byte >> b & 1) for byte in range(256)]
+
+
+def to_mask(ordinals: Iterable[int]) -> int:
+    mask = 0
+    for i in ordinals:
+        mask |= 1 << i
+    return mask
+
+
+def iter_ordinals(mask: int) -> List[int]:
+    """Ordinals of set bits, ascending."""
+    result: List[int] = []
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    for offset, byte in enumerate(data):
+        if byte:
+            base = offset * 8
+            result.extend(base + b for b in _BYTE_BITS[byte])
+    return result
+
+
+def _facet_values(t: Template, facet: str) -> List[str]:
+    if facet == "task":
+        return [t.task] if t.task else []
+    if facet == "language":
+        return t.languages
+    if facet == "collection":
+        return [t.collection] if t.collection else []
+    if facet == "model":
+        return t.models
+    if facet == "database":
+        return t.databases
+    if facet == "pattern":
+        return [t.pattern] if t.pattern else []
+    return []
+
+
+class FacetIndex:
+    def __init__(self, templates: List[Template]):
+        self.size = len(templates)
+        self.all_mask = (1 << self.size) - 1
+        self._bitmaps: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+        self._tags: Dict[str, int] = {}
+        self._featured = 0
+
+        for ordinal, t in enumerate(templates):
+            bit = 1 << ordinal
+            for facet, bitmaps in self._bitmaps.items():
+                for value in _facet_values(t, facet):
+                    bitmaps[value] = bitmaps.get(value, 0) | bit
+            for tag in t.tags:
+                self._tags[tag] = self._tags.get(tag, 0) | bit
+            if t.is_featured:
+                self._featured |= bit
+
+        self._options = FilterOptions(**{
+            field: sorted(self._bitmaps[facet]) for facet, field in FACETS.items()
+        })
+
+    @property
+    def featured_mask(self) -> int:
+        return self._featured
+
+    def filter_options(self) -> FilterOptions:
+        return self._options
+
+    def value_mask(self, facet: str, value: str) -> int:
+        mask = self._bitmaps[facet].get(value, 0)
+        if facet == "task":
+            # A task filter also matches templates tagged with that value
+            mask |= self._tags.get(value, 0)
+        return mask
+
+    def selection_mask(self, selection: Dict[str, Optional[str]], exclude: Optional[str] = None) -> int:
+        mask = self.all_mask
+        for facet, value in selection.items():
+            if not value or facet == exclude:
+                continue
+            mask &= self.value_mask(facet, value)
+            if not mask:
+                break
+        return mask
+
+    def counts(self, selection: Dict[str, Optional[str]], base_mask: Optional[int] = None) -> FacetCounts:
+        """
+        Count matches per facet value. Each facet is counted against the
+        other facets' selections so alternative values remain visible.
+        """
+        base = self.all_mask if base_mask is None else base_mask
+        result: Dict[str, Dict[str, int]] = {}
+        for facet, field in FACETS.items():
+            mask = base & self.selection_mask(selection, exclude=facet)
+            counts: Dict[str, int] = {}
+            for value in getattr(self._options, field):
+                n = (mask & self.value_mask(facet, value)).bit_count()
+                if n:
+                    counts[value] = n
+            result[field] = counts
+        total = (base & self.selection_mask(selection)).bit_count()
+        return FacetCounts(total=total, **result)
@@ -0,0 +1,82 @@
+"""
+Feature number allocation for specs.
+
+Numbers come from a single counter document in the specs container that is
+advanced with an ETag ``If-Match`` replace, so concurrent creations across
+workers never hand out the same number and each allocation is a point read
+plus a point write. With ``block_size`` > 1 a worker reserves a range of
+numbers per counter update and serves the rest locally, trading gaps in the
+sequence (when a worker restarts) for less contention on the counter.
+"""
+from typing import Awaitable, Callable, Optional, Tuple
+import asyncio
+import logging
+import random
+
+from azure.core import MatchConditions
+from azure.cosmos.aio import ContainerProxy
+from azure.cosmos.exceptions import (
+    CosmosAccessConditionFailedError,
+    CosmosResourceExistsError,
+    CosmosResourceNotFoundError,
+)
+
+logger = logging.getLogger(__name__)
+
+COUNTER_ID = "feature-number-counter"
+
+
+class FeatureNumberAllocator:
+    def __init__(self, block_size: int = 1, max_attempts: int = 20):
+        self.block_size = max(block_size, 1)
+        self.max_attempts = max_attempts
+        self._next = 0
+        self._end = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        return self._lock
+
+    async def allocate(self, container: ContainerProxy, seed: Callable[[], Awaitable[int]]) -> int:
+        """The next feature number; ``seed`` returns the highest number in use when no counter exists yet."""
+        async with self._get_lock():
+            if self._next >= self._end:
+                self._next, self._end = await self._reserve(container, seed)
+            number = self._next
+            self._next += 1
+            return number
+
+    async def _reserve(self, container: ContainerProxy, seed: Callable[[], Awaitable[int]]) -> Tuple[int, int]:
+        for attempt in range(self.max_attempts):
+            try:
+                counter = await container.read_item(item=COUNTER_ID, partition_key=COUNTER_ID)
+            except CosmosResourceNotFoundError:
+                # First allocation: continue from the numbers existing specs already use
+                start = await seed() + 1
+                try:
+                    await container.create_item(body=self._counter(start + self.block_size - 1))
+                    return start, start + self.block_size
+                except CosmosResourceExistsError:
+                    continue  # another worker created it first
+            start = counter["value"] + 1
+            try:
+                await container.replace_item(
+                    item=COUNTER_ID,
+                    body=self._counter(start + self.block_size - 1),
+                    etag=counter["_etag"],
+                    match_condition=MatchConditions.IfNotModified
+                )
+                return start, start + self.block_size
+            except CosmosAccessConditionFailedError:
+                # Lost the race; back off with jitter before re-reading
+                await asyncio.sleep(random.uniform(0, 0.005 * 2 ** min(attempt, 6)))
+        raise RuntimeError(f"Feature number counter still contended after {self.max_attempts} attempts")
+
+    @staticmethod
+    def _counter(value: int) -> dict:
+        return {"id": COUNTER_ID, "type": "counter", "value": value}
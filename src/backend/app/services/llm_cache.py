@@ -0,0 +1,144 @@
+"""
+Content-addressed cache for Azure OpenAI generations.
+
+Entries are keyed by a hash of everything that shapes the output (endpoint,
+model, instructions and the user prompt, which carries the customization
+fields), expire after a TTL and are evicted LRU. An optional similarity
+tier embeds the user prompt and reuses an entry from the same scope (same
+endpoint, model and instructions) whose prompt is a near-duplicate.
+"""
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import math
+import threading
+import time
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Embed = Callable[[str], Awaitable[List[float]]]
+
+
+class _Entry:
+    __slots__ = ("value", "expires", "scope", "vector")
+
+    def __init__(self, value: Any, expires: float, scope: str, vector: Optional[List[float]]):
+        self.value = value
+        self.expires = expires
+        self.scope = scope
+        self.vector = vector
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class LLMResponseCache:
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl: float = 3600,
+        similarity: float = 0.0,
+        embed: Optional[Embed] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.embed = embed
+        self._clock = clock
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= self._clock():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def put(self, key: str, value: Any, scope: str = "", vector: Optional[List[float]] = None) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = _Entry(value, self._clock() + self.ttl, scope, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _nearest(self, scope: str, vector: List[float]) -> Optional[Any]:
+        now = self._clock()
+        best_key, best_score = None, self.similarity
+        with self._lock:
+            for key, entry in self._entries.items():
+                if entry.scope != scope or entry.vector is None or entry.expires <= now:
+                    continue
+                score = sum(a * b for a, b in zip(vector, entry.vector))
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is None:
+                return None
+            self._entries.move_to_end(best_key)
+            self.similar_hits += 1
+            return self._entries[best_key].value
+
+    async def lookup(self, key: str, scope: str = "", text: str = "") -> Tuple[Optional[Any], Optional[List[float]]]:
+        """
+        Exact hit first, then (if enabled) the nearest entry in ``scope``
+        whose prompt embedding is within the similarity threshold. Returns
+        the value and the prompt embedding, to be passed back to ``put``.
+        """
+        value = self.get(key)
+        if value is not None or not (self.enabled and self.similarity and self.embed and text):
+            return value, None
+        try:
+            vector = _normalize(await self.embed(text))
+        except Exception as e:
+            logger.warning(f"Embedding for similarity cache failed: {e}")
+            return None, None
+        return self._nearest(scope, vector), vector
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+async def _embed_prompt(text: str) -> List[float]:
+    from .llm_client import llm_clients
+
+    response = await llm_clients.responses().embeddings.create(model=settings.LLM_EMBEDDING_MODEL, input=text)
+    return response.data[0].embedding
+
+
+# Global LLM response cache instance
+llm_cache = LLMResponseCache(
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl=settings.LLM_CACHE_TTL,
+    similarity=settings.LLM_CACHE_SIMILARITY,
+    embed=_embed_prompt if settings.LLM_EMBEDDING_MODEL else None,
+)
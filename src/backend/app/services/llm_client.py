@@ -0,0 +1,117 @@
+"""
+Application-scoped Azure OpenAI clients.
+
+Every route shares one pooled ``httpx.AsyncClient``, so requests reuse warm
+keep-alive (and, when ``h2`` is installed, HTTP/2) connections to Azure
+OpenAI instead of paying a TCP+TLS handshake per call, and every request is
+admitted through the process-wide ``llm_limiter``. Closed from the app
+lifespan on shutdown.
+"""
+from typing import Optional, Set
+import asyncio
+import logging
+
+import httpx
+from openai import AsyncAzureOpenAI, AsyncOpenAI
+
+from ..core.config import settings
+from .llm_limiter import LimitedTransport, llm_limiter
+
+logger = logging.getLogger(__name__)
+
+try:  # optional dependency: pip install "httpx[http2]"
+    import h2  # type: ignore  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover - depends on environment
+    HTTP2_AVAILABLE = False
+
+
+class LLMClientPool:
+    def __init__(self):
+        self._http: Optional[httpx.AsyncClient] = None
+        self._responses: Optional[AsyncOpenAI] = None
+        self._azure: Optional[AsyncAzureOpenAI] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closing: Set[asyncio.Task] = set()
+
+    def _close_stale(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Close the httpx client opened on a previous event loop without blocking the caller."""
+        http, old_loop = self._http, self._loop
+
+        async def close() -> None:
+            try:
+                await http.aclose()
+            except Exception as e:
+                logger.debug(f"Closing stale Azure OpenAI client failed: {e}")
+
+        if old_loop is not None and old_loop.is_running():
+            # Still serving another thread: close it there
+            asyncio.run_coroutine_threadsafe(close(), old_loop)
+        else:
+            task = loop.create_task(close())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    def _http_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        # Pooled connections belong to the loop that opened them
+        if self._http is None or self._loop is not loop:
+            if self._http is not None:
+                self._close_stale(loop)
+            http2 = settings.LLM_HTTP2 and HTTP2_AVAILABLE
+            if settings.LLM_HTTP2 and not HTTP2_AVAILABLE:
+                logger.info("h2 not installed; Azure OpenAI connections use HTTP/1.1")
+            transport = httpx.AsyncHTTPTransport(
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_MAX_KEEPALIVE,
+                    keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+                ),
+            )
+            self._http = httpx.AsyncClient(
+                transport=LimitedTransport(transport, llm_limiter),
+                timeout=httpx.Timeout(settings.LLM_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT),
+            )
+            self._loop = loop
+            self._responses = None
+            self._azure = None
+        return self._http
+
+    def responses(self) -> AsyncOpenAI:
+        """Client for the Azure OpenAI v1 (Responses API) endpoint."""
+        http = self._http_client()
+        if self._responses is None:
+            self._responses = AsyncOpenAI(
+                api_key=settings.AZURE_OPENAI_KEY,
+                base_url=f"{settings.AZURE_OPENAI_ENDPOINT.rstrip('/')}/openai/v1/",
+                default_query={"api-version": settings.API_VERSION},
+                timeout=settings.LLM_TIMEOUT,
+                max_retries=settings.LLM_MAX_RETRIES,
+                http_client=http,
+            )
+        return self._responses
+
+    def azure(self) -> AsyncAzureOpenAI:
+        """Client for deployment-scoped Azure OpenAI routes (chat completions)."""
+        http = self._http_client()
+        if self._azure is None:
+            self._azure = AsyncAzureOpenAI(
+                api_key=settings.AZURE_OPENAI_KEY,
+                api_version=settings.API_VERSION,
+                azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+                timeout=settings.LLM_TIMEOUT,
+                max_retries=settings.LLM_MAX_RETRIES,
+                http_client=http,
+            )
+        return self._azure
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+        self._http = self._responses = self._azure = None
+        self._loop = None
+
+
+# Global client pool instance
+llm_clients = LLMClientPool()
@@ -0,0 +1,322 @@
+"""
+Adaptive (AIMD) concurrency limiter for Azure OpenAI calls.
+
+Every request from the shared LLM client pool is admitted through one
+limiter. The concurrency limit grows by roughly one per round trip while
+the deployment has headroom, and is halved on a 429 or when
+``x-ratelimit-remaining-tokens`` drops below the configured floor. Requests
+beyond the limit wait in a priority queue so interactive streams are
+admitted before background and fallback calls. A streamed response gives
+its slot back with its first chunk: the limit paces admission into the
+deployment, and a long-running stream would otherwise hold a slot for
+its whole generation and queue every other call behind it. With
+``LLM_LIMITER_REDIS_URL`` set, admission also takes a lease from a Redis
+sorted set so the limit holds across workers (falls back to process-local
+limiting if Redis is unreachable).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Mapping, Optional
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+import uuid
+
+import httpx
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_BACKGROUND = 2
+
+_priority: ContextVar[int] = ContextVar("llm_priority", default=PRIORITY_DEFAULT)
+
+# Drop expired leases, then take one if the cluster is under the limit
+_LEASE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[4])
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+    return 1
+end
+return 0
+"""
+
+
+@contextmanager
+def llm_priority(level: int):
+    """Queue priority for LLM calls made inside the block (lower runs first)."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _header_int(headers: Mapping[str, str], name: str) -> Optional[int]:
+    try:
+        return int(float(headers[name]))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    ms = _header_int(headers, "retry-after-ms")
+    if ms is not None:
+        return ms / 1000
+    return _header_int(headers, "retry-after")
+
+
+class AIMDLimiter:
+    def __init__(
+        self,
+        initial: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        token_floor: int = 4000,
+        backoff: float = 0.5,
+        cooldown: float = 1.0,
+        redis_url: str = "",
+        lease_ttl: float = 600,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.token_floor = token_floor
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.lease_ttl = lease_ttl
+        self._clock = clock
+        self.in_flight = 0
+        self._waiters: List[Any] = []
+        self._queued = 0
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._last_decrease = float("-inf")
+        self._wake_handle: Optional[asyncio.TimerHandle] = None
+        self.remaining_requests: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self.admitted = 0
+        self.throttled = 0
+        self.decreases = 0
+        self.max_queue_depth = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._redis = None
+        self._lease_script = None
+        if redis_url:
+            try:
+                import redis.asyncio as aioredis
+
+                self._redis = aioredis.from_url(redis_url)
+                self._lease_script = self._redis.register_script(_LEASE_SCRIPT)
+                logger.info("LLM limiter coordinating through Redis")
+            except Exception as e:
+                logger.info(f"Using process-local LLM limiting: {e}")
+                self._redis = None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    def _can_admit(self) -> bool:
+        return self.in_flight < max(int(self.limit), self.min_limit) and self._clock() >= self._paused_until
+
+    async def acquire(self, priority: Optional[int] = None) -> Optional[str]:
+        """Wait for a slot; returns a lease to pass back to ``release``."""
+        start = self._clock()
+        if self._queued == 0 and self._can_admit():
+            self.in_flight += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            level = _priority.get() if priority is None else priority
+            heapq.heappush(self._waiters, (level, next(self._seq), waiter))
+            self._queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._queued)
+            self._schedule_wake()
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Admitted just as the caller gave up: hand the slot on
+                    self.in_flight -= 1
+                    self._admit_waiters()
+                else:
+                    self._queued -= 1
+                raise
+
+        lease = None
+        try:
+            lease = await self._global_lease()
+        except BaseException:
+            self.in_flight -= 1
+            self._admit_waiters()
+            raise
+        waited = self._clock() - start
+        self.admitted += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        return lease
+
+    async def release(self, lease: Optional[str] = None) -> None:
+        self.in_flight -= 1
+        self._admit_waiters()
+        if lease is not None and self._redis is not None:
+            try:
+                await self._redis.zrem(settings.LLM_LIMITER_REDIS_KEY, lease)
+            except Exception as e:
+                logger.warning(f"Failed to release LLM lease: {e}")
+
+    async def _global_lease(self) -> Optional[str]:
+        if self._redis is None:
+            return None
+        lease = uuid.uuid4().hex
+        delay = 0.05
+        while True:
+            now = time.time()
+            try:
+                taken = await self._lease_script(
+                    keys=[settings.LLM_LIMITER_REDIS_KEY],
+                    args=[now - self.lease_ttl, max(int(self.limit), self.min_limit), now, lease, int(self.lease_ttl)],
+                )
+            except Exception as e:
+                logger.error(f"Redis error, falling back to process-local LLM limiting: {e}")
+                self._redis = None
+                return None
+            if taken:
+                return lease
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+    def _admit_waiters(self) -> None:
+        while self._waiters and self._can_admit():
+            _, _, waiter = heapq.heappop(self._waiters)
+            if waiter.done():
+                continue
+            self._queued -= 1
+            self.in_flight += 1
+            waiter.set_result(None)
+        self._schedule_wake()
+
+    def _schedule_wake(self) -> None:
+        # Queued requests blocked only by a Retry-After pause need a timer
+        delay = self._paused_until - self._clock()
+        if not self._waiters or delay <= 0 or self._wake_handle is not None:
+            return
+        loop = asyncio.get_running_loop()
+
+        def wake():
+            self._wake_handle = None
+            self._admit_waiters()
+        self._wake_handle = loop.call_later(delay, wake)
+
+    def _decrease(self) -> None:
+        now = self._clock()
+        # One burst of 429s from the same quota window counts as one signal
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * self.backoff)
+        self.decreases += 1
+        logger.info(f"LLM concurrency limit decreased to {self.limit:.1f}")
+
+    def observe(self, status: int, headers: Mapping[str, str]) -> None:
+        """Adjust the limit from an Azure OpenAI response."""
+        self.remaining_requests = _header_int(headers, "x-ratelimit-remaining-requests")
+        self.remaining_tokens = _header_int(headers, "x-ratelimit-remaining-tokens")
+        if status == 429:
+            self.throttled += 1
+            self._decrease()
+            wait = _retry_after(headers)
+            if wait:
+                self._paused_until = max(self._paused_until, self._clock() + wait)
+        elif status < 400:
+            if self.remaining_tokens is not None and self.remaining_tokens < self.token_floor:
+                self._decrease()
+            elif self.remaining_requests is not None and self.remaining_requests <= self.in_flight:
+                pass  # at the edge of the request quota: hold steady
+            else:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+        self._admit_waiters()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "throttled": self.throttled,
+            "decreases": self.decreases,
+            "wait_seconds_avg": round(self.wait_seconds_total / self.admitted, 4) if self.admitted else 0.0,
+            "wait_seconds_max": round(self.wait_seconds_max, 4),
+            "remaining_requests": self.remaining_requests,
+            "remaining_tokens": self.remaining_tokens,
+            "distributed": self._redis is not None,
+        }
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, limiter: AIMDLimiter, lease: Optional[str]):
+        self._stream = stream
+        self._limiter = limiter
+        self._lease = lease
+        self._released = False
+
+    async def _release(self) -> None:
+        if not self._released:
+            self._released = True
+            await self._limiter.release(self._lease)
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            # The deployment has started answering; free the slot for the next call
+            await self._release()
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            await self._release()
+
+
+class LimitedTransport(httpx.AsyncBaseTransport):
+    """Admits each request through the limiter; the slot is held until the first body chunk or close."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, limiter: AIMDLimiter):
+        self._transport = transport
+        self._limiter = limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        lease = await self._limiter.acquire()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            await self._limiter.release(lease)
+            raise
+        self._limiter.observe(response.status_code, response.headers)
+        if response.is_closed:  # body was already read in full
+            await self._limiter.release(lease)
+            return response
+        response.stream = _ReleasingStream(response.stream, self._limiter, lease)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+# Global limiter shared by every Azure OpenAI call in the process
+llm_limiter = AIMDLimiter(
+    initial=settings.LLM_CONCURRENCY_INITIAL,
+    min_limit=settings.LLM_CONCURRENCY_MIN,
+    max_limit=settings.LLM_CONCURRENCY_MAX,
+    token_floor=settings.LLM_TOKEN_HEADROOM,
+    redis_url=settings.LLM_LIMITER_REDIS_URL,
+)
@@ -0,0 +1,112 @@
+"""
+Incremental extraction of JSON objects from streamed model output.
+
+Model deltas arrive a few characters at a time and objects can be split
+anywhere, including inside strings and escape sequences. The scanner keeps
+its brace/string state between deltas, so each character is examined once
+and the per-delta cost is proportional to the delta, not the whole output.
+"""
+from typing import List
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Characters that change scanner state outside / inside a string
+_STRUCTURAL = re.compile(r'[{}"]')
+_IN_STRING = re.compile(r'["\\]')
+# Skipped after an object, as in "{...},\n{...}]"
+_SEPARATORS = " \n\r\t,]"
+
+
+class NDJSONObjectScanner:
+    """
+    Feed text deltas, get back each complete top-level JSON object as soon as
+    its closing brace arrives. Text outside objects (fences, prose, array
+    brackets) is skipped.
+    """
+
+    def __init__(self, validate: bool = True):
+        self.validate = validate
+        self.invalid = 0
+        self._buf = ""
+        self._pos = 0
+        # Start of the object being scanned in _buf, -1 between objects
+        self._start = -1
+        self._depth = 0
+        self._in_str = False
+        # Text seen since the last emitted object that is no longer in _buf
+        self._skipped: List[str] = []
+
+    def feed(self, text: str) -> List[str]:
+        if not text:
+            return []
+        buf = self._buf + text
+        n = len(buf)
+        pos = self._pos
+        emitted_to = 0
+        out: List[str] = []
+
+        while pos < n:
+            if self._start < 0:
+                i = buf.find("{", pos)
+                if i < 0:
+                    pos = n
+                    break
+                self._start, self._depth, pos = i, 1, i + 1
+            elif self._in_str:
+                m = _IN_STRING.search(buf, pos)
+                if m is None:
+                    pos = n
+                    break
+                if m.group() == "\\":
+                    if m.end() >= n:
+                        # Escape split across deltas: resume at the backslash
+                        pos = m.start()
+                        break
+                    pos = m.end() + 1
+                else:
+                    self._in_str = False
+                    pos = m.end()
+            else:
+                m = _STRUCTURAL.search(buf, pos)
+                if m is None:
+                    pos = n
+                    break
+                ch, pos = m.group(), m.end()
+                if ch == '"':
+                    self._in_str = True
+                elif ch == "{":
+                    self._depth += 1
+                else:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        self._emit(buf[self._start:pos], out)
+                        self._skipped.clear()
+                        self._start = -1
+                        emitted_to = pos
+
+        # Only the unfinished object needs to stay buffered
+        keep_from = self._start if self._start >= 0 else pos
+        if keep_from > emitted_to:
+            self._skipped.append(buf[emitted_to:keep_from])
+        self._buf = buf[keep_from:]
+        self._pos = pos - keep_from
+        if self._start >= 0:
+            self._start = 0
+        return out
+
+    def _emit(self, raw: str, out: List[str]) -> None:
+        if self.validate:
+            try:
+                json.loads(raw)
+            except ValueError:
+                self.invalid += 1
+                logger.warning(f"Dropping malformed streamed object: {raw[:120]}")
+                return
+        out.append(raw)
+
+    def remainder(self) -> str:
+        """Text received after the last complete object (including any partial one)."""
+        return ("".join(self._skipped) + self._buf).lstrip(_SEPARATORS)
@@ -0,0 +1,170 @@
+"""
+Token budgeting for spec-driven prompts.
+
+Oversized text is fitted to a budget section by section (split on markdown
+headings) instead of being clipped at a fixed character offset: every
+heading survives (unless the budget cannot hold even the headings),
+sections under their fair share are kept whole and only the largest ones
+are shortened at line/word boundaries, behind a marker. Fitted text and
+token counts are cached, keyed by spec id and version for spec fields.
+"""
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional, Tuple
+import hashlib
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+try:  # optional dependency: pip install tiktoken
+    import tiktoken  # type: ignore
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:  # pragma: no cover - depends on environment
+    _ENCODING = None
+
+Measure = Callable[[str], int]
+
+_HEADING = re.compile(r"^(?=#{1,6}\s)", re.MULTILINE)
+OMITTED = "\n[…section shortened to fit the prompt budget]\n"
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    # Without a tokenizer, ~4 characters per token for English prose
+    return (len(text) + 3) // 4
+
+
+def split_sections(text: str) -> List[str]:
+    """Split markdown before each heading; any preamble is the first section."""
+    return [s for s in _HEADING.split(text) if s]
+
+
+def _shares(sizes: List[int], budget: int) -> List[int]:
+    # Water-filling: small items keep their full size, the rest split what is left evenly
+    shares = [0] * len(sizes)
+    remaining = max(budget, 0)
+    order = sorted(range(len(sizes)), key=lambda i: sizes[i])
+    for n, i in enumerate(order):
+        shares[i] = min(sizes[i], remaining // (len(order) - n))
+        remaining -= shares[i]
+    return shares
+
+
+def _heading(section: str) -> str:
+    """The section's heading line, or "" for a preamble."""
+    return section.splitlines(keepends=True)[0] if _HEADING.match(section) else ""
+
+
+def _skeleton(section: str) -> str:
+    # The least a shortened section keeps: its heading and the omission marker
+    return _heading(section).rstrip() + OMITTED
+
+
+def _clip_lines(lines: List[str], limit: int, measure: Measure) -> List[str]:
+    kept: List[str] = []
+    used = 0
+    for line in lines:
+        cost = measure(line)
+        if used + cost > limit:
+            room = limit - used
+            if room > 0 and cost:
+                # Keep the head of the line, cut back to a word boundary
+                partial = line[: len(line) * room // cost]
+                kept.append(partial.rsplit(" ", 1)[0] if " " in partial else partial)
+            break
+        kept.append(line)
+        used += cost
+    return kept
+
+
+def _truncate(section: str, limit: int, measure: Measure) -> str:
+    heading = _heading(section)
+    body = section[len(heading):].splitlines(keepends=True)
+    kept = _clip_lines(body, limit - measure(heading + OMITTED), measure)
+    return (heading + "".join(kept)).rstrip() + OMITTED
+
+
+def fit_sections(text: str, budget: int, measure: Measure = count_tokens) -> str:
+    """
+    Fit ``text`` into ``budget`` (as counted by ``measure``), shortening the
+    largest sections first. A shortened section always keeps its heading and
+    the ``OMITTED`` marker; the assembled result is measured again and
+    refitted until it is within budget. If even the headings do not fit,
+    the trailing ones are dropped behind a single marker.
+    """
+    if not text or measure(text) <= budget:
+        return text
+    sections = split_sections(text)
+    sizes = [measure(s) for s in sections]
+    floors = [min(size, measure(_skeleton(s))) for s, size in zip(sections, sizes)]
+    skeleton = "".join(s if size <= floor else _skeleton(s) for s, size, floor in zip(sections, sizes, floors))
+    spare = budget - measure(skeleton)
+    while spare >= 0:
+        extras = _shares([size - floor for size, floor in zip(sizes, floors)], spare)
+        fitted = "".join(
+            s if size <= floor + extra else _truncate(s, floor + extra, measure)
+            for s, size, floor, extra in zip(sections, sizes, floors, extras)
+        )
+        # Tokens at the joins (and the markers) need not add up exactly
+        over = measure(fitted) - budget
+        if over <= 0:
+            return fitted
+        # With no spare left the result is the skeleton, which fits
+        spare = max(spare - over, 0) if spare else -1
+    if budget < measure(OMITTED):
+        return ""
+    clipped = "".join(_clip_lines(skeleton.splitlines(keepends=True), budget - measure(OMITTED), measure)).rstrip()
+    return clipped + "\n" if clipped.endswith(OMITTED.strip()) else clipped + OMITTED
+
+
+def fit_fields(values: List[str], budget: int, measure: Measure = count_tokens) -> List[str]:
+    """Split ``budget`` across several free-text fields, shortening only the largest."""
+    sizes = [measure(v or "") for v in values]
+    if sum(sizes) <= budget:
+        return list(values)
+    shares = _shares(sizes, budget)
+    return [v if size <= share else fit_sections(v, share, measure) for v, size, share in zip(values, sizes, shares)]
+
+
+class PromptBudgeter:
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._fitted: "OrderedDict[Tuple[Hashable, int], Tuple[str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text: str, key: Optional[Hashable]) -> Hashable:
+        return key if key is not None else hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def fit(self, text: str, budget: int, key: Optional[Hashable] = None) -> str:
+        return self.fit_with_count(text, budget, key)[0]
+
+    def fit_with_count(self, text: str, budget: int, key: Optional[Hashable] = None) -> Tuple[str, int]:
+        """Fitted text and its token count, cached per ``key`` (default: a hash of ``text``)."""
+        cache_key = (self._key(text or "", key), budget)
+        with self._lock:
+            hit = self._fitted.get(cache_key)
+            if hit is not None:
+                self._fitted.move_to_end(cache_key)
+                return hit
+        fitted = fit_sections(text or "", budget)
+        result = (fitted, count_tokens(fitted))
+        if fitted is not text:
+            logger.info(f"Prompt text fitted to {result[1]} of {budget} tokens (was {count_tokens(text)})")
+        with self._lock:
+            self._fitted[cache_key] = result
+            while len(self._fitted) > self.max_entries:
+                self._fitted.popitem(last=False)
+        return result
+
+    def spec_field(self, spec, field: str, budget: int) -> str:
+        """A spec field fitted to ``budget``; cached until the spec's version changes."""
+        return self.fit(getattr(spec, field, None) or "", budget, key=(spec.id, spec.version, field))
+
+
+# Global prompt budgeter instance
+prompt_budget = PromptBudgeter()
@@ -0,0 +1,160 @@
+"""
+Pre-encoded response cache for read-only catalog endpoints.
+
+Entries hold the JSON body already serialized and compressed, keyed by
+endpoint, normalized query and data version, so a hit costs a dict lookup.
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import gzip
+import hashlib
+import json
+import threading
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+try:  # optional dependency
+    import brotli  # type: ignore
+except ImportError:  # pragma: no cover - depends on environment
+    brotli = None
+
+# Version for data that only changes with a deploy (patterns, learning resources)
+STATIC_DATA_VERSION = "static"
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+
+class CachedResponse:
+    __slots__ = ("body", "gzip_body", "br_body", "etag", "headers")
+
+    def __init__(self, body: bytes, headers: Optional[Dict[str, str]] = None):
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.headers = headers or {}
+        self.gzip_body: Optional[bytes] = None
+        self.br_body: Optional[bytes] = None
+        if len(body) >= MIN_COMPRESS_SIZE:
+            self.gzip_body = gzip.compress(body, compresslevel=6, mtime=0)
+            if brotli is not None:
+                self.br_body = brotli.compress(body)
+
+    def etag_for(self, coding: Optional[str]) -> str:
+        # Each content-coding is a distinct representation with its own strong tag
+        return f'"{self.etag}-{coding}"' if coding else f'"{self.etag}"'
+
+
+def _accepts(accept_encoding: str, coding: str) -> bool:
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() == coding:
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def put(self, key: Hashable, entry: CachedResponse) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def respond(
+        self,
+        request: Request,
+        key: Tuple[Hashable, ...],
+        version: str,
+        build: Callable[[], Tuple[Any, Optional[Dict[str, str]]]],
+    ) -> Response:
+        """
+        Serve ``key`` at ``version`` from cache, calling ``build`` on a miss.
+
+        ``build`` returns the JSON-able payload and any extra response headers
+        to store alongside it. Honors If-None-Match and Accept-Encoding.
+
+        Read ``version`` before building: if the data changes in between, the
+        fresher body lands under the older key, which is simply never hit again.
+        """
+        cache_key = (*key, version)
+        entry = self.get(cache_key)
+        if entry is None:
+            payload, headers = build()
+            body = json.dumps(
+                jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")
+            ).encode("utf-8")
+            entry = CachedResponse(body, headers)
+            self.put(cache_key, entry)
+
+        accept_encoding = request.headers.get("accept-encoding", "")
+        body, coding = entry.body, None
+        if entry.br_body is not None and _accepts(accept_encoding, "br"):
+            body, coding = entry.br_body, "br"
+        elif entry.gzip_body is not None and _accepts(accept_encoding, "gzip"):
+            body, coding = entry.gzip_body, "gzip"
+
+        etag = entry.etag_for(coding)
+        headers = {
+            **entry.headers,
+            "ETag": etag,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+
+        if coding:
+            headers["Content-Encoding"] = coding
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+def normalize_query(**params: Any) -> Tuple[Tuple[str, str], ...]:
+    """Stable cache key for query parameters; empty values are dropped."""
+    items = []
+    for name, value in sorted(params.items()):
+        if value is None or value == "":
+            continue
+        if isinstance(value, str):
+            value = " ".join(value.split())
+        items.append((name, str(value)))
+    return tuple(items)
+
+
+# Global response cache instance
+response_cache = ResponseCache()
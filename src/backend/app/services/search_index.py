@@ -0,0 +1,140 @@
+"""
+Inverted index used for free-text search over the template catalog
+"""
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set
+import re
+
+from ..models.schemas import Template
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9#+]*")
+
+# Terms shorter than this are matched by prefix only; longer terms also
+# accept a single edit (insert, delete, substitute, transpose).
+MIN_FUZZY_LENGTH = 4
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.casefold())
+
+
+def _deletes(term: str) -> Set[str]:
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """Optimal string alignment distance <= 1"""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diff = [i for i in range(la) if a[i] != b[i]]
+        if len(diff) == 1:
+            return True
+        return (
+            len(diff) == 2
+            and diff[1] == diff[0] + 1
+            and a[diff[0]] == b[diff[1]]
+            and a[diff[1]] == b[diff[0]]
+        )
+    if la > lb:
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+def intersect(postings: List[List[int]]) -> List[int]:
+    """Intersect sorted posting lists, smallest first."""
+    if not postings:
+        return []
+    postings = sorted(postings, key=len)
+    result = postings[0]
+    for other in postings[1:]:
+        if not result:
+            break
+        other_set = set(other)
+        result = [o for o in result if o in other_set]
+    return result
+
+
+def _union(postings: Iterable[List[int]]) -> List[int]:
+    merged: Set[int] = set()
+    for p in postings:
+        merged.update(p)
+    return sorted(merged)
+
+
+class SearchIndex:
+    """
+    Tokenized inverted index over template ordinals.
+
+    Ordinals are positions in the template list the index was built from.
+    Title, description, tags, languages, models and databases are indexed.
+    """
+
+    def __init__(self, templates: List[Template]):
+        postings: Dict[str, Set[int]] = {}
+        for ordinal, t in enumerate(templates):
+            fields = [t.title, t.description, *t.tags, *t.languages, *t.models, *t.databases]
+            for field in fields:
+                for term in tokenize(field):
+                    postings.setdefault(term, set()).add(ordinal)
+
+        self._postings: Dict[str, List[int]] = {term: sorted(ids) for term, ids in postings.items()}
+        self._vocabulary: List[str] = sorted(self._postings)
+        self._delete_map: Dict[str, List[str]] = {}
+        for term in self._vocabulary:
+            if len(term) < MIN_FUZZY_LENGTH:
+                continue
+            for variant in _deletes(term):
+                self._delete_map.setdefault(variant, []).append(term)
+        self._size = len(templates)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        start = bisect_left(self._vocabulary, prefix)
+        terms: List[str] = []
+        for term in self._vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def _fuzzy_terms(self, term: str) -> List[str]:
+        candidates: Set[str] = set(self._delete_map.get(term, ()))
+        for variant in _deletes(term):
+            if variant in self._postings and len(variant) >= MIN_FUZZY_LENGTH - 1:
+                candidates.add(variant)
+            candidates.update(self._delete_map.get(variant, ()))
+        return [c for c in candidates if _within_one_edit(term, c)]
+
+    def expand(self, term: str) -> List[str]:
+        """Indexed terms a query term matches: prefix hits, else near misses."""
+        terms = self._prefix_terms(term)
+        if not terms and len(term) >= MIN_FUZZY_LENGTH:
+            terms = self._fuzzy_terms(term)
+        return terms
+
+    def search(self, query: str) -> Optional[List[int]]:
+        """
+        Return sorted ordinals matching every term in the query, or None if
+        the query contains no searchable terms.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return None
+        postings = []
+        for term in dict.fromkeys(terms):
+            matches = self.expand(term)
+            if not matches:
+                return []
+            postings.append(_union(self._postings[m] for m in matches))
+        return intersect(postings)
@@ -0,0 +1,113 @@
+"""
+In-flight deduplication of identical LLM generations.
+
+Concurrent requests with the same key share one upstream call. Streams are
+fanned out: every subscriber receives the full chunk sequence from the
+start, including chunks produced before it joined, and the upstream
+generation is cancelled once the last subscriber goes away. Entries only
+live while the generation is running; completed results are the job of
+``llm_cache``.
+"""
+from typing import AsyncGenerator, Awaitable, Callable, Dict, List, Optional, TypeVar
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Broadcast:
+    def __init__(self, source: AsyncGenerator[str, None]):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self._task = asyncio.ensure_future(self._pump(source))
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _pump(self, source: AsyncGenerator[str, None]) -> None:
+        try:
+            async for chunk in source:
+                self.chunks.append(chunk)
+                self._notify()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Shared generation failed: {e}")
+            self.error = e
+        finally:
+            await source.aclose()
+            self.done = True
+            self._notify()
+
+    async def subscribe(self) -> AsyncGenerator[str, None]:
+        i = 0
+        while True:
+            while i < len(self.chunks):
+                yield self.chunks[i]
+                i += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+    def cancel(self) -> None:
+        self._task.cancel()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[str, "asyncio.Future"] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run ``fn`` once for all concurrent callers with the same ``key``."""
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(fn())
+            self._calls[key] = call
+
+            def _forget(done: "asyncio.Future") -> None:
+                if self._calls.get(key) is done:
+                    del self._calls[key]
+                if not done.cancelled():
+                    done.exception()  # retrieved here in case every caller left
+            call.add_done_callback(_forget)
+        else:
+            self.coalesced += 1
+        # A caller that disconnects must not cancel the call for the others
+        return await asyncio.shield(call)
+
+    async def stream(self, key: str, factory: Callable[[], AsyncGenerator[str, None]]) -> AsyncGenerator[str, None]:
+        """Subscribe to the in-flight stream for ``key``, starting it if needed."""
+        flight = self._streams.get(key)
+        if flight is None or flight.done:
+            flight = _Broadcast(factory())
+            self._streams[key] = flight
+            flight._task.add_done_callback(lambda _: self._streams.pop(key, None) if self._streams.get(key) is flight else None)
+        else:
+            self.coalesced += 1
+        flight.subscribers += 1
+        try:
+            async for chunk in flight.subscribe():
+                yield chunk
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                logger.info("Last subscriber left; cancelling shared generation")
+                flight.cancel()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._streams)
+
+
+# Global in-flight LLM generation registry
+llm_flights = SingleFlight()
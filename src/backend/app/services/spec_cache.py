@@ -0,0 +1,124 @@
+"""
+Read-through cache of ``Spec`` objects.
+
+One entry per spec id, tagged with the spec's ``version``: a write of an
+older version never replaces a newer one, so a slow read racing an update
+cannot resurrect stale data. Entries expire after a TTL and are evicted
+LRU. With ``SPEC_CACHE_REDIS_URL`` set, a shared Redis tier sits behind the
+in-process one so workers reuse each other's reads; the Cosmos change feed
+(see ``SpecService.follow_change_feed``) evicts entries other workers
+have updated.
+"""
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+import json
+import logging
+import time
+
+from ..core.config import settings
+from ..models.schemas import Spec
+
+logger = logging.getLogger(__name__)
+
+
+class SpecCache:
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl: float = 300,
+        redis_url: str = "",
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[int, Spec, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._redis = None
+        if redis_url:
+            try:
+                import redis.asyncio as aioredis
+
+                self._redis = aioredis.from_url(redis_url, decode_responses=True)
+                logger.info("Spec cache using shared Redis tier")
+            except Exception as e:
+                logger.info(f"Using in-process spec cache only: {e}")
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    @staticmethod
+    def _redis_key(spec_id: str) -> str:
+        return f"spec_cache:{spec_id}"
+
+    def _store(self, spec: Spec) -> None:
+        current = self._entries.get(spec.id)
+        if current is not None and current[0] > spec.version:
+            return
+        self._entries[spec.id] = (spec.version, spec, self._clock() + self.ttl)
+        self._entries.move_to_end(spec.id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, spec_id: str) -> Optional[Spec]:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(spec_id)
+        if entry is not None:
+            if entry[2] > self._clock():
+                self._entries.move_to_end(spec_id)
+                self.hits += 1
+                return entry[1]
+            del self._entries[spec_id]
+        if self._redis is not None:
+            try:
+                raw = await self._redis.get(self._redis_key(spec_id))
+            except Exception as e:
+                logger.warning(f"Redis spec cache read failed: {e}")
+                raw = None
+            if raw:
+                spec = Spec(**json.loads(raw))
+                self._store(spec)
+                self.hits += 1
+                return spec
+        self.misses += 1
+        return None
+
+    async def put(self, spec: Spec, written: bool = False) -> None:
+        """Cache ``spec``; ``written`` marks a new version this worker just stored."""
+        if not self.enabled:
+            return
+        self._store(spec)
+        if self._redis is not None:
+            try:
+                # A read-through fill must not overwrite a newer version another worker wrote
+                await self._redis.set(self._redis_key(spec.id), spec.model_dump_json(), ex=int(self.ttl), nx=not written)
+            except Exception as e:
+                logger.warning(f"Redis spec cache write failed: {e}")
+
+    async def invalidate(self, spec_id: str) -> None:
+        self.evict(spec_id)
+        if self._redis is not None:
+            try:
+                await self._redis.delete(self._redis_key(spec_id))
+            except Exception as e:
+                logger.warning(f"Redis spec cache delete failed: {e}")
+
+    def evict(self, spec_id: str, newer_than: Optional[int] = None) -> None:
+        """Drop the local entry (only if it is older than ``newer_than``, when given)."""
+        entry = self._entries.get(spec_id)
+        if entry is not None and (newer_than is None or entry[0] < newer_than):
+            del self._entries[spec_id]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+# Global spec cache instance, shared by every SpecService instance
+spec_cache = SpecCache(
+    max_entries=settings.SPEC_CACHE_MAX_ENTRIES,
+    ttl=settings.SPEC_CACHE_TTL,
+    redis_url=settings.SPEC_CACHE_REDIS_URL,
+)
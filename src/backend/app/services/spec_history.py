@@ -0,0 +1,114 @@
+"""
+Delta encoding for spec version history.
+
+A version record stores the spec as a zlib-compressed, base64 JSON payload
+that is either a full snapshot or a delta against the previous version.
+Deltas hold only the changed fields; long text fields that were edited
+(rather than replaced) are stored as line-level edits. A snapshot is
+written every ``snapshot_every`` versions to bound reconstruction. Records
+written before this encoding (a plain ``spec_data`` dict) read as
+snapshots.
+"""
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional
+import base64
+import json
+import logging
+import zlib
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT = "snapshot"
+DELTA = "delta"
+# Shorter strings are cheaper to store whole than as line edits
+TEXT_DIFF_MIN_CHARS = 512
+
+
+def _pack(payload: Dict[str, Any]) -> str:
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.b64encode(zlib.compress(raw, 6)).decode("ascii")
+
+
+def _unpack(data: str) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(base64.b64decode(data)).decode("utf-8"))
+
+
+def _text_edits(old: str, new: str) -> List[List[Any]]:
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    return [[i1, i2, new_lines[j1:j2]] for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"]
+
+
+def _apply_text_edits(old: str, edits: List[List[Any]]) -> str:
+    old_lines = old.splitlines(keepends=True)
+    out: List[str] = []
+    pos = 0
+    for i1, i2, lines in edits:
+        out.extend(old_lines[pos:i1])
+        out.extend(lines)
+        pos = i2
+    out.extend(old_lines[pos:])
+    return "".join(out)
+
+
+def diff(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    changes: Dict[str, Any] = {"set": {}, "unset": [k for k in previous if k not in current], "text": {}}
+    for key, value in current.items():
+        old = previous.get(key)
+        if key in previous and old == value:
+            continue
+        if isinstance(old, str) and isinstance(value, str) and min(len(old), len(value)) >= TEXT_DIFF_MIN_CHARS:
+            edits = _text_edits(old, value)
+            # Fall back to the whole value when most of the text changed
+            if sum(len("".join(lines)) for _, _, lines in edits) < len(value) // 2:
+                changes["text"][key] = edits
+                continue
+        changes["set"][key] = value
+    return changes
+
+
+def patch(previous: Dict[str, Any], changes: Dict[str, Any]) -> Dict[str, Any]:
+    current = {k: v for k, v in previous.items() if k not in changes.get("unset", [])}
+    current.update(changes.get("set", {}))
+    for key, edits in changes.get("text", {}).items():
+        current[key] = _apply_text_edits(previous.get(key) or "", edits)
+    return current
+
+
+def encode_version(
+    spec_data: Dict[str, Any],
+    version: int,
+    previous: Optional[Dict[str, Any]] = None,
+    snapshot_every: int = 10,
+) -> Dict[str, Any]:
+    """Storage fields for one version record: ``encoding``, ``base_version`` and ``data``."""
+    if previous is None or snapshot_every <= 1 or (version - 1) % snapshot_every == 0:
+        return {"encoding": SNAPSHOT, "base_version": None, "data": _pack(spec_data)}
+    return {"encoding": DELTA, "base_version": version - 1, "data": _pack(diff(previous, spec_data))}
+
+
+def decode_versions(records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rebuild ``spec_data`` for every record, returned newest first without the encoded payload."""
+    decoded: List[Dict[str, Any]] = []
+    state: Optional[Dict[str, Any]] = None
+    state_version: Optional[int] = None
+    for record in sorted(records, key=lambda r: r.get("version", 0)):
+        out = {k: v for k, v in record.items() if k not in ("data", "encoding", "base_version")}
+        try:
+            if "spec_data" in record:
+                state = record["spec_data"]
+            elif record.get("encoding") == DELTA:
+                if state is None or state_version != record.get("base_version"):
+                    raise ValueError(f"missing base version {record.get('base_version')}")
+                state = patch(state, _unpack(record["data"]))
+            else:
+                state = _unpack(record["data"])
+            state_version = record.get("version")
+        except Exception as e:
+            logger.warning(f"Cannot reconstruct version {record.get('version')} of spec {record.get('spec_id')}: {e}")
+            state = state_version = None
+        out["spec_data"] = state
+        decoded.append(out)
+    decoded.reverse()
+    return decoded
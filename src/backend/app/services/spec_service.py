@@ -1,65 +1,57 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+import asyncio
 import logging
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 import os
-from azure.cosmos import CosmosClient, PartitionKey
-from azure.cosmos.exceptions import CosmosResourceNotFoundError
-from azure.identity import DefaultAzureCredential
-from ..models.schemas import Spec, SpecCreateRequest
+from azure.cosmos.aio import ContainerProxy
+from azure.core import MatchConditions
+from azure.cosmos.exceptions import CosmosAccessConditionFailedError, CosmosResourceExistsError, CosmosResourceNotFoundError
+from ..models.schemas import Spec, SpecCreateRequest, SpecSummary
 from ..core.config import settings
+from .cosmos_client import cosmos_clients, cosmos_endpoint
+from .spec_cache import spec_cache
+from .spec_history import decode_versions, encode_version
+from .feature_numbers import FeatureNumberAllocator
 
 logger = logging.getLogger(__name__)
 
+# Every summary lives in one logical partition, so a listing page is a
+# single-partition query instead of a fan-out across the specs container
+SUMMARY_PARTITION = "spec"
+SUMMARY_PROJECTION = ", ".join(f"c.{field}" for field in SpecSummary.model_fields)
+
 class SpecService:
     def __init__(self):
-        self._cosmos_client = None
-        self._database = None
-        self._container = None
-        self._init_cosmos()
+        self._cosmos_failed = False
+        self._container_id = getattr(settings, 'COSMOS_CONTAINER_ID', os.getenv('COSMOS_CONTAINER_ID', 'specs'))
+        self._summary_container_id = settings.COSMOS_SUMMARY_CONTAINER_ID
+        self._feature_numbers = FeatureNumberAllocator(block_size=settings.FEATURE_NUMBER_BLOCK_SIZE)
+        self._memory_feature_number: Optional[int] = None
+        self._cache = spec_cache
+        if not cosmos_endpoint():
+            logger.warning("Cosmos DB not configured, falling back to in-memory storage")
+        self._init_fallback_storage()
     
-    def _init_cosmos(self) -> None:
+    async def _get_container(self) -> Optional[ContainerProxy]:
+        if self._cosmos_failed or not cosmos_endpoint():
+            return None
         try:
-            endpoint = getattr(settings, 'COSMOS_ENDPOINT', os.getenv('COSMOS_ENDPOINT'))
-            
-            if endpoint:
-                try:
-                    credential = DefaultAzureCredential()
-                    self._cosmos_client = CosmosClient(endpoint, credential)
-                    logger.info("Using AAD authentication for Cosmos DB")
-                except Exception as aad_error:
-                    logger.warning(f"AAD authentication failed: {aad_error}")
-                    
-                    if hasattr(settings, 'COSMOS_CONNECTION_STRING') and settings.COSMOS_CONNECTION_STRING:
-                        self._cosmos_client = CosmosClient.from_connection_string(settings.COSMOS_CONNECTION_STRING)
-                        logger.info("Using connection string authentication for Cosmos DB")
-                    else:
-                        key = getattr(settings, 'COSMOS_KEY', os.getenv('COSMOS_KEY'))
-                        if key:
-                            self._cosmos_client = CosmosClient(endpoint, key)
-                            logger.info("Using key-based authentication for Cosmos DB")
-            
-            if self._cosmos_client:
-                database_id = getattr(settings, 'COSMOS_DATABASE_ID', os.getenv('COSMOS_DATABASE_ID', 'aifoundry'))
-                container_id = getattr(settings, 'COSMOS_CONTAINER_ID', os.getenv('COSMOS_CONTAINER_ID', 'specs'))
-                
-                self._database = self._cosmos_client.create_database_if_not_exists(id=database_id)
-                self._container = self._database.create_container_if_not_exists(
-                    id=container_id,
-                    partition_key=PartitionKey(path="/id"),
-                    offer_throughput=400
-                )
-                logger.info("Cosmos DB initialized successfully")
-                self._init_fallback_storage()
-            else:
-                logger.warning("Cosmos DB not configured, falling back to in-memory storage")
-                self._init_fallback_storage()
+            return await cosmos_clients.container(self._container_id, "/id", offer_throughput=400)
         except Exception as e:
             logger.error(f"Failed to initialize Cosmos DB: {e}")
-            self._cosmos_client = None
-            self._container = None
             logger.warning("Falling back to in-memory storage due to Cosmos DB error")
-            self._init_fallback_storage()
+            self._cosmos_failed = True
+            return None
+    
+    async def _get_summary_container(self) -> Optional[ContainerProxy]:
+        if not await self._get_container():
+            return None
+        try:
+            return await cosmos_clients.container(self._summary_container_id, "/kind", offer_throughput=400)
+        except Exception as e:
+            logger.error(f"Failed to initialize spec summary container: {e}")
+            return None
     
     def _init_fallback_storage(self) -> None:
         """Initialize in-memory storage as fallback when Cosmos DB is not available"""
@@ -71,56 +63,87 @@ class SpecService:
         
         logger.info("Initialized in-memory storage for specs")
     
-    def get_all_specs(self) -> List[Spec]:
+    async def get_all_specs(self) -> List[Spec]:
         if hasattr(self, '_memory_specs') and self._memory_specs:
             return list(self._memory_specs.values())
         
-        if not self._container:
+        container = await self._get_container()
+        if not container:
             return []
         
         try:
-            items = list(self._container.query_items(
-                query="SELECT * FROM c WHERE c.type = 'spec' ORDER BY c.created_at DESC",
-                enable_cross_partition_query=True
-            ))
+            items = [item async for item in container.query_items(
+                query="SELECT * FROM c WHERE c.type = 'spec' ORDER BY c.created_at DESC"
+            )]
             return [Spec(**item) for item in items]
         except Exception as e:
             logger.error(f"Error fetching specs: {e}")
             return []
     
-    def get_spec_by_id(self, spec_id: str) -> Optional[Spec]:
-        if not self._container:
+    async def list_spec_summaries(self, limit: int, continuation: Optional[str] = None) -> Tuple[List[SpecSummary], Optional[str]]:
+        """One page of spec summaries, newest first, and the token for the next page (None on the last)."""
+        container = await self._get_summary_container()
+        if not container:
+            # In-memory pages are addressed by offset
+            specs = sorted(getattr(self, '_memory_specs', {}).values(), key=lambda s: s.created_at, reverse=True)
+            start = int(continuation) if continuation and continuation.isdigit() else 0
+            end = start + limit
+            return [SpecSummary(**s.model_dump()) for s in specs[start:end]], str(end) if end < len(specs) else None
+        
+        try:
+            pages = container.query_items(
+                query=f"SELECT {SUMMARY_PROJECTION} FROM c WHERE c.kind = @kind ORDER BY c.created_at DESC",
+                parameters=[{"name": "@kind", "value": SUMMARY_PARTITION}],
+                partition_key=SUMMARY_PARTITION,
+                max_item_count=limit
+            ).by_page(continuation)
+            async for page in pages:
+                items = [item async for item in page]
+                return [SpecSummary(**item) for item in items], pages.continuation_token
+        except Exception as e:
+            logger.error(f"Error listing spec summaries: {e}")
+        return [], None
+    
+    async def get_spec_by_id(self, spec_id: str, use_cache: bool = True) -> Optional[Spec]:
+        container = await self._get_container()
+        if not container:
             if hasattr(self, '_memory_specs'):
                 return self._memory_specs.get(spec_id)
             return None
         
+        cached = await self._cache.get(spec_id) if use_cache else None
+        if cached is not None:
+            return cached
+        
         try:
-            item = self._container.read_item(item=spec_id, partition_key=spec_id)
-            return Spec(**item)
+            item = await container.read_item(item=spec_id, partition_key=spec_id)
+            spec = Spec(**item)
+            await self._cache.put(spec)
+            return spec
         except CosmosResourceNotFoundError:
             return None
         except Exception as e:
             logger.error(f"Error fetching spec {spec_id}: {e}")
             return None
     
-    def get_spec_versions(self, spec_id: str) -> List[Dict[str, Any]]:
-        if not self._container:
-            return []
+    async def get_spec_versions(self, spec_id: str) -> List[Dict[str, Any]]:
+        container = await self._get_container()
+        if not container:
+            return decode_versions(getattr(self, '_memory_versions', {}).get(spec_id, []))
         
         try:
-            items = list(self._container.query_items(
+            items = [item async for item in container.query_items(
                 query="SELECT * FROM c WHERE c.spec_id = @spec_id AND c.type = 'spec_version' ORDER BY c.version DESC",
-                parameters=[{"name": "@spec_id", "value": spec_id}],
-                enable_cross_partition_query=True
-            ))
-            return items
+                parameters=[{"name": "@spec_id", "value": spec_id}]
+            )]
+            return decode_versions(items)
         except Exception as e:
             logger.error(f"Error fetching spec versions for {spec_id}: {e}")
             return []
     
-    def create_spec(self, request: SpecCreateRequest) -> Spec:
+    async def create_spec(self, request: SpecCreateRequest) -> Spec:
         spec_id = str(uuid.uuid4())
-        feature_number = self._generate_feature_number()
+        feature_number = await self.allocate_feature_number()
         branch_name = f"{feature_number}-{self._slugify(request.title)}"
         
         new_spec = Spec(
@@ -141,13 +164,16 @@ class SpecService:
             constitutional_compliance={}
         )
         
-        if self._container:
+        container = await self._get_container()
+        if container:
             try:
                 spec_dict = new_spec.model_dump()
                 spec_dict['type'] = 'spec'
-                self._container.create_item(body=spec_dict)
+                await container.create_item(body=spec_dict)
+                await self._cache.put(new_spec, written=True)
+                await self._index_summary(new_spec)
                 
-                self._create_version_record(spec_id, 1, "Initial specification created", spec_dict)
+                await self._create_version_record(self._version_record(spec_id, 1, "Initial specification created", spec_dict))
             except Exception as e:
                 logger.error(f"Error creating spec in Cosmos DB: {e}")
         else:
@@ -155,17 +181,14 @@ class SpecService:
                 self._memory_specs[spec_id] = new_spec
                 if not hasattr(self, '_memory_versions'):
                     self._memory_versions = {}
-                self._memory_versions[spec_id] = [{
-                    "version": 1,
-                    "change_description": "Initial specification created",
-                    "timestamp": datetime.now().isoformat(),
-                    "spec_data": new_spec.model_dump()
-                }]
+                self._memory_versions[spec_id] = [
+                    self._version_record(spec_id, 1, "Initial specification created", new_spec.model_dump())
+                ]
         
         return new_spec
     
-    def update_spec(self, spec_id: str, request: SpecCreateRequest) -> Optional[Spec]:
-        current_spec = self.get_spec_by_id(spec_id)
+    async def update_spec(self, spec_id: str, request: SpecCreateRequest) -> Optional[Spec]:
+        current_spec = await self.get_spec_by_id(spec_id, use_cache=False)
         if not current_spec:
             return None
         
@@ -187,32 +210,37 @@ class SpecService:
             constitutional_compliance=getattr(current_spec, 'constitutional_compliance', {})
         )
         
-        if self._container:
+        container = await self._get_container()
+        if container:
             try:
                 spec_dict = updated_spec.model_dump()
                 spec_dict['type'] = 'spec'
-                self._container.replace_item(item=spec_id, body=spec_dict)
+                await container.replace_item(item=spec_id, body=spec_dict)
+                await self._cache.put(updated_spec, written=True)
+                await self._index_summary(updated_spec)
                 
-                self._create_version_record(spec_id, updated_spec.version, "Specification updated", spec_dict)
+                await self._create_version_record(self._version_record(
+                    spec_id, updated_spec.version, "Specification updated", spec_dict,
+                    previous={**current_spec.model_dump(), 'type': 'spec'}
+                ))
             except Exception as e:
                 logger.error(f"Error updating spec in Cosmos DB: {e}")
+                await self._cache.invalidate(spec_id)
         else:
             if hasattr(self, '_memory_specs'):
                 self._memory_specs[spec_id] = updated_spec
                 if hasattr(self, '_memory_versions'):
                     if spec_id not in self._memory_versions:
                         self._memory_versions[spec_id] = []
-                    self._memory_versions[spec_id].append({
-                        "version": updated_spec.version,
-                        "change_description": "Specification updated",
-                        "timestamp": datetime.now().isoformat(),
-                        "spec_data": updated_spec.model_dump()
-                    })
+                    self._memory_versions[spec_id].append(self._version_record(
+                        spec_id, updated_spec.version, "Specification updated", updated_spec.model_dump(),
+                        previous=current_spec.model_dump()
+                    ))
         
         return updated_spec
     
-    def update_spec_phase(self, spec_id: str, phase: str, **kwargs) -> Optional[Spec]:
-        current_spec = self.get_spec_by_id(spec_id)
+    async def update_spec_phase(self, spec_id: str, phase: str, **kwargs) -> Optional[Spec]:
+        current_spec = await self.get_spec_by_id(spec_id, use_cache=False)
         if not current_spec:
             return None
         
@@ -235,18 +263,25 @@ class SpecService:
             planning=kwargs.get('planning', getattr(current_spec, 'planning', None))
         )
         
-        if self._container:
+        container = await self._get_container()
+        if container:
             try:
                 spec_dict = updated_spec.model_dump()
                 spec_dict['type'] = 'spec'
-                self._container.replace_item(item=spec_id, body=spec_dict)
+                await container.replace_item(item=spec_id, body=spec_dict)
+                await self._cache.put(updated_spec, written=True)
+                await self._index_summary(updated_spec)
                 
                 change_description = f"Phase updated to {phase}"
                 if kwargs:
                     change_description += f" with changes: {', '.join(kwargs.keys())}"
-                self._create_version_record(spec_id, updated_spec.version, change_description, spec_dict)
+                await self._create_version_record(self._version_record(
+                    spec_id, updated_spec.version, change_description, spec_dict,
+                    previous={**current_spec.model_dump(), 'type': 'spec'}
+                ))
             except Exception as e:
                 logger.error(f"Error updating spec phase in Cosmos DB: {e}")
+                await self._cache.invalidate(spec_id)
         else:
             if hasattr(self, '_memory_specs'):
                 self._memory_specs[spec_id] = updated_spec
@@ -256,49 +291,151 @@ class SpecService:
                     change_description = f"Phase updated to {phase}"
                     if kwargs:
                         change_description += f" with changes: {', '.join(kwargs.keys())}"
-                    self._memory_versions[spec_id].append({
-                        "version": updated_spec.version,
-                        "change_description": change_description,
-                        "timestamp": datetime.now().isoformat(),
-                        "spec_data": updated_spec.model_dump()
-                    })
+                    self._memory_versions[spec_id].append(self._version_record(
+                        spec_id, updated_spec.version, change_description, updated_spec.model_dump(),
+                        previous=current_spec.model_dump()
+                    ))
         
         return updated_spec
     
-    def _generate_feature_number(self) -> str:
-        if not self._container:
-            return "001"
+    async def _index_summary(self, spec: Spec) -> bool:
+        return await self._upsert_summary(SpecSummary(**spec.model_dump()))
+    
+    async def _upsert_summary(self, summary: SpecSummary) -> bool:
+        """Write ``summary`` unless the same or a newer version is indexed; False if the write failed."""
+        container = await self._get_summary_container()
+        if not container:
+            return False
+        body = {**summary.model_dump(), "kind": SUMMARY_PARTITION}
+        for _ in range(3):
+            try:
+                try:
+                    current = await container.read_item(item=summary.id, partition_key=SUMMARY_PARTITION)
+                except CosmosResourceNotFoundError:
+                    await container.create_item(body=body)
+                    return True
+                if current.get('version', 0) >= summary.version:
+                    return True
+                await container.replace_item(
+                    item=summary.id, body=body,
+                    etag=current.get('_etag'), match_condition=MatchConditions.IfNotModified
+                )
+                return True
+            except (CosmosAccessConditionFailedError, CosmosResourceExistsError):
+                continue  # a concurrent write won; re-read and compare versions
+            except Exception as e:
+                logger.error(f"Error indexing summary for spec {summary.id}: {e}")
+                return False
+        logger.warning(f"Gave up indexing summary for spec {summary.id} after repeated conflicts")
+        return False
+    
+    async def reconcile_summaries(self) -> None:
+        """Index every spec whose summary is missing or older than the spec itself."""
+        container = await self._get_container()
+        summaries = await self._get_summary_container()
+        if not container or not summaries:
+            return
+        try:
+            indexed = {item['id']: item.get('version', 0) async for item in summaries.query_items(
+                query="SELECT c.id, c.version FROM c", partition_key=SUMMARY_PARTITION
+            )}
+            repaired = 0
+            async for item in container.query_items(
+                query=f"SELECT {SUMMARY_PROJECTION} FROM c WHERE c.type = 'spec'"
+            ):
+                summary = SpecSummary(**item)
+                if indexed.get(summary.id, 0) < summary.version and await self._upsert_summary(summary):
+                    repaired += 1
+            if repaired:
+                logger.info(f"Reconciled {repaired} spec summaries")
+        except Exception as e:
+            logger.error(f"Error reconciling spec summaries: {e}")
+    
+    async def follow_change_feed(self, interval: float = 5.0) -> None:
+        """Evict cached specs that other workers updated and index their summaries, until cancelled."""
+        container = await self._get_container()
+        if not container:
+            return
+        # Until a page hands back a continuation, polls start from when following
+        # began, so a first batch that fails to index is read again, not skipped
+        started = datetime.now(timezone.utc)
+        continuation = None
+        while True:
+            try:
+                if continuation is None:
+                    feed = container.query_items_change_feed(start_time=started)
+                else:
+                    feed = container.query_items_change_feed(continuation=continuation)
+                # The pager keeps its own continuation; the client's last response
+                # headers are shared with every other request on the pooled client
+                pages = feed.by_page()
+                async for page in pages:
+                    # Taken before the summary writes below make requests of their own
+                    token = pages.continuation_token
+                    indexed = True
+                    async for item in page:
+                        if item.get('type') == 'spec':
+                            self._cache.evict(item['id'], newer_than=item.get('version'))
+                            # Covers writes whose own summary update failed or came from older workers
+                            indexed = await self._upsert_summary(SpecSummary(**item)) and indexed
+                    if not indexed:
+                        break  # re-read this page next poll
+                    continuation = token or continuation
+            except Exception as e:
+                logger.warning(f"Spec change feed poll failed: {e}")
+            await asyncio.sleep(interval)
+    
+    async def allocate_feature_number(self) -> str:
+        container = await self._get_container()
+        if not container:
+            if self._memory_feature_number is None:
+                self._memory_feature_number = max(
+                    (int(s.feature_number) for s in getattr(self, '_memory_specs', {}).values()
+                     if s.feature_number and s.feature_number.isdigit()),
+                    default=0
+                )
+            self._memory_feature_number += 1
+            return f"{self._memory_feature_number:03d}"
         
+        # No fallback on failure: any number minted outside the counter could collide
         try:
-            items = list(self._container.query_items(
-                query="SELECT VALUE MAX(TONUMBER(c.feature_number)) FROM c WHERE c.type = 'spec'",
-                enable_cross_partition_query=True
-            ))
-            max_num = items[0] if items and items[0] else 0
-            return f"{max_num + 1:03d}"
+            number = await self._feature_numbers.allocate(container, lambda: self._max_feature_number(container))
         except Exception as e:
-            logger.error(f"Error generating feature number: {e}")
-            return "001"
+            logger.error(f"Error allocating feature number from counter: {e}")
+            raise
+        return f"{number:03d}"
+    
+    async def _max_feature_number(self, container: ContainerProxy) -> int:
+        """Highest feature number in use; seeds the counter, so errors propagate rather than read as 0."""
+        items = [item async for item in container.query_items(
+            query="SELECT VALUE MAX(TONUMBER(c.feature_number)) FROM c WHERE c.type = 'spec'"
+        )]
+        return items[0] if items and items[0] else 0
     
     def _slugify(self, text: str) -> str:
         import re
         return re.sub(r'[^a-zA-Z0-9]+', '-', text.lower()).strip('-')
     
-    def _create_version_record(self, spec_id: str, version: int, change_description: str, spec_data: Dict[str, Any]) -> None:
-        if not self._container:
+    def _version_record(self, spec_id: str, version: int, change_description: str, spec_data: Dict[str, Any],
+                        previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """A version record holding a compressed snapshot, or a delta against ``previous``."""
+        return {
+            "id": f"{spec_id}-v{version}",
+            "spec_id": spec_id,
+            "version": version,
+            "change_description": change_description,
+            "timestamp": datetime.now().isoformat(),
+            "type": "spec_version",
+            **encode_version(spec_data, version, previous, settings.SPEC_HISTORY_SNAPSHOT_EVERY)
+        }
+    
+    async def _create_version_record(self, version_record: Dict[str, Any]) -> None:
+        container = await self._get_container()
+        if not container:
             return
         
         try:
-            version_record = {
-                "id": f"{spec_id}-v{version}",
-                "spec_id": spec_id,
-                "version": version,
-                "change_description": change_description,
-                "timestamp": datetime.now().isoformat(),
-                "spec_data": spec_data,
-                "type": "spec_version"
-            }
-            self._container.create_item(body=version_record)
+            await container.create_item(body=version_record)
         except Exception as e:
             logger.error(f"Error creating version record: {e}")
     
@@ -324,11 +461,12 @@ class SpecService:
                         # Create initial version record
                         if not hasattr(self, '_memory_versions'):
                             self._memory_versions = {}
+                        # Snapshot the model, not the raw JSON, so later deltas apply to the same fields
                         self._memory_versions[spec.id] = [{
                             "version": 1,
                             "change_description": "Starter specification loaded",
                             "timestamp": spec.created_at,
-                            "spec_data": spec_dict
+                            "spec_data": spec.model_dump()
                         }]
                     except Exception as spec_error:
                         logger.warning(f"Skipping invalid spec in specs.json: {spec_error}")
@@ -1,97 +1,190 @@
-from typing import List, Optional, Dict
+from typing import Iterator, List, Optional, Tuple
 from pathlib import Path
-import json
+import base64
 import logging
-from ..models.schemas import Template, FilterOptions
+import threading
+from ..models.schemas import Template, FilterOptions, FacetCounts, TemplatePage
+from .catalog_snapshot import CatalogSnapshot, SORT_KEYS, source_stamp
+from .facet_index import iter_ordinals, to_mask
 
 logger = logging.getLogger(__name__)
 
+# Below this match density a page is built by ranking the matches rather
+# than walking the full presorted order.
+SPARSE_MATCH_RATIO = 8
+
+
+def encode_cursor(version: str, position: int) -> str:
+    return base64.urlsafe_b64encode(f"p:{version}:{position}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """The catalog version and position a cursor was issued for."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefix, version, position = raw.split(":", 2)
+        if prefix != "p" or int(position) < 0:
+            raise ValueError
+        return version, int(position)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+
 class TemplateService:
-    def __init__(self):
-        self.catalog_path = Path(__file__).parent.parent / "catalog.json"
-        self.featured_path = Path(__file__).parent.parent / "featured.json"
-        self._templates_data: List[Template] = []
-        self._template_by_id: Dict[str, Template] = {}
-        self._load_catalog()
+    def __init__(self, catalog_path: Optional[Path] = None, featured_path: Optional[Path] = None):
+        self.catalog_path = catalog_path or Path(__file__).parent.parent / "catalog.json"
+        self.featured_path = featured_path or Path(__file__).parent.parent / "featured.json"
+        self._reload_lock = threading.Lock()
+        self._stop_watching = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._snapshot = CatalogSnapshot.load(self.catalog_path, self.featured_path)
+        self._stamp = self._snapshot.stamp
     
-    def _load_catalog(self) -> None:
-        items: List[Template] = []
-        raw: List[Dict] = []
-        
-        if self.catalog_path.exists():
-            with self.catalog_path.open("r", encoding="utf-8") as f:
-                raw = json.load(f)
-        else:
-            logger.warning("catalog.json not found; returning empty catalog")
-        
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        """Current catalog snapshot; hold on to it for the length of a request."""
+        return self._snapshot
+    
+    @property
+    def catalog_version(self) -> str:
+        return self._snapshot.version
+    
+    def reload_if_changed(self) -> bool:
+        """
+        Rebuild the catalog if catalog.json or featured.json changed on disk
+        and publish it with a single reference swap. Returns True when a new
+        snapshot was published. Readers are never blocked; concurrent
+        reloads are skipped rather than queued.
+        """
+        if source_stamp(self.catalog_path, self.featured_path) == self._stamp:
+            return False
+        if not self._reload_lock.acquire(blocking=False):
+            return False
         try:
-            with self.featured_path.open("r", encoding="utf-8") as f:
-                featured_urls = set(json.load(f))
-        except FileNotFoundError:
-            featured_urls = set()
-        
-        for obj in raw:
+            current = self._snapshot
             try:
-                is_featured = obj.get("github_url") in featured_urls or obj.get("is_featured", False)
-                obj["is_featured"] = bool(is_featured)
-                items.append(Template(**obj))
+                fresh = CatalogSnapshot.load(self.catalog_path, self.featured_path)
             except Exception as e:
-                logger.warning(f"Skipping invalid template: {e}")
+                logger.error(f"Catalog reload failed, keeping version {current.version}: {e}")
+                return False
+            self._stamp = fresh.stamp
+            if fresh.version == current.version:
+                # Touched but unchanged; keep the snapshot readers already hold
+                return False
+            self._snapshot = fresh
+            logger.info(f"Catalog reloaded: version {current.version} -> {fresh.version} ({len(fresh)} templates)")
+            return True
+        finally:
+            self._reload_lock.release()
+    
+    def start_watching(self, interval: float) -> None:
+        """Poll the catalog files every ``interval`` seconds on a daemon thread."""
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._stop_watching.clear()
+        
+        def _watch() -> None:
+            while not self._stop_watching.wait(interval):
+                try:
+                    self.reload_if_changed()
+                except Exception as e:
+                    logger.error(f"Catalog watcher error: {e}")
         
-        self._templates_data = items
-        self._template_by_id = {t.id: t for t in items}
+        self._watcher = threading.Thread(target=_watch, name="catalog-watcher", daemon=True)
+        self._watcher.start()
+    
+    def stop_watching(self) -> None:
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
     
     def get_all_templates(self) -> List[Template]:
-        return self._templates_data
+        snap = self._snapshot
+        return [snap.template(i) for i in range(len(snap))]
     
     def get_template_by_id(self, template_id: str) -> Optional[Template]:
-        return self._template_by_id.get(template_id)
+        return self._snapshot.get(template_id)
     
     def get_featured_templates(self) -> List[Template]:
-        return [t for t in self._templates_data if t.is_featured]
+        snap = self._snapshot
+        return [snap.template(i) for i in iter_ordinals(snap.facet_index.featured_mask)]
+    
+    def _search_mask(self, snap: CatalogSnapshot, search: Optional[str]) -> Optional[int]:
+        if not search:
+            return None
+        ordinals = snap.search_index.search(search)
+        return None if ordinals is None else to_mask(ordinals)
     
     def filter_templates(self, search: Optional[str] = None, task: Optional[str] = None,
                         language: Optional[str] = None, collection: Optional[str] = None,
                         model: Optional[str] = None, database: Optional[str] = None,
                         sort: Optional[str] = "Most Popular") -> List[Template]:
-        filtered = list(self._templates_data)
-
-        if search:
-            s = search.lower()
-            filtered = [t for t in filtered if s in t.title.lower() or s in t.description.lower()]
-
-        if task:
-            filtered = [t for t in filtered if task == t.task or task in t.tags]
-
-        if language:
-            filtered = [t for t in filtered if language in t.languages]
-
-        if collection:
-            filtered = [t for t in filtered if t.collection == collection]
+        return self.page_templates(search, task, language, collection, model, database, sort).items
+    
+    @staticmethod
+    def _ranked_positions(snap: CatalogSnapshot, matched: List[int], sort_name: str, start: int) -> Iterator[int]:
+        order = snap.sort_orders[sort_name]
+        if len(matched) * SPARSE_MATCH_RATIO < len(order):
+            rank = snap.sort_ranks[sort_name]
+            yield from sorted(p for p in (rank[o] for o in matched) if p >= start)
+            return
+        members = set(matched)
+        for position in range(start, len(order)):
+            if order[position] in members:
+                yield position
+    
+    def page_templates(self, search: Optional[str] = None, task: Optional[str] = None,
+                       language: Optional[str] = None, collection: Optional[str] = None,
+                       model: Optional[str] = None, database: Optional[str] = None,
+                       sort: Optional[str] = "Most Popular", offset: int = 0,
+                       limit: Optional[int] = None, cursor: Optional[str] = None) -> TemplatePage:
+        """
+        Return one page of matching templates in sort order.
 
-        if model:
-            filtered = [t for t in filtered if model in t.models]
+        A cursor is a position in the presorted order of one catalog version
+        and takes precedence over offset. Raises ValueError for a malformed
+        cursor, or one issued before a reload swapped the catalog (its
+        position would skip or repeat entries in the new order).
+        """
+        snap = self._snapshot
+        selection = {"task": task, "language": language, "collection": collection,
+                     "model": model, "database": database}
+        mask = snap.facet_index.selection_mask(selection)
+        search_mask = self._search_mask(snap, search)
+        if search_mask is not None:
+            mask &= search_mask
+        matched = iter_ordinals(mask)
 
-        if database:
-            filtered = [t for t in filtered if database in t.databases]
+        sort_name = sort if sort in SORT_KEYS else ""
+        order = snap.sort_orders[sort_name]
+        start = 0
+        if cursor:
+            version, start = decode_cursor(cursor)
+            if version != snap.version:
+                raise ValueError("The catalog changed since this cursor was issued; start again from the first page")
+        skip = 0 if cursor else max(offset, 0)
 
-        if sort == "Most Popular":
-            filtered.sort(key=lambda t: t.star_count, reverse=True)
-        elif sort == "Most Recent":
-            filtered.sort(key=lambda t: t.created_at or "", reverse=True)
-        elif sort == "Most Forked":
-            filtered.sort(key=lambda t: t.fork_count, reverse=True)
+        items: List[Template] = []
+        next_cursor = None
+        for position in self._ranked_positions(snap, matched, sort_name, start):
+            if skip:
+                skip -= 1
+                continue
+            if limit is not None and len(items) >= limit:
+                next_cursor = encode_cursor(snap.version, position)
+                break
+            items.append(snap.template(order[position]))
 
-        return filtered
+        return TemplatePage(items=items, total=len(matched), next_cursor=next_cursor)
     
     def get_filter_options(self) -> FilterOptions:
-        tasks = sorted({t.task for t in self._templates_data if t.task})
-        languages = sorted({lang for t in self._templates_data for lang in t.languages})
-        collections = sorted({t.collection for t in self._templates_data if t.collection})
-        models = sorted({m for t in self._templates_data for m in t.models})
-        databases = sorted({d for t in self._templates_data for d in t.databases})
-        patterns = sorted({t.pattern for t in self._templates_data if t.pattern})
-        return FilterOptions(
-            tasks=tasks, languages=languages, collections=collections,
-            models=models, databases=databases, patterns=patterns
-        )
+        return self._snapshot.facet_index.filter_options()
+    
+    def get_facet_counts(self, search: Optional[str] = None, task: Optional[str] = None,
+                         language: Optional[str] = None, collection: Optional[str] = None,
+                         model: Optional[str] = None, database: Optional[str] = None) -> FacetCounts:
+        snap = self._snapshot
+        selection = {"task": task, "language": language, "collection": collection,
+                     "model": model, "database": database}
+        return snap.facet_index.counts(selection, self._search_mask(snap, search))
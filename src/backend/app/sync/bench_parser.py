@@ -0,0 +1,87 @@
+"""
+Benchmark the detail-page parsers over a saved corpus.
+
+    python -m app.sync.bench_parser [CORPUS_DIR] [--repeat N] [--workers N]
+
+CORPUS_DIR is either a directory of ``*.html`` files or a sync HTTP cache
+directory (default ``.sync_cache``), from which cached detail pages are used.
+Reports serial throughput of the BeautifulSoup and XPath parsers, the
+throughput of the process-pool stage, and any pages where the two disagree.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+
+from .detail_parser import ParseStage, default_workers, extract_fields, extract_fields_soup
+
+
+def load_corpus(root: Path) -> list[tuple[str, str]]:
+    """(url, html) pairs from ``*.html`` files or an HttpCache directory."""
+    pages = []
+    for path in sorted(root.glob("*.html")):
+        pages.append((path.stem, path.read_text(encoding="utf-8", errors="replace")))
+    for meta_path in sorted(root.glob("*/*.json")):
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except ValueError:
+            continue
+        if "/repo/" not in meta.get("url", ""):
+            continue
+        body = meta_path.with_suffix(".body").read_bytes()
+        pages.append((meta["url"], body.decode("utf-8", errors="replace")))
+    return pages
+
+
+def _fields(html: str, url: str):
+    return extract_fields(html)
+
+
+def time_serial(parse, pages: list[tuple[str, str]], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, html in pages:
+            parse(html)
+    return time.perf_counter() - start
+
+
+async def time_pool(pages: list[tuple[str, str]], repeat: int, workers: int) -> float:
+    with ParseStage(_fields, workers) as stage:
+        url, html = pages[0]
+        await stage(html, url)  # start the workers outside the timing
+        start = time.perf_counter()
+        for _ in range(repeat):
+            await asyncio.gather(*(stage(html, url) for url, html in pages))
+        return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("corpus", nargs="?", type=Path, default=Path(".sync_cache"))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=default_workers())
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        raise SystemExit(f"No detail pages found in {args.corpus}")
+    total = len(pages) * args.repeat
+    print(f"{len(pages)} pages x {args.repeat}")
+
+    mismatches = [url for url, html in pages if extract_fields(html) != extract_fields_soup(html)]
+    for name, fn in (("beautifulsoup", extract_fields_soup), ("lxml-xpath", extract_fields)):
+        elapsed = time_serial(fn, pages, args.repeat)
+        print(f"{name:>14}: {total / elapsed:8.0f} pages/s  {elapsed / total * 1000:6.2f} ms/page")
+    elapsed = asyncio.run(time_pool(pages, args.repeat, args.workers))
+    print(f"{'pool x' + str(args.workers):>14}: {total / elapsed:8.0f} pages/s")
+
+    print(f"mismatches: {len(mismatches)}")
+    for url in mismatches[:10]:
+        print(f"  {url}")
+
+
+if __name__ == "__main__":
+    main()
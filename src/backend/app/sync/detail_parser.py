@@ -0,0 +1,123 @@
+"""
+Field extraction for template detail pages, and a process-pool parse stage.
+
+The sync only needs four things from a detail page (title, description,
+GitHub link and chips), so ``extract_fields`` runs a few XPath queries on a
+bare lxml tree instead of building a BeautifulSoup tree and running CSS
+selectors. ``extract_fields_soup`` is the original implementation, kept as
+the reference for the parser benchmark and equivalence tests.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
+import lxml.html
+from lxml import etree
+
+# (title or None, description, github_url, chips)
+Fields = tuple[str | None, str, str, list[str]]
+
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+_TITLE = etree.XPath(f"(//h1 | //*[{_has_class('post-title')}])[1]")
+_META_DESCRIPTION = etree.XPath("(//meta[@name='description'])[1]")
+_FIRST_P = etree.XPath("(//p)[1]")
+_GITHUB_HREF = etree.XPath("(//a[contains(@href, 'github.com')])[1]/@href")
+_CHIPS = etree.XPath(
+    "//*[" + " or ".join(_has_class(c) for c in ("chip", "tag", "Label", "badge")) + "]"
+)
+
+
+def _text(el) -> str:
+    # Same result as BeautifulSoup's get_text(strip=True)
+    return "".join(s.strip() for s in el.itertext() if s.strip())
+
+
+def _document(html: str):
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # Strings carrying an XML encoding declaration must be parsed as bytes
+        return lxml.html.document_fromstring(html.encode("utf-8"))
+    except etree.ParserError:
+        return None
+
+
+def extract_fields(html: str) -> Fields:
+    doc = _document(html)
+    if doc is None:
+        return None, "", "", []
+    title_el = _TITLE(doc)
+    title = _text(title_el[0]) if title_el else None
+
+    meta = _META_DESCRIPTION(doc)
+    if meta:
+        description = meta[0].get("content", "")
+    else:
+        p = _FIRST_P(doc)
+        description = _text(p[0]) if p else ""
+
+    href = _GITHUB_HREF(doc)
+    github_url = href[0].strip() if href else ""
+    chips = [_text(c) for c in _CHIPS(doc)]
+    return title, description, github_url, chips
+
+
+def extract_fields_soup(html: str) -> Fields:
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "lxml")
+    title_el = soup.select_one("h1, header h1, .post-title")
+    title = title_el.get_text(strip=True) if title_el else None
+    desc_el = soup.select_one("meta[name='description']") or soup.select_one("p")
+    description = (
+        desc_el.get("content", "")
+        if desc_el and desc_el.name == "meta"
+        else (desc_el.get_text(strip=True) if desc_el else "")
+    )
+    gh_a = soup.select_one('a[href*="github.com"]')
+    github_url = gh_a["href"].strip() if gh_a else ""
+    chips = [c.get_text(strip=True) for c in soup.select(".chip, .tag, .Label, .badge")]
+    return title, description, github_url, chips
+
+
+def default_workers() -> int:
+    # Leave a core for the event loop doing the fetching
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+class ParseStage:
+    """
+    Runs a parse function in worker processes so CPU-bound parsing overlaps
+    the async fetches instead of stalling the event loop. ``workers=0``
+    parses inline.
+    """
+
+    def __init__(self, parse: Callable[[str, str], dict | None], workers: int | None = None):
+        self.parse = parse
+        self.workers = default_workers() if workers is None else workers
+        self._pool: ProcessPoolExecutor | None = None
+
+    async def __call__(self, html: str, url: str) -> dict | None:
+        if self.workers <= 0:
+            return self.parse(html, url)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers)
+        return await asyncio.get_running_loop().run_in_executor(self._pool, self.parse, html, url)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self) -> "ParseStage":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
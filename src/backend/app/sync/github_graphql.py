@@ -0,0 +1,106 @@
+"""
+Batched repository metadata from the GitHub GraphQL API.
+
+One query fetches many repositories through aliased ``repository`` fields,
+replacing one REST call per repository. Results are reshaped to the REST
+``/repos/{owner}/{repo}`` field names so the sync code can apply either.
+"""
+from __future__ import annotations
+
+from typing import Awaitable, Callable
+
+import httpx
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+
+# Repositories per metadata query; GitHub allows far more, but smaller
+# batches keep query cost and response size low.
+METADATA_BATCH_SIZE = 50
+# README blobs are larger, so fewer per query
+README_BATCH_SIZE = 10
+
+_METADATA_FIELDS = """
+    description
+    stargazerCount
+    forkCount
+    primaryLanguage { name }
+    repositoryTopics(first: 20) { nodes { topic { name } } }
+"""
+
+_README_FIELDS = """
+    readme: object(expression: "HEAD:README.md") { ... on Blob { text } }
+    readmeLower: object(expression: "HEAD:readme.md") { ... on Blob { text } }
+"""
+
+Post = Callable[..., Awaitable[httpx.Response]]
+
+
+class GraphQLError(Exception):
+    pass
+
+
+def build_query(repos: list[tuple[str, str]], fields: str) -> tuple[str, dict]:
+    params = []
+    selections = []
+    variables: dict[str, str] = {}
+    for i, (owner, name) in enumerate(repos):
+        params.append(f"$o{i}: String!, $n{i}: String!")
+        selections.append(f"r{i}: repository(owner: $o{i}, name: $n{i}) {{{fields}}}")
+        variables[f"o{i}"] = owner
+        variables[f"n{i}"] = name
+    query = (
+        f"query({', '.join(params)}) {{\n"
+        + "\n".join(selections)
+        + "\nrateLimit { cost remaining resetAt }\n}"
+    )
+    return query, variables
+
+
+def to_rest_shape(node: dict) -> dict:
+    return {
+        "description": node.get("description") or "",
+        "stargazers_count": node.get("stargazerCount") or 0,
+        "forks_count": node.get("forkCount") or 0,
+        "language": (node.get("primaryLanguage") or {}).get("name"),
+        "topics": [
+            n["topic"]["name"]
+            for n in ((node.get("repositoryTopics") or {}).get("nodes") or [])
+            if n and n.get("topic")
+        ],
+    }
+
+
+async def _query(post: Post, token: str, repos: list[tuple[str, str]], fields: str) -> list[dict | None]:
+    query, variables = build_query(repos, fields)
+    r = await post(
+        GRAPHQL_URL,
+        json={"query": query, "variables": variables},
+        headers={"Authorization": f"bearer {token}", "User-Agent": "aifoundry-sync/gql"},
+    )
+    if r.status_code != 200:
+        raise GraphQLError(f"GraphQL HTTP {r.status_code}")
+    payload = r.json()
+    data = payload.get("data")
+    if not isinstance(data, dict):
+        raise GraphQLError(f"GraphQL errors: {payload.get('errors')}")
+    # Per-repository errors (e.g. NOT_FOUND) come back as null nodes
+    return [data.get(f"r{i}") for i in range(len(repos))]
+
+
+async def fetch_metadata(post: Post, token: str, repos: list[tuple[str, str]]) -> list[dict | None]:
+    """REST-shaped metadata per repo (None where the repo could not be resolved)."""
+    nodes = await _query(post, token, repos, _METADATA_FIELDS)
+    return [to_rest_shape(n) if n else None for n in nodes]
+
+
+async def fetch_readmes(post: Post, token: str, repos: list[tuple[str, str]]) -> list[str | None]:
+    nodes = await _query(post, token, repos, _README_FIELDS)
+    texts: list[str | None] = []
+    for n in nodes:
+        blob = (n or {}).get("readme") or (n or {}).get("readmeLower") or {}
+        texts.append(blob.get("text"))
+    return texts
+
+
+def batches(items: list, size: int) -> list[list]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
@@ -0,0 +1,85 @@
+"""
+On-disk HTTP response cache with ETag / Last-Modified revalidation.
+
+Each cached URL is stored as a metadata JSON file plus the raw body. The
+crawler sends the stored validators on the next request; a 304 is answered
+from disk (and, for api.github.com, does not count against the rate limit).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+import httpx
+
+# Response headers kept with a cached body
+STORED_HEADERS = ("etag", "last-modified", "content-type")
+
+
+class HttpCache:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.hits = 0
+        self.stores = 0
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        key = hashlib.sha256(url.encode()).hexdigest()
+        folder = self.root / key[:2]
+        return folder / f"{key}.json", folder / f"{key}.body"
+
+    def lookup(self, url: str) -> dict | None:
+        meta_path, body_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            meta["body"] = body_path.read_bytes()
+        except (FileNotFoundError, ValueError):
+            return None
+        return meta
+
+    def validators(self, url: str) -> dict[str, str]:
+        """Conditional request headers for a cached URL."""
+        meta = self.lookup(url)
+        if not meta:
+            return {}
+        headers = {}
+        if meta["headers"].get("etag"):
+            headers["If-None-Match"] = meta["headers"]["etag"]
+        if meta["headers"].get("last-modified"):
+            headers["If-Modified-Since"] = meta["headers"]["last-modified"]
+        return headers
+
+    def store(self, url: str, response: httpx.Response) -> None:
+        headers = {k: response.headers[k] for k in STORED_HEADERS if k in response.headers}
+        if "etag" not in headers and "last-modified" not in headers:
+            return
+        meta_path, body_path = self._paths(url)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = body_path.with_suffix(".tmp")
+        tmp.write_bytes(response.content)
+        os.replace(tmp, body_path)
+        meta = {"url": url, "status": response.status_code, "headers": headers, "stored_at": time.time()}
+        tmp = meta_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, meta_path)
+        self.stores += 1
+
+    def replay(self, url: str, request: httpx.Request) -> httpx.Response | None:
+        """Rebuild the cached 200 for a URL that revalidated with 304."""
+        meta = self.lookup(url)
+        if not meta:
+            return None
+        self.hits += 1
+        return httpx.Response(
+            meta.get("status", 200),
+            headers=meta["headers"],
+            content=meta["body"],
+            request=request,
+            extensions={"from_cache": True},
+        )
+
+
+def from_cache(response: httpx.Response) -> bool:
+    return bool(response.extensions.get("from_cache"))
@@ -0,0 +1,330 @@
+"""
+Record/replay harness for benchmarking the catalog sync offline.
+
+``record`` runs a live sync through ``RecordingTransport``, saving every
+response (sitemap, detail pages, GitHub REST and GraphQL) plus the resulting
+catalog to a fixture directory. ``bench`` serves that directory from a local
+stand-in server with configurable latency and GitHub-style rate limits, runs
+the sync against it and compares the output with the recorded catalog.
+
+    python -m app.sync.replay record fixtures/
+    python -m app.sync.replay bench fixtures/ --latency 0.05 --rate-limit api.github.com=5000/3600
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import httpx
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Response headers worth replaying
+REPLAYED_HEADERS = ("content-type", "etag", "last-modified")
+CATALOG_FILE = "catalog.json"
+# Fields that legitimately differ between two runs of the same crawl
+VOLATILE_FIELDS = ("created_at",)
+
+
+def fixture_key(method: str, url: str, body: bytes = b"") -> str:
+    digest = hashlib.sha256(f"{method.upper()} {url}\n".encode())
+    digest.update(body)
+    return digest.hexdigest()
+
+
+class Fixtures:
+    """Recorded responses on disk, one metadata JSON and one body per request."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        folder = self.root / "responses" / key[:2]
+        return folder / f"{key}.json", folder / f"{key}.body"
+
+    def save(self, request: httpx.Request, response: httpx.Response) -> None:
+        key = fixture_key(request.method, str(request.url), request.content)
+        meta_path, body_path = self._paths(key)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        body_path.write_bytes(response.content)
+        meta_path.write_text(json.dumps({
+            "method": request.method,
+            "url": str(request.url),
+            "status": response.status_code,
+            "headers": {k: response.headers[k] for k in REPLAYED_HEADERS if k in response.headers},
+        }), encoding="utf-8")
+
+    def load(self, method: str, url: str, body: bytes = b"") -> tuple[dict, bytes] | None:
+        meta_path, body_path = self._paths(fixture_key(method, url, body))
+        try:
+            return json.loads(meta_path.read_text(encoding="utf-8")), body_path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.root.glob("responses/*/*.json"))
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Pass requests through to ``inner`` and save every response."""
+
+    def __init__(self, fixtures: Fixtures, inner: httpx.AsyncBaseTransport | None = None):
+        self.fixtures = fixtures
+        self.inner = inner or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.inner.handle_async_request(request)
+        await response.aread()
+        self.fixtures.save(request, response)
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+@dataclass
+class RateLimit:
+    """``limit`` requests per ``window`` seconds, answered like GitHub does."""
+
+    limit: int
+    window: float
+    status: int = 403
+
+    @classmethod
+    def parse(cls, spec: str) -> tuple[str, "RateLimit"]:
+        """``host=limit/window[:status]``, e.g. ``api.github.com=5000/3600:429``."""
+        host, _, rule = spec.partition("=")
+        rule, _, status = rule.partition(":")
+        limit, _, window = rule.partition("/")
+        return host, cls(int(limit), float(window or 3600), int(status or 403))
+
+
+class _Window:
+    __slots__ = ("started", "used")
+
+    def __init__(self, started: float):
+        self.started = started
+        self.used = 0
+
+
+class StandInServer:
+    """
+    ASGI app answering recorded requests. The original host comes from the
+    Host header, so the crawler's absolute URLs work unchanged through
+    ``httpx.ASGITransport`` or ``LocalServerTransport``.
+    """
+
+    def __init__(
+        self,
+        fixtures: Fixtures,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        rate_limits: dict[str, RateLimit] | None = None,
+        seed: int = 0,
+        clock=time.time,
+    ):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limits = rate_limits or {}
+        self._random = random.Random(seed)
+        self._clock = clock
+        self._windows: dict[str, _Window] = {}
+        self.requests = 0
+        self.misses = 0
+        self.limited = 0
+
+    def _rate_limit(self, host: str) -> tuple[dict[str, str], Response | None]:
+        rule = self.rate_limits.get(host)
+        if rule is None:
+            return {}, None
+        now = self._clock()
+        window = self._windows.get(host)
+        if window is None or now >= window.started + rule.window:
+            window = self._windows[host] = _Window(now)
+        reset = math.ceil(window.started + rule.window)
+        if window.used >= rule.limit:
+            self.limited += 1
+            headers = {
+                "X-RateLimit-Limit": str(rule.limit),
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset": str(reset),
+                "Retry-After": str(max(1, reset - int(now))),
+            }
+            return headers, Response(b'{"message": "API rate limit exceeded"}', rule.status, headers,
+                                     media_type="application/json")
+        window.used += 1
+        return {
+            "X-RateLimit-Limit": str(rule.limit),
+            "X-RateLimit-Remaining": str(rule.limit - window.used),
+            "X-RateLimit-Reset": str(reset),
+        }, None
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            return
+        request = Request(scope, receive)
+        response = await self.respond(request)
+        await response(scope, receive, send)
+
+    async def respond(self, request: Request) -> Response:
+        self.requests += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self._random.uniform(0, self.jitter))
+        host = request.headers.get("host", "")
+        headers, limited = self._rate_limit(host)
+        if limited is not None:
+            return limited
+
+        url = f"https://{host}{request.url.path}"
+        if request.url.query:
+            url += f"?{request.url.query}"
+        found = self.fixtures.load(request.method, url, await request.body())
+        if found is None:
+            self.misses += 1
+            return Response(b"not recorded", 404, headers)
+        meta, body = found
+        headers.update(meta["headers"])
+        etag = meta["headers"].get("etag")
+        if etag and request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(body, meta["status"], headers)
+
+
+class LocalServerTransport(httpx.AsyncHTTPTransport):
+    """Send every request to a local stand-in server, keeping the original Host."""
+
+    def __init__(self, base_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.base = httpx.URL(base_url)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.headers["Host"] = request.url.netloc.decode("ascii")
+        request.url = request.url.copy_with(scheme=self.base.scheme, host=self.base.host, port=self.base.port)
+        return await super().handle_async_request(request)
+
+
+def serve(app: StandInServer, port: int = 0):
+    """Run ``app`` with uvicorn on a background thread; returns (server, base_url)."""
+    import uvicorn
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    bound = server.servers[0].sockets[0].getsockname()[1]
+    return server, f"http://127.0.0.1:{bound}"
+
+
+def compare_catalogs(expected: list[dict], actual: list[dict]) -> list[str]:
+    """Human-readable differences between two catalogs, ignoring volatile fields."""
+
+    def strip(o: dict) -> dict:
+        # apply_repo_data builds tags/languages from sets, so list order varies with PYTHONHASHSEED
+        return {k: sorted(v, key=repr) if isinstance(v, list) else v for k, v in o.items() if k not in VOLATILE_FIELDS}
+
+    want = {o.get("github_url"): strip(o) for o in expected}
+    got = {o.get("github_url"): strip(o) for o in actual}
+    problems = [f"missing {url}" for url in want if url not in got]
+    problems += [f"unexpected {url}" for url in got if url not in want]
+    for url in want.keys() & got.keys():
+        for field in sorted(want[url].keys() | got[url].keys()):
+            if want[url].get(field) != got[url].get(field):
+                problems.append(f"{url}: {field} {want[url].get(field)!r} != {got[url].get(field)!r}")
+    return problems
+
+
+async def record(root: Path, github_token: str | None = None) -> list[dict]:
+    from .. import sync_catalog
+
+    fixtures = Fixtures(root)
+    items = await sync_catalog.fetch_async(
+        root / CATALOG_FILE,
+        transport=RecordingTransport(fixtures),
+        cache_dir=None,
+        github_token=github_token,
+    )
+    print(f"recorded {len(fixtures)} responses, {len(items)} templates -> {root}")
+    return items
+
+
+async def bench(root: Path, transport: httpx.AsyncBaseTransport, server: StandInServer,
+                github_token: str | None = None, parse_workers: int | None = None) -> dict:
+    from .. import sync_catalog
+
+    expected = json.loads((root / CATALOG_FILE).read_text(encoding="utf-8"))
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        items = await sync_catalog.fetch_async(
+            Path(tmp) / CATALOG_FILE,
+            transport=transport,
+            cache_dir=None,
+            github_token=github_token,
+            parse_workers=parse_workers,
+        )
+        elapsed = time.perf_counter() - start
+    return {
+        "seconds": elapsed,
+        "requests": server.requests,
+        "requests_per_second": server.requests / elapsed if elapsed else 0.0,
+        "templates": len(items),
+        "not_recorded": server.misses,
+        "rate_limited": server.limited,
+        "differences": compare_catalogs(expected, items),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record or replay catalog sync traffic.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="run a live sync and save every response")
+    rec.add_argument("fixtures", type=Path)
+    run = sub.add_parser("bench", help="replay saved responses through a local stand-in server")
+    run.add_argument("fixtures", type=Path)
+    run.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    run.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to this many seconds")
+    run.add_argument("--rate-limit", action="append", default=[], metavar="HOST=LIMIT/WINDOW[:STATUS]")
+    run.add_argument("--parse-workers", type=int, default=None)
+    run.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    token = os.getenv("GITHUB_TOKEN") or None
+    if args.command == "record":
+        asyncio.run(record(args.fixtures, token))
+        return
+
+    app = StandInServer(
+        Fixtures(args.fixtures),
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limits=dict(RateLimit.parse(spec) for spec in args.rate_limit),
+        seed=args.seed,
+    )
+    server, base_url = serve(app)
+    try:
+        # GraphQL fixtures only exist when the recording had a token
+        result = asyncio.run(bench(args.fixtures, LocalServerTransport(base_url), app, token, args.parse_workers))
+    finally:
+        server.should_exit = True
+    print(f"{result['templates']} templates in {result['seconds']:.2f}s "
+          f"({result['requests']} requests, {result['requests_per_second']:.0f} req/s)")
+    print(f"not recorded: {result['not_recorded']}  rate limited: {result['rate_limited']}")
+    print(f"differences from recording: {len(result['differences'])}")
+    for line in result["differences"][:20]:
+        print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
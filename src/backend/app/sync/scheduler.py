@@ -0,0 +1,200 @@
+"""
+Rate-limit-aware request scheduling and a resumable work queue for catalog sync.
+
+Every crawler request takes a token from its host's bucket first. GitHub's
+``X-RateLimit-Remaining``/``X-RateLimit-Reset`` headers re-pace the bucket so
+the remaining quota is spread over the time left in the window. A limited
+response (429, or 403 with ``Retry-After``, exhausted quota or a secondary
+limit) pauses the whole host until it resets.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import httpx
+
+# Requests per second / burst before a host has told us its limits
+DEFAULT_RATE = 10.0
+DEFAULT_BURST = 10
+# Backoff for limits that give no reset hint (GitHub secondary limits)
+SECONDARY_BACKOFF = 60.0
+MAX_BACKOFF = 15 * 60.0
+# Longest single pause before giving up and leaving work for --resume
+MAX_WAIT = 65 * 60.0
+
+
+class RateLimitExceeded(Exception):
+    """A host stays limited for longer than the scheduler is willing to wait."""
+
+    def __init__(self, host: str, wait: float):
+        super().__init__(f"{host} rate limited for {wait:.0f}s")
+        self.host = host
+        self.wait = wait
+
+
+class _Bucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated", "paused_until", "backoff", "window_end")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+        self.paused_until = 0.0
+        self.backoff = SECONDARY_BACKOFF
+        # When the host's quota window resets; header pacing applies until then
+        self.window_end = 0.0
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class RateLimitScheduler:
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        burst: int = DEFAULT_BURST,
+        max_wait: float = MAX_WAIT,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self._clock = clock
+        self._sleep = sleep
+        self._buckets: dict[str, _Bucket] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self.throttled = 0
+
+    def _bucket(self, host: str) -> _Bucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = _Bucket(self.rate, self.burst, self._clock())
+            self._locks[host] = asyncio.Lock()
+        return bucket
+
+    async def acquire(self, host: str) -> None:
+        bucket = self._bucket(host)
+        # One waiter per host at a time keeps tokens handed out in FIFO order
+        async with self._locks[host]:
+            while True:
+                now = self._clock()
+                if bucket.paused_until > now:
+                    wait = bucket.paused_until - now
+                    if wait > self.max_wait:
+                        raise RateLimitExceeded(host, wait)
+                    await self._sleep(wait)
+                    continue
+                if bucket.window_end and now >= bucket.window_end:
+                    # Fresh quota: back to default pacing until headers say otherwise
+                    bucket.rate, bucket.capacity = self.rate, float(self.burst)
+                    bucket.tokens, bucket.updated = bucket.capacity, now
+                    bucket.window_end = 0.0
+                bucket.refill(now)
+                if bucket.tokens >= 1:
+                    bucket.tokens -= 1
+                    return
+                await self._sleep((1 - bucket.tokens) / bucket.rate if bucket.rate > 0 else 1.0)
+
+    def observe(self, host: str, response: httpx.Response) -> bool:
+        """
+        Update pacing from a response. Returns True when the response was a
+        rate-limit rejection and the request should be retried.
+        """
+        bucket = self._bucket(host)
+        now = self._clock()
+        headers = response.headers
+        remaining = _int(headers.get("x-ratelimit-remaining"))
+        reset = _int(headers.get("x-ratelimit-reset"))
+        retry_after = _int(headers.get("retry-after"))
+
+        if remaining is not None and reset is not None:
+            window = max(reset - now, 1.0)
+            bucket.rate = max(remaining, 0) / window
+            bucket.capacity = max(1.0, min(float(self.burst), float(remaining)))
+            bucket.tokens = min(bucket.tokens, bucket.capacity)
+            bucket.window_end = float(reset)
+
+        limited = response.status_code == 429 or (
+            response.status_code == 403
+            and (retry_after is not None or remaining == 0 or "rate limit" in response.text.lower())
+        )
+        if not limited:
+            bucket.backoff = SECONDARY_BACKOFF
+            return False
+
+        self.throttled += 1
+        if retry_after is not None:
+            resume = now + retry_after
+        elif remaining == 0 and reset is not None:
+            resume = reset + 1.0
+        else:
+            resume = now + bucket.backoff
+            bucket.backoff = min(bucket.backoff * 2, MAX_BACKOFF)
+        bucket.paused_until = max(bucket.paused_until, resume)
+        print(f"rate limited by {host}; pausing {bucket.paused_until - now:.0f}s")
+        return True
+
+
+def _int(value: str | None) -> int | None:
+    try:
+        return int(float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class WorkQueue:
+    """
+    Enrichment progress persisted to disk so an interrupted or rate-limited
+    sync can be resumed without redoing finished items.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.finished: dict[str, dict] = {}
+
+    @classmethod
+    def load(cls, path: Path) -> "WorkQueue":
+        queue = cls(path)
+        try:
+            queue.finished = json.loads(queue.path.read_text(encoding="utf-8")).get("finished", {})
+        except (FileNotFoundError, ValueError):
+            pass
+        return queue
+
+    def key(self, item: dict) -> str:
+        return item.get("github_url") or item.get("id") or ""
+
+    def split(self, items: list[dict]) -> list[dict]:
+        """Swap in finished items; return the ones still pending."""
+        pending = []
+        for i, item in enumerate(items):
+            finished = self.finished.get(self.key(item))
+            if finished is not None:
+                items[i] = finished
+            else:
+                pending.append(item)
+        return pending
+
+    def mark_done(self, item: dict) -> None:
+        self.finished[self.key(item)] = item
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"finished": self.finished}), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        self.finished = {}
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
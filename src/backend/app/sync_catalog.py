@@ -1,17 +1,29 @@
 from __future__ import annotations
 
+import asyncio
+import base64
 import json
+import os
 import re
 from datetime import date
 from pathlib import Path
+from typing import Callable
 from urllib.parse import urljoin, urlparse
 
 import httpx
 from bs4 import BeautifulSoup
 
+from .sync import github_graphql
+from .sync.detail_parser import ParseStage, extract_fields
+from .sync.http_cache import HttpCache, from_cache
+from .sync.scheduler import RateLimitExceeded, RateLimitScheduler, WorkQueue
+
 ROOT = Path(__file__).parent
 CATALOG = ROOT / "catalog.json"
 FEATURED = ROOT / "featured.json"
+CACHE_DIR = ROOT.parent / ".sync_cache"
+STATE_FILE = "sync_state.json"
+QUEUE_FILE = "work_queue.json"
 
 BASE = "https://azure.github.io"
 HOME = f"{BASE}/ai-app-templates/"
@@ -19,6 +31,31 @@ HOME = f"{BASE}/ai-app-templates/"
 LANGS = {".NET/C#", "JavaScript", "TypeScript", "Python", "Java", "Go"}
 TASKS = {"Agent", "Interactive Chat", "Guided Search", "Completions", "LLM Ops"}
 
+GITHUB_HEADERS = {
+    "User-Agent": "aifoundry-sync/gh",
+    "Accept": "application/vnd.github+json",
+}
+
+
+def github_headers(token: str | None = None) -> dict:
+    """REST headers; authenticated requests get the 5000/hour limit instead of 60."""
+    return {**GITHUB_HEADERS, "Authorization": f"Bearer {token}"} if token else GITHUB_HEADERS
+
+# Connection pool size shared by every request in a sync run
+MAX_CONNECTIONS = 32
+# In-flight requests per host; GitHub gets less so a run stays polite
+PER_HOST_CONCURRENCY = 16
+HOST_CONCURRENCY = {"api.github.com": 8, "github.com": 4}
+# Retries of a rate-limited request; each waits for the host to reset first
+MAX_RATE_LIMIT_RETRIES = 5
+# Items enriched between work-queue checkpoints
+QUEUE_CHUNK = 100
+# GraphQL batches in flight; GitHub's secondary limits punish bursts of costly queries
+GRAPHQL_CONCURRENCY = 2
+
+# Hand-curated catalog fields the crawler never produces; kept across syncs
+PRESERVED_FIELDS = ("planning", "pattern", "created_at")
+
 
 def slugify(text: str) -> str:
     return (
@@ -58,26 +95,14 @@ def infer_task_from_text(text: str) -> str:
     return "Agent"
 
 
-def parse_detail_page(html: str, url: str) -> dict | None:
-    soup = BeautifulSoup(html, "lxml")
+def extract_detail(html: str, url: str) -> dict | None:
+    title, description, github_url, chips = extract_fields(html)
+    if title is None:
+        title = url.rstrip("/").split("/")[-1].replace("-", " ").title()
+    return build_item(url, title, description, github_url, chips)
 
-    title_el = soup.select_one("h1, header h1, .post-title")
-    title = (
-        title_el.get_text(strip=True)
-        if title_el
-        else url.rstrip("/").split("/")[-1].replace("-", " ").title()
-    )
-    desc_el = soup.select_one("meta[name='description']") or soup.select_one("p")
-    description = (
-        desc_el.get("content", "")
-        if desc_el and desc_el.name == "meta"
-        else (desc_el.get_text(strip=True) if desc_el else "")
-    )
 
-    gh_a = soup.select_one('a[href*="github.com"]')
-    github_url = gh_a["href"].strip() if gh_a else ""
-
-    chips = [c.get_text(strip=True) for c in soup.select(".chip, .tag, .Label, .badge")]
+def build_item(url: str, title: str, description: str, github_url: str, chips: list[str]) -> dict | None:
     languages = [c for c in chips if c in LANGS]
     task = next((c for c in chips if c in TASKS), "Agent")
     models = [c for c in chips if any(k in c for k in ["GPT", "Phi", "Llama", "Mistral"])]
@@ -95,7 +120,7 @@ def parse_detail_page(html: str, url: str) -> dict | None:
     if not github_url:
         return None
 
-    obj = {
+    return {
         "id": slugify(urlparse(github_url).path.rstrip("/").split("/")[-1]),
         "title": title,
         "description": description,
@@ -113,129 +138,352 @@ def parse_detail_page(html: str, url: str) -> dict | None:
         "icon": "🤖" if task == "Agent" else "💬",
         "created_at": date.today().isoformat(),
     }
-    obj = enrich_from_github(obj)
+
+
+def stub_item(owner: str, repo: str, github_url: str, is_featured: bool = False) -> dict:
+    return normalize({
+        "id": slugify(repo),
+        "title": repo.replace("-", " ").title(),
+        "description": "",
+        "tags": [],
+        "languages": [],
+        "models": [],
+        "databases": [],
+        "collection": "Azure AI App Templates",
+        "task": infer_task_from_text(repo),
+        "pattern": None,
+        "github_url": github_url,
+        "fork_count": 0,
+        "star_count": 0,
+        "is_featured": is_featured,
+        "icon": "🤖",
+    })
+
+
+def parse_detail_page(html: str, url: str) -> dict | None:
+    obj = extract_detail(html, url)
+    if obj:
+        obj = enrich_from_github(obj)
     return obj
 
-def enrich_from_github(obj: dict) -> dict:
-    url = obj.get("github_url") or ""
+
+def github_owner_repo(url: str) -> tuple[str, str] | None:
+    parts = urlparse(url).path.strip("/").split("/")
+    if len(parts) < 2 or not parts[0] or not parts[1]:
+        return None
+    return parts[0], parts[1]
+
+
+def apply_repo_data(obj: dict, data: dict) -> dict:
+    desc = (data.get("description") or "").strip()
+    if desc:
+        obj["description"] = desc
+    obj["star_count"] = int(data.get("stargazers_count") or 0)
+    obj["fork_count"] = int(data.get("forks_count") or 0)
+    main_lang = data.get("language")
+    if main_lang and main_lang not in obj.get("languages", []):
+        obj["languages"] = list({*obj.get("languages", []), main_lang})
+    topics = data.get("topics") or []
+    if topics:
+        obj["tags"] = list({*obj.get("tags", []), *topics})
+    task_source = " ".join([obj.get("title", ""), obj.get("description", "") or desc, obj.get("github_url", ""), " ".join(topics)])
+    obj["task"] = infer_task_from_text(task_source)
+    return obj
+
+
+def description_from_html(html: str) -> str:
+    soup = BeautifulSoup(html, "lxml")
+    meta = soup.select_one('meta[property="og:description"]') or soup.select_one('meta[name="description"]')
+    return (meta.get("content") or "").strip() if meta else ""
+
+
+def description_from_readme(content_b64: str) -> str:
+    content = base64.b64decode((content_b64 or "").encode()).decode(errors="ignore")
+    return description_from_readme_text(content)
+
+
+def description_from_readme_text(content: str) -> str:
+    lines = [ln.strip() for ln in content.splitlines() if ln.strip()]
+    lines = [ln for ln in lines if not ln.startswith("#") and "badge" not in ln.lower()]
+    if not lines:
+        return ""
+    blurb = lines[0]
+    for ln in lines[1:5]:
+        if len(blurb) < 60 and len(ln) > len(blurb):
+            blurb = ln
+    return blurb[:200] + ("…" if len(blurb) > 200 else "")
+
+
+def apply_fallback_description(obj: dict, desc: str) -> dict:
+    if desc:
+        obj["description"] = desc
+        obj["task"] = infer_task_from_text(" ".join([obj.get("title", ""), desc]))
+    return obj
+
+
+class Crawler:
+    """
+    Shared async HTTP client with a per-host concurrency cap, so detail pages
+    and GitHub calls for many templates are in flight at once without
+    hammering a single host.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, per_host: int = PER_HOST_CONCURRENCY,
+                 cache: HttpCache | None = None, scheduler: RateLimitScheduler | None = None):
+        self.client = client
+        self.per_host = per_host
+        self.cache = cache
+        self.scheduler = scheduler
+        self._host_slots: dict[str, asyncio.Semaphore] = {}
+
+    def _slots(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).hostname or ""
+        slots = self._host_slots.get(host)
+        if slots is None:
+            slots = self._host_slots[host] = asyncio.Semaphore(HOST_CONCURRENCY.get(host, self.per_host))
+        return slots
+
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        host = urlparse(url).hostname or ""
+        slots = self._slots(url)
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            if self.scheduler:
+                await self.scheduler.acquire(host)
+            async with slots:
+                r = await self.client.request(method, url, **kwargs)
+            if not (self.scheduler and self.scheduler.observe(host, r)):
+                return r
+        # Still limited after waiting out every reset: never record it as "no data"
+        raise RateLimitExceeded(host, 0)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self._send("POST", url, **kwargs)
+
+    async def get(self, url: str, headers: dict | None = None, **kwargs) -> httpx.Response:
+        request_headers = dict(headers or {})
+        if self.cache:
+            request_headers.update(self.cache.validators(url))
+        r = await self._send("GET", url, headers=request_headers, **kwargs)
+        if self.cache:
+            if r.status_code == 304:
+                return self.cache.replay(url, r.request) or r
+            if r.status_code == 200:
+                self.cache.store(url, r)
+        return r
+
+
+async def enrich_from_github_async(obj: dict, crawler: Crawler, token: str | None = None) -> dict:
+    pair = github_owner_repo(obj.get("github_url") or "")
+    if not pair:
+        return obj
+    owner, repo = pair
+    headers = github_headers(token)
     try:
-        parts = urlparse(url).path.strip("/").split("/")
-        if len(parts) < 2:
-            return obj
-        owner, repo = parts[0], parts[1]
-        headers = {
-            "User-Agent": "aifoundry-sync/gh",
-            "Accept": "application/vnd.github+json",
-        }
-        with httpx.Client(timeout=25, headers=headers) as c:
-            r = c.get(f"https://api.github.com/repos/{owner}/{repo}")
-            data = {}
-            if r.status_code != 403:
-                r.raise_for_status()
-                data = r.json()
-            desc = (data.get("description") or "").strip() if isinstance(data, dict) else ""
-            if desc:
-                obj["description"] = desc
-            if isinstance(data, dict):
-                obj["star_count"] = int(data.get("stargazers_count") or 0)
-                obj["fork_count"] = int(data.get("forks_count") or 0)
-                main_lang = data.get("language")
-                if main_lang and main_lang not in obj.get("languages", []):
-                    obj["languages"] = list({*obj.get("languages", []), main_lang})
-                topics = data.get("topics") or []
-                if topics:
-                    obj["tags"] = list({*obj.get("tags", []), *topics})
-            task_source = " ".join([obj.get("title",""), obj.get("description","") or desc, url, " ".join(data.get("topics", []) if isinstance(data, dict) else [])])
-            obj["task"] = infer_task_from_text(task_source)
-
-            if not (obj.get("description") or "").strip():
-                gh_html = f"https://github.com/{owner}/{repo}"
-                hr = c.get(gh_html, headers={"User-Agent": "aifoundry-sync/html"})
-                if hr.status_code == 200:
-                    soup = BeautifulSoup(hr.text, "lxml")
-                    meta = soup.select_one('meta[property="og:description"]') or soup.select_one('meta[name="description"]')
-                    if meta:
-                        mdesc = (meta.get("content") or "").strip()
-                        if mdesc:
-                            obj["description"] = mdesc
-                            obj["task"] = infer_task_from_text(" ".join([obj.get("title",""), mdesc]))
-
-            if not (obj.get("description") or "").strip():
-                rr = c.get(f"https://api.github.com/repos/{owner}/{repo}/readme")
-                if rr.status_code == 200:
-                    rd = rr.json()
-                    import base64
-                    content = base64.b64decode((rd.get("content") or "").encode()).decode(errors="ignore")
-                    lines = [ln.strip() for ln in content.splitlines() if ln.strip()]
-                    lines = [ln for ln in lines if not ln.startswith("#") and "badge" not in ln.lower()]
-                    if lines:
-                        blurb = lines[0]
-                        for ln in lines[1:5]:
-                            if len(blurb) < 60 and len(ln) > len(blurb):
-                                blurb = ln
-                        obj["description"] = (blurb[:200] + ("…" if len(blurb) > 200 else ""))
-                        obj["task"] = infer_task_from_text(" ".join([obj.get("title",""), blurb]))
+        r = await crawler.get(f"https://api.github.com/repos/{owner}/{repo}", headers=headers)
+        if r.status_code != 403:
+            r.raise_for_status()
+            apply_repo_data(obj, r.json())
+        else:
+            obj["task"] = infer_task_from_text(" ".join([obj.get("title", ""), obj.get("description", ""), obj.get("github_url", "")]))
+
+        if not (obj.get("description") or "").strip():
+            # Both fallbacks are independent; fetch them together and prefer the page meta
+            html_r, readme_r = await asyncio.gather(
+                crawler.get(f"https://github.com/{owner}/{repo}", headers={"User-Agent": "aifoundry-sync/html"}),
+                crawler.get(f"https://api.github.com/repos/{owner}/{repo}/readme", headers=headers),
+                return_exceptions=True,
+            )
+            for r in (html_r, readme_r):
+                if isinstance(r, RateLimitExceeded):
+                    raise r
+            desc = ""
+            if isinstance(html_r, httpx.Response) and html_r.status_code == 200:
+                desc = description_from_html(html_r.text)
+            if not desc and isinstance(readme_r, httpx.Response) and readme_r.status_code == 200:
+                desc = description_from_readme(readme_r.json().get("content") or "")
+            apply_fallback_description(obj, desc)
+    except RateLimitExceeded:
+        raise
     except Exception:
         pass
     return obj
 
-    return obj
 
+async def enrich_with_graphql(items: list[dict], crawler: Crawler, token: str,
+                              done: Callable[[dict], None] | None = None) -> list[dict]:
+    """
+    Enrich items through batched GraphQL queries. Returns the items that
+    could not be enriched this way and still need the per-repo REST path.
+    ``done`` is called with each item as soon as it is fully enriched.
+    """
+    keyed = [(o, github_owner_repo(o.get("github_url") or "")) for o in items]
+    keyed = [(o, pair) for o, pair in keyed if pair]
+    fallback: list[dict] = []
+    resolved: list[dict] = []
+    gate = asyncio.Semaphore(GRAPHQL_CONCURRENCY)
+
+    async def run_metadata(batch: list[tuple[dict, tuple[str, str]]]) -> None:
+        async with gate:
+            try:
+                results = await github_graphql.fetch_metadata(crawler.post, token, [pair for _, pair in batch])
+            except RateLimitExceeded:
+                raise
+            except Exception as e:
+                print(f"graphql metadata batch failed, using REST: {e}")
+                fallback.extend(o for o, _ in batch)
+                return
+        for (o, _), data in zip(batch, results):
+            if data is None:
+                fallback.append(o)
+            else:
+                apply_repo_data(o, data)
+                resolved.append(o)
+                if done and (o.get("description") or "").strip():
+                    done(o)
+
+    await asyncio.gather(*(run_metadata(b) for b in github_graphql.batches(keyed, github_graphql.METADATA_BATCH_SIZE)))
+
+    undescribed = [(o, github_owner_repo(o["github_url"])) for o in resolved if not (o.get("description") or "").strip()]
+
+    async def page_description(owner: str, repo: str) -> str:
+        try:
+            hr = await crawler.get(f"https://github.com/{owner}/{repo}", headers={"User-Agent": "aifoundry-sync/html"})
+            if hr.status_code == 200:
+                return description_from_html(hr.text)
+        except RateLimitExceeded:
+            raise
+        except Exception:
+            pass
+        return ""
+
+    async def run_descriptions(batch: list[tuple[dict, tuple[str, str]]]) -> None:
+        # Same preference as the REST path: the page meta first, then the README
+        descs = await asyncio.gather(*(page_description(*pair) for _, pair in batch))
+        need = [(o, pair) for (o, pair), desc in zip(batch, descs) if not desc]
+        texts: list[str | None] = []
+        if need:
+            async with gate:
+                try:
+                    texts = await github_graphql.fetch_readmes(crawler.post, token, [pair for _, pair in need])
+                except RateLimitExceeded:
+                    raise
+                except Exception:
+                    texts = [None] * len(need)
+        readmes = {id(o): description_from_readme_text(text) if text else "" for (o, _), text in zip(need, texts)}
+        for (o, _), desc in zip(batch, descs):
+            apply_fallback_description(o, desc or readmes.get(id(o), ""))
+            if done:
+                done(o)
+
+    await asyncio.gather(*(run_descriptions(b) for b in github_graphql.batches(undescribed, github_graphql.README_BATCH_SIZE)))
+    return fallback
+
+
+async def enrich_items(items: list[dict], crawler: Crawler, token: str | None = None,
+                       done: Callable[[dict], None] | None = None) -> list[dict]:
+    """GraphQL batches when a token is available, per-repo REST for the rest."""
+    pending = await enrich_with_graphql(items, crawler, token, done) if token else items
+
+    async def rest(o: dict) -> None:
+        await enrich_from_github_async(o, crawler, token)
+        if done:
+            done(o)
+
+    await asyncio.gather(*(rest(o) for o in pending))
+    return items
+
+
+async def enrich_resumable(items: list[dict], crawler: Crawler, token: str | None,
+                           queue: WorkQueue | None) -> list[dict]:
+    """
+    Enrich in checkpointed chunks. Items finished by an earlier, interrupted
+    run are taken from the queue instead of being fetched again.
+    """
+    if queue is None:
+        return await enrich_items(items, crawler, token)
+    pending = queue.split(items)
+    try:
+        for start in range(0, len(pending), QUEUE_CHUNK):
+            await enrich_items(pending[start:start + QUEUE_CHUNK], crawler, token, queue.mark_done)
+            queue.save()
+    finally:
+        # Keep whatever finished before a rate-limit stop or crash
+        queue.save()
+    return items
 
-def discover_detail_routes(client: httpx.Client) -> list[str]:
-    site_map = f"{HOME}sitemap.xml"
-    r = client.get(site_map)
-    r.raise_for_status()
-    soup = BeautifulSoup(r.text, "xml")
-    routes: list[str] = []
-    for loc in soup.select("loc"):
+
+def enrich_from_github(obj: dict) -> dict:
+    async def _run() -> dict:
+        async with httpx.AsyncClient(timeout=25) as client:
+            return await enrich_from_github_async(obj, Crawler(client), os.getenv("GITHUB_TOKEN") or None)
+
+    return asyncio.run(_run())
+
+
+def parse_sitemap_entries(xml: str) -> dict[str, str | None]:
+    """Detail page URL -> <lastmod> (None when the sitemap omits it)."""
+    soup = BeautifulSoup(xml, "xml")
+    entries: dict[str, str | None] = {}
+    for url_el in soup.select("url"):
+        loc = url_el.find("loc")
+        if not loc:
+            continue
         u = loc.get_text(strip=True)
         if "/ai-app-templates/repo/" in u:
-            routes.append(u)
-    return sorted(set(routes))
+            lastmod = url_el.find("lastmod")
+            entries[u] = lastmod.get_text(strip=True) if lastmod else None
+    return dict(sorted(entries.items()))
 
 
-def fetch():
-    with httpx.Client(timeout=45, headers={"User-Agent": "aifoundry-sync/1.2"}) as client:
-        detail_links = discover_detail_routes(client)
-        print(f"discover_detail_routes -> {len(detail_links)}")
+def parse_sitemap(xml: str) -> list[str]:
+    return list(parse_sitemap_entries(xml))
 
-        items = []
-        for u in detail_links:
-            obj = None
-            try:
-                r = client.get(u)
-                r.raise_for_status()
-                obj = parse_detail_page(r.text, u)
-            except Exception:
-                obj = None
-            if not obj:
-                slug = urlparse(u).path.split("/repo/")[-1].strip("/")
-                if slug and "/" in slug:
-                    owner, repo = slug.split("/", 1)
-                    gh = f"https://github.com/{owner}/{repo}"
-                    obj = normalize({
-                        "id": slugify(repo),
-                        "title": repo.replace("-", " ").title(),
-                        "description": "",
-                        "tags": [],
-                        "languages": [],
-                        "models": [],
-                        "databases": [],
-                        "collection": "Azure AI App Templates",
-                        "task": infer_task_from_text(repo),
-                        "pattern": None,
-                        "github_url": gh,
-                        "fork_count": 0,
-                        "star_count": 0,
-                        "is_featured": False,
-                        "icon": "🤖",
-                    })
-                    obj = enrich_from_github(obj)
-            if obj:
-                items.append(obj)
-        print(f"built_items -> {len(items)}")
 
+async def discover_detail_routes(crawler: Crawler) -> dict[str, str | None]:
+    r = await crawler.get(f"{HOME}sitemap.xml")
+    r.raise_for_status()
+    return parse_sitemap_entries(r.text)
+
+
+def carry_over(obj: dict, previous: dict | None) -> dict:
+    if previous:
+        for field in PRESERVED_FIELDS:
+            if previous.get(field) is not None:
+                obj[field] = previous[field]
+    return obj
+
+
+async def build_from_detail(crawler: Crawler, url: str, previous: dict | None = None,
+                            unchanged: bool = False, parse: ParseStage | None = None) -> dict | None:
+    """
+    Build one (not yet enriched) catalog item from a detail page. With
+    ``previous`` (incremental mode) an unchanged page is not re-parsed and
+    the existing item is returned for re-enrichment. ``parse`` moves the
+    HTML parsing off the event loop.
+    """
+    if previous and unchanged:
+        return dict(previous)
+    obj = None
+    try:
+        r = await crawler.get(url)
+        r.raise_for_status()
+        if previous and from_cache(r):
+            return dict(previous)
+        obj = await parse(r.text, url) if parse else extract_detail(r.text, url)
+    except RateLimitExceeded:
+        raise
+    except Exception:
+        obj = None
+    if not obj:
+        slug = urlparse(url).path.split("/repo/")[-1].strip("/")
+        if not (slug and "/" in slug):
+            return None
+        owner, repo = slug.split("/", 1)
+        obj = stub_item(owner, repo, f"https://github.com/{owner}/{repo}")
+    return carry_over(obj, previous)
+
+
+def dedupe(items: list[dict]) -> list[dict]:
     seen = set()
     deduped = []
     for obj in items:
@@ -244,47 +492,154 @@ def fetch():
             continue
         seen.add(key)
         deduped.append(obj)
-    print(f"deduped -> {len(deduped)}")
+    return deduped
+
 
+def load_featured() -> set[str]:
     try:
-        featured_urls = set(json.loads(FEATURED.read_text()))
+        return set(json.loads(FEATURED.read_text()))
     except Exception:
-        featured_urls = set()
-    for o in deduped:
-        if o["github_url"] in featured_urls:
-            o["is_featured"] = True
-
-    existing_urls = {o.get("github_url") for o in deduped}
-    for f_url in featured_urls:
-        if f_url not in existing_urls:
-            path = urlparse(f_url).path.strip("/")
-            parts = path.split("/")
-            if len(parts) >= 2:
-                owner, repo = parts[0], parts[1]
-                o = normalize({
-                    "id": slugify(repo),
-                    "title": repo.replace("-", " ").title(),
-                    "description": "",
-                    "tags": [],
-                    "languages": [],
-                    "models": [],
-                    "databases": [],
-                    "collection": "Azure AI App Templates",
-                    "task": infer_task_from_text(repo),
-                    "pattern": None,
-                    "github_url": f_url,
-                    "fork_count": 0,
-                    "star_count": 0,
-                    "is_featured": True,
-                    "icon": "🤖",
-                })
-                o = enrich_from_github(o)
-                deduped.append(o)
-
-    CATALOG.write_text(json.dumps(deduped, indent=2), encoding="utf-8")
+        return set()
+
+
+def load_catalog(path: Path) -> list[dict]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return []
+
+
+def load_state(cache_dir: Path) -> dict:
+    try:
+        return json.loads((cache_dir / STATE_FILE).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_state(cache_dir: Path, state: dict) -> None:
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_dir / STATE_FILE
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def write_catalog(items: list[dict], path: Path = CATALOG) -> None:
+    # Write-then-rename so a running API's catalog watcher never reads a partial file
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(items, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+async def fetch_async(
+    catalog_path: Path = CATALOG,
+    transport: httpx.AsyncBaseTransport | None = None,
+    cache_dir: Path | None = CACHE_DIR,
+    incremental: bool = False,
+    github_token: str | None = None,
+    resume: bool = False,
+    scheduler: RateLimitScheduler | None = None,
+    parse_workers: int | None = None,
+) -> list[dict]:
+    """
+    Crawl the template site and write the catalog.
+
+    ``cache_dir`` enables the conditional-request HTTP cache. ``incremental``
+    (requires the cache) reuses existing catalog items for sitemap entries
+    whose lastmod or detail page has not changed. ``github_token`` (default:
+    the GITHUB_TOKEN environment variable) enables GraphQL batch enrichment.
+
+    Enrichment progress is checkpointed in the cache directory. If a host
+    stays rate limited too long, RateLimitExceeded propagates, no catalog
+    is written, and ``resume`` continues from the checkpoint.
+
+    Detail pages are parsed in ``parse_workers`` processes (default: one
+    per spare core; 0 parses on the event loop).
+    """
+    if github_token is None:
+        github_token = os.getenv("GITHUB_TOKEN") or None
+    cache = HttpCache(cache_dir) if cache_dir else None
+    incremental = incremental and cache is not None
+    state = load_state(cache_dir) if incremental else {}
+    existing = {o.get("github_url"): o for o in load_catalog(catalog_path)} if incremental else {}
+    queue = None
+    if cache_dir:
+        queue = WorkQueue.load(cache_dir / QUEUE_FILE) if resume else WorkQueue(cache_dir / QUEUE_FILE)
+
+    limits = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+    async with httpx.AsyncClient(
+        timeout=45, limits=limits, transport=transport, headers={"User-Agent": "aifoundry-sync/1.2"}
+    ) as client:
+        crawler = Crawler(client, cache=cache, scheduler=scheduler or RateLimitScheduler())
+        routes = await discover_detail_routes(crawler)
+        print(f"discover_detail_routes -> {len(routes)}")
+
+        with ParseStage(extract_detail, parse_workers) as parse:
+            jobs = []
+            for u, lastmod in routes.items():
+                seen_before = state.get(u) or {}
+                previous = existing.get(seen_before.get("github_url"))
+                unchanged = lastmod is not None and lastmod == seen_before.get("lastmod")
+                jobs.append(build_from_detail(crawler, u, previous, unchanged, parse))
+            # gather preserves input order, so dedupe keeps the same winners as a serial run
+            built = await asyncio.gather(*jobs)
+        items = [obj for obj in built if obj]
+        await enrich_resumable(items, crawler, github_token, queue)
+        print(f"built_items -> {len(items)}")
+
+        deduped = dedupe(items)
+        print(f"deduped -> {len(deduped)}")
+
+        featured_urls = load_featured()
+        for o in deduped:
+            if o["github_url"] in featured_urls:
+                o["is_featured"] = True
+
+        existing_urls = {o.get("github_url") for o in deduped}
+        missing = []
+        for f_url in featured_urls:
+            if f_url in existing_urls:
+                continue
+            pair = github_owner_repo(f_url)
+            if pair:
+                missing.append(carry_over(stub_item(pair[0], pair[1], f_url, is_featured=True), existing.get(f_url)))
+        deduped.extend(await enrich_resumable(missing, crawler, github_token, queue))
+        if crawler.scheduler.throttled:
+            print(f"rate_limited -> {crawler.scheduler.throttled} responses waited out")
+
+    if cache:
+        print(f"http_cache -> {cache.hits} revalidated, {cache.stores} stored")
+        save_state(cache_dir, {
+            u: {"lastmod": lastmod, "github_url": obj.get("github_url")}
+            for (u, lastmod), obj in zip(routes.items(), built) if obj
+        })
+    write_catalog(deduped, catalog_path)
+    if queue:
+        queue.clear()
     return deduped
 
 
+def fetch(catalog_path: Path = CATALOG, cache_dir: Path | None = CACHE_DIR, incremental: bool = False,
+          resume: bool = False) -> list[dict]:
+    return asyncio.run(fetch_async(catalog_path, cache_dir=cache_dir, incremental=incremental, resume=resume))
+
+
 if __name__ == "__main__":
-    data = fetch()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sync catalog.json from the AI App Templates site")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only re-parse sitemap entries that changed and merge into catalog.json")
+    parser.add_argument("--cache-dir", type=Path, default=CACHE_DIR, help="HTTP cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="disable the HTTP cache")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue a run that stopped on rate limiting, skipping finished items")
+    args = parser.parse_args()
+
+    try:
+        data = fetch(cache_dir=None if args.no_cache else args.cache_dir, incremental=args.incremental,
+                     resume=args.resume)
+    except RateLimitExceeded as e:
+        print(f"Stopped: {e}. catalog.json left unchanged; rerun with --resume to continue.")
+        raise SystemExit(2)
     print(f"Wrote {len(data)} templates to {CATALOG}")
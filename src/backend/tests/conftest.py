@@ -57,7 +57,9 @@ except Exception:  # pragma: no cover - only in minimal test envs
     sys.modules.setdefault("azure.identity", identity_module)
 
 from app.main import app
-from app.api.dependencies import get_auth_service
+from app.api.dependencies import get_auth_service, get_template_service
+from app.services.llm_cache import llm_cache
+from app.services.spec_cache import spec_cache
 
 
 class _FakeAuthService:
@@ -78,6 +80,11 @@ def override_dependencies():
     app.dependency_overrides[get_auth_service] = lambda: _FakeAuthService()
     yield
     app.dependency_overrides.clear()
+    llm_cache.clear()
+    spec_cache.clear()
+    # Routes start the catalog watcher thread on first use; don't leave it polling
+    if get_template_service.cache_info().currsize:
+        get_template_service().stop_watching()
 
 
 @pytest.fixture()
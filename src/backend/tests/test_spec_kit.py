@@ -1,3 +1,5 @@
+import types
+
 import pytest
 
 
@@ -145,3 +147,510 @@ def test_assign_to_supported_agents_without_network(client, agent):
     assert data["status"] == "success"
     assert data["agent"] == agent
 
+
+
+class _FakeQuery:
+    """Async-iterable query result that also pages like azure.core's AsyncItemPaged."""
+
+    def __init__(self, container, items):
+        self.container = container
+        self.items = items
+        self.continuation_token = None
+
+    async def __aiter__(self):
+        await self.container._round_trip()
+        for item in self.items:
+            yield item
+
+    async def _page(self, items):
+        for item in items:
+            yield item
+
+    async def _pages(self, start, size):
+        await self.container._round_trip()
+        end = start + size
+        self.continuation_token = str(end) if end < len(self.items) else None
+        yield self._page(self.items[start:end])
+
+    def by_page(self, continuation_token=None):
+        size = self.container.last_max_item_count or len(self.items) or 1
+        return _PagedQuery(self, int(continuation_token or 0), size)
+
+
+class _PagedQuery:
+    def __init__(self, query, start, size):
+        self.query = query
+        self.pages = query._pages(start, size)
+
+    @property
+    def continuation_token(self):
+        return self.query.continuation_token
+
+    def __aiter__(self):
+        return self.pages
+
+
+class _FakeChangeFeed:
+    """Change feed pager over a container's writes; the continuation is the position after the last page."""
+
+    def __init__(self, container, start, page_size):
+        self.container = container
+        self.start = start
+        self.page_size = page_size
+        self.continuation_token = None
+
+    def by_page(self, continuation_token=None):
+        return self
+
+    def __aiter__(self):
+        return self._pages()
+
+    async def _pages(self):
+        position = self.start
+        while True:
+            await self.container._round_trip()
+            page = [doc for _, doc in self.container.changes[position:position + self.page_size]]
+            position += len(page)
+            self.continuation_token = str(position)
+            if not page:
+                return
+            yield _FakeQuery(self.container, page)._page(page)
+
+
+class _FakeAsyncContainer:
+    """Stands in for azure.cosmos.aio.ContainerProxy with a per-call round trip delay."""
+
+    def __init__(self, delay=0.0):
+        self.items = {}
+        self.delay = delay
+        self.last_max_item_count = None
+        self.writes = 0
+        self.changes = []
+        self.feed_calls = []
+        self.client_connection = types.SimpleNamespace(last_response_headers={})
+
+    def _store(self, body):
+        from datetime import datetime, timezone
+        self.writes += 1
+        self.items[body["id"]] = {**body, "_etag": str(self.writes)}
+        self.changes.append((datetime.now(timezone.utc), dict(self.items[body["id"]])))
+
+    async def _round_trip(self):
+        import asyncio
+        await asyncio.sleep(self.delay)
+        # Like the real client, the last response's headers are shared by every container
+        self.client_connection.last_response_headers = {"etag": f'"{self.writes}"'}
+
+    async def create_item(self, body):
+        await self._round_trip()
+        from azure.cosmos.exceptions import CosmosResourceExistsError
+        if body["id"] in self.items:
+            raise CosmosResourceExistsError(message="conflict")
+        self._store(body)
+
+    async def replace_item(self, item, body, etag=None, match_condition=None):
+        await self._round_trip()
+        from azure.cosmos.exceptions import CosmosAccessConditionFailedError
+        if etag is not None and self.items.get(item, {}).get("_etag") != etag:
+            raise CosmosAccessConditionFailedError(message="precondition failed")
+        self._store(body)
+
+    async def upsert_item(self, body):
+        await self._round_trip()
+        self._store(body)
+
+    async def read_item(self, item, partition_key):
+        await self._round_trip()
+        from azure.cosmos.exceptions import CosmosResourceNotFoundError
+        if item not in self.items:
+            raise CosmosResourceNotFoundError(message="not found")
+        return dict(self.items[item])
+
+    def query_items_change_feed(self, start_time=None, continuation=None, max_item_count=None):
+        self.feed_calls.append({"start_time": start_time, "continuation": continuation})
+        if continuation is not None:
+            start = int(continuation)
+        elif start_time == "Now":
+            start = len(self.changes)
+        else:
+            start = next((i for i, (at, _) in enumerate(self.changes) if at >= start_time), len(self.changes))
+        return _FakeChangeFeed(self, start, max_item_count or 100)
+
+    def query_items(self, query, parameters=None, max_item_count=None, **kwargs):
+        self.last_max_item_count = max_item_count
+        if "MAX" in query:
+            return _FakeQuery(self, [None])
+        if "c.kind" in query:
+            summaries = [doc for doc in self.items.values() if doc.get("kind") == "spec"]
+            return _FakeQuery(self, sorted(summaries, key=lambda d: d["created_at"], reverse=True))
+        if "c.type = 'spec'" in query:
+            return _FakeQuery(self, [doc for doc in self.items.values() if doc.get("type") == "spec"])
+        if parameters is None:
+            return _FakeQuery(self, list(self.items.values()))
+        spec_id = (parameters or [{}])[0].get("value")
+        return _FakeQuery(self, [
+            doc for doc in list(self.items.values())
+            if doc.get("type") == "spec_version" and doc.get("spec_id") == spec_id
+        ])
+
+
+@pytest.fixture()
+def cosmos_containers(monkeypatch):
+    """Point SpecService at fake specs and summary containers; returns (container, summaries)."""
+    from app.services import spec_service as spec_module
+
+    container = _FakeAsyncContainer()
+    summaries = _FakeAsyncContainer()
+    monkeypatch.setattr(spec_module, "cosmos_endpoint", lambda: "https://example.documents.azure.com")
+
+    async def fake_container(container_id, *args, **kwargs):
+        return summaries if container_id == "spec_summaries" else container
+    monkeypatch.setattr(spec_module.cosmos_clients, "container", fake_container)
+    summaries.client_connection = container.client_connection
+    return container, summaries
+
+
+def test_spec_service_awaits_cosmos_without_blocking_the_loop(cosmos_containers):
+    import asyncio
+    import time
+    from app.models.schemas import SpecCreateRequest
+    from app.services import spec_service as spec_module
+
+    container, _ = cosmos_containers
+    container.delay = 0.05
+
+    async def run():
+        service = spec_module.SpecService()
+        spec = await service.create_spec(SpecCreateRequest(title="Async Spec", description="d", content="c"))
+        await service.update_spec_phase(spec.id, phase="plan", plan="# Plan")
+        start = time.perf_counter()
+        reads = await asyncio.gather(*(service.get_spec_by_id(spec.id) for _ in range(20)))
+        return spec, reads, time.perf_counter() - start, await service.get_spec_versions(spec.id)
+
+    spec, reads, elapsed, versions = asyncio.run(run())
+    assert spec.feature_number == "001"
+    assert all(r.plan == "# Plan" and r.version == 2 for r in reads)
+    assert elapsed < 0.5  # 20 round trips overlap instead of running back to back
+    assert sorted(v["version"] for v in versions) == [1, 2]
+
+
+def test_spec_service_caches_reads_by_version(cosmos_containers):
+    import asyncio
+    from app.models.schemas import SpecCreateRequest
+    from app.services import spec_service as spec_module
+    from app.services.spec_cache import spec_cache
+
+    container, _ = cosmos_containers
+    reads = []
+    read_item = container.read_item
+
+    async def counted_read(item, partition_key):
+        reads.append(item)
+        return await read_item(item, partition_key)
+    container.read_item = counted_read
+
+    async def run():
+        spec = await spec_module.SpecService().create_spec(SpecCreateRequest(title="Cached", description="d", content="c"))
+        spec_cache.clear()
+        reads.clear()
+        first = [await spec_module.SpecService().get_spec_by_id(spec.id) for _ in range(5)]
+        updated = await spec_module.SpecService().update_spec_phase(spec.id, phase="plan", plan="# Plan")
+        after = await spec_module.SpecService().get_spec_by_id(spec.id)
+        # A change-feed notification for an older version leaves the newer entry alone
+        spec_cache.evict(spec.id, newer_than=1)
+        kept = await spec_module.SpecService().get_spec_by_id(spec.id)
+        spec_cache.evict(spec.id, newer_than=3)
+        await spec_module.SpecService().get_spec_by_id(spec.id)
+        return spec, first, updated, after, kept
+
+    spec, first, updated, after, kept = asyncio.run(run())
+    assert all(s.version == 1 for s in first)
+    assert updated.version == 2 and after.plan == "# Plan" and kept.version == 2
+    # A fill, a fresh read before the update and a refill after the eviction; the rest are cache hits
+    assert reads == [spec.id] * 3
+
+
+def test_spec_listing_pages_through_the_summary_index(cosmos_containers):
+    import asyncio
+    from app.models.schemas import SpecCreateRequest
+    from app.services import spec_service as spec_module
+
+    _, summaries = cosmos_containers
+
+    async def run():
+        service = spec_module.SpecService()
+        created = [await service.create_spec(SpecCreateRequest(title=f"Spec {i}", description="d", content="x" * 1000)) for i in range(5)]
+        await service.update_spec_phase(created[0].id, phase="plan", plan="# Plan")
+        pages, token = [], None
+        while True:
+            page, token = await service.list_spec_summaries(2, token)
+            pages.append(page)
+            if token is None:
+                return created, pages
+
+    created, pages = asyncio.run(run())
+    assert [len(p) for p in pages] == [2, 2, 1]
+    listed = [s for p in pages for s in p]
+    assert {s.id for s in listed} == {s.id for s in created}
+    assert next(s for s in listed if s.id == created[0].id).version == 2
+    assert all(not hasattr(s, "content") for s in listed)
+    assert summaries.last_max_item_count == 2
+
+
+def test_list_specs_endpoint_returns_continuation_header(client):
+    for title in ("First", "Second"):
+        client.post("/api/specs", json={"title": title, "description": "d", "content": "c"})
+    first = client.get("/api/specs", params={"limit": 1})
+    assert first.status_code == 200
+    assert len(first.json()) == 1 and "content" not in first.json()[0]
+    token = first.headers["X-Continuation-Token"]
+    second = client.get("/api/specs", params={"limit": 1, "continuation": token})
+    assert second.json()[0]["id"] != first.json()[0]["id"]
+
+
+def test_version_history_is_delta_encoded_and_rebuilt_on_read(client):
+    from app.api.dependencies import get_spec_service
+    from app.services import spec_service as spec_module
+
+    service = spec_module.SpecService()
+    client.app.dependency_overrides[get_spec_service] = lambda: service
+    plan = "".join(f"## Step {i}\nDo thing number {i} carefully.\n" for i in range(200))
+    spec_id = client.post("/api/specs", json={"title": "History", "description": "d", "content": "c"}).json()["id"]
+
+    import asyncio
+    asyncio.run(service.update_spec_phase(spec_id, phase="plan", plan=plan))
+    edited = plan.replace("Do thing number 7 ", "Do thing number seven ")
+    for _ in range(12):
+        asyncio.run(service.update_spec_phase(spec_id, phase="plan", plan=edited))
+    edited_again = edited + "## Wrap-up\nShip it.\n"
+    asyncio.run(service.update_spec_phase(spec_id, phase="tasks", plan=edited_again))
+
+    records = service._memory_versions[spec_id]
+    assert [r["encoding"] for r in records[:3]] == ["snapshot", "delta", "delta"]
+    assert records[10]["encoding"] == "snapshot"  # periodic snapshot at version 11
+    # A small plan edit costs far less than another full copy
+    assert len(records[2]["data"]) * 10 < len(records[10]["data"])
+
+    versions = client.get(f"/api/specs/{spec_id}/versions").json()["versions"]
+    assert [v["version"] for v in versions] == list(range(15, 0, -1))
+    assert versions[0]["spec_data"]["plan"] == edited_again and versions[0]["spec_data"]["phase"] == "tasks"
+    assert versions[-2]["spec_data"]["plan"] == plan
+    assert versions[-3]["spec_data"]["plan"] == edited
+    assert versions[-1]["spec_data"]["plan"] is None
+    assert all("data" not in v for v in versions)
+
+
+def test_feature_numbers_are_unique_under_concurrent_creation(cosmos_containers):
+    import asyncio
+    from app.models.schemas import SpecCreateRequest
+    from app.services import spec_service as spec_module
+
+    container, _ = cosmos_containers
+    container.delay = 0.001
+
+    async def run():
+        # Two "workers" racing on the same counter document
+        workers = [spec_module.SpecService(), spec_module.SpecService()]
+        return await asyncio.gather(*(
+            workers[i % 2].create_spec(SpecCreateRequest(title=f"Spec {i}", description="d", content="c"))
+            for i in range(20)
+        ))
+
+    specs = asyncio.run(run())
+    assert sorted(s.feature_number for s in specs) == [f"{n:03d}" for n in range(1, 21)]
+    assert container.items["feature-number-counter"]["value"] == 20
+
+
+def test_reconcile_repairs_missing_and_stale_summaries(cosmos_containers):
+    import asyncio
+    from app.models.schemas import SpecCreateRequest
+    from app.services import spec_service as spec_module
+
+    _, summaries = cosmos_containers
+
+    async def run():
+        service = spec_module.SpecService()
+        kept = await service.create_spec(SpecCreateRequest(title="Kept", description="d", content="c"))
+        stale = await service.create_spec(SpecCreateRequest(title="Stale", description="d", content="c"))
+
+        # Summary writes fail, e.g. a transient error or a worker that predates the index
+        async def failing(*args, **kwargs):
+            raise RuntimeError("summary write failed")
+        summaries.create_item = summaries.replace_item = failing
+        await service.update_spec_phase(stale.id, phase="plan", plan="# Plan")
+        missing = await service.create_spec(SpecCreateRequest(title="Missing", description="d", content="c"))
+        del summaries.create_item, summaries.replace_item
+
+        before, _ = await service.list_spec_summaries(10)
+        await service.reconcile_summaries()
+        after, _ = await service.list_spec_summaries(10)
+        return kept, stale, missing, before, after
+
+    kept, stale, missing, before, after = asyncio.run(run())
+    assert {s.id for s in before} == {kept.id, stale.id}
+    assert {s.id: s.version for s in after} == {kept.id: 1, stale.id: 2, missing.id: 1}
+
+
+def test_feature_number_allocation_fails_instead_of_guessing(cosmos_containers):
+    import asyncio
+    from azure.cosmos.exceptions import CosmosAccessConditionFailedError
+    from app.models.schemas import SpecCreateRequest
+    from app.services import spec_service as spec_module
+
+    container, _ = cosmos_containers
+    request = SpecCreateRequest(title="Contended", description="d", content="c")
+
+    async def always_conflicts(*args, **kwargs):
+        raise CosmosAccessConditionFailedError(message="precondition failed")
+
+    async def run():
+        service = spec_module.SpecService()
+        await service.create_spec(request)
+        container.replace_item = always_conflicts
+        service._feature_numbers.max_attempts = 3
+        with pytest.raises(RuntimeError):
+            await service.create_spec(request)
+
+    asyncio.run(run())
+    assert [d["feature_number"] for d in container.items.values() if d.get("type") == "spec"] == ["001"]
+
+
+def test_starter_spec_history_rebuilds_every_field(client):
+    from app.api.dependencies import get_spec_service
+    from app.services import spec_service as spec_module
+
+    service = spec_module.SpecService()
+    client.app.dependency_overrides[get_spec_service] = lambda: service
+    starter = next(iter(service._memory_specs.values()))
+
+    import asyncio
+    updated = asyncio.run(service.update_spec_phase(starter.id, phase="plan", plan="# Plan"))
+
+    versions = client.get(f"/api/specs/{starter.id}/versions").json()["versions"]
+    assert versions[0]["spec_data"] == updated.model_dump()
+    assert versions[1]["spec_data"] == starter.model_dump()
+
+
+def test_cosmos_pool_closes_client_left_by_previous_loop(monkeypatch):
+    import asyncio
+    from app.services.cosmos_client import CosmosClientPool
+
+    class FakeClient:
+        def __init__(self):
+            self.closed = False
+
+        async def close(self):
+            self.closed = True
+
+    pool = CosmosClientPool()
+    monkeypatch.setattr(pool, "_create_client", FakeClient)
+    first = asyncio.run(pool.client())
+    second = asyncio.run(pool.client())
+    assert first is not second
+    assert first.closed and not second.closed
+
+
+def test_change_feed_follower_hands_off_the_pager_continuation(cosmos_containers):
+    import asyncio
+    from app.models.schemas import SpecCreateRequest
+    from app.services import spec_service as spec_module
+
+    container, _ = cosmos_containers
+    applied = []
+
+    async def run():
+        follower = spec_module.SpecService()
+        upsert = follower._upsert_summary
+
+        async def recorded(summary):
+            applied.append((summary.id, summary.version))
+            return await upsert(summary)
+        follower._upsert_summary = recorded
+
+        task = asyncio.create_task(follower.follow_change_feed(interval=0.01))
+        await asyncio.sleep(0.05)
+        # Another worker writes while the follower's own summary upserts overwrite the shared headers
+        writer = spec_module.SpecService()
+        spec = await writer.create_spec(SpecCreateRequest(title="Fed", description="d", content="c"))
+        await asyncio.sleep(0.05)
+        await writer.update_spec_phase(spec.id, phase="plan", plan="# Plan")
+        await asyncio.sleep(0.05)
+        task.cancel()
+        return spec
+
+    spec = asyncio.run(run())
+    assert applied == [(spec.id, 1), (spec.id, 2)]
+    continuations = [call["continuation"] for call in container.feed_calls if call["continuation"] is not None]
+    assert continuations and all(token.isdigit() for token in continuations)
+
+
+def test_change_feed_follower_retries_batches_it_could_not_index(cosmos_containers):
+    import asyncio
+    from app.models.schemas import SpecCreateRequest
+    from app.services import spec_service as spec_module
+
+    container, summaries = cosmos_containers
+
+    async def failing(*args, **kwargs):
+        raise RuntimeError("summary write failed")
+
+    def indexed_version(spec_id):
+        return summaries.items.get(spec_id, {}).get("version")
+
+    async def run():
+        task = asyncio.create_task(spec_module.SpecService().follow_change_feed(interval=0.01))
+        await asyncio.sleep(0.05)
+        writer = spec_module.SpecService()
+        observed = []
+
+        # The first batch fails before any continuation exists, then a later one fails after
+        summaries.create_item = summaries.replace_item = failing
+        spec = await writer.create_spec(SpecCreateRequest(title="Retried", description="d", content="c"))
+        await asyncio.sleep(0.05)
+        observed.append(indexed_version(spec.id))
+        del summaries.create_item, summaries.replace_item
+        await asyncio.sleep(0.05)
+        observed.append(indexed_version(spec.id))
+
+        summaries.create_item = summaries.replace_item = failing
+        await writer.update_spec_phase(spec.id, phase="plan", plan="# Plan")
+        await asyncio.sleep(0.05)
+        observed.append(indexed_version(spec.id))
+        del summaries.create_item, summaries.replace_item
+        await asyncio.sleep(0.05)
+        observed.append(indexed_version(spec.id))
+        task.cancel()
+        return observed
+
+    assert asyncio.run(run()) == [None, 1, 1, 2]
+    # Retries before the first continuation start from the same point, never from "Now"
+    start_times = {call["start_time"] for call in container.feed_calls if call["continuation"] is None}
+    assert len(start_times) == 1 and "Now" not in start_times
+
+
+def test_cosmos_service_keeps_connecting_with_the_connection_string(monkeypatch):
+    import asyncio
+    from azure.identity import aio as identity_aio
+    from app.core.config import settings
+    from app.services import cosmos_client as cosmos_module
+
+    class FakeClient:
+        def __init__(self, url, credential):
+            self.url, self.credential = url, credential
+
+        @classmethod
+        def from_connection_string(cls, conn_str):
+            return cls(conn_str, "connection-string")
+
+    monkeypatch.setattr(cosmos_module, "CosmosClient", FakeClient)
+    monkeypatch.setattr(identity_aio, "DefaultAzureCredential", lambda: "aad")
+    monkeypatch.setattr(settings, "COSMOS_ENDPOINT", "https://specs.documents.azure.com", raising=False)
+    monkeypatch.setattr(settings, "COSMOS_KEY", "key", raising=False)
+    monkeypatch.setattr(settings, "COSMOS_CONNECTION_STRING", "AccountEndpoint=https://assignments.documents.azure.com/;")
+
+    # SpecService's pool prefers the endpoint; CosmosService's only ever uses the connection string
+    spec_client = asyncio.run(cosmos_module.CosmosClientPool().client())
+    assignment_client = asyncio.run(cosmos_module.CosmosClientPool(connection_string_only=True).client())
+    assert (spec_client.url, spec_client.credential) == ("https://specs.documents.azure.com", "aad")
+    assert assignment_client.url.startswith("AccountEndpoint=https://assignments.")
+    assert assignment_client.credential == "connection-string"
@@ -0,0 +1,658 @@
+import asyncio
+import json
+import random
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.services.ndjson_scanner import NDJSONObjectScanner
+
+
+TASKS = [
+    {"id": f"task-{i}", "title": "Parse {braces} and \"quotes\"", "description": "a\\b \\\" }{ é",
+     "acceptanceCriteria": ["x", "{nested}"], "meta": {"deep": {"n": i}}}
+    for i in range(12)
+]
+
+
+def _scan(text, cuts):
+    scanner = NDJSONObjectScanner()
+    out, last = [], 0
+    for cut in cuts + [len(text)]:
+        out.extend(scanner.feed(text[last:cut]))
+        last = cut
+    return out, scanner
+
+
+@pytest.mark.parametrize("layout", ["ndjson", "array", "fenced"])
+def test_scanner_handles_arbitrary_delta_boundaries(layout):
+    lines = [json.dumps(t, ensure_ascii=False) for t in TASKS]
+    text = {
+        "ndjson": "\n".join(lines) + "\n",
+        "array": "[" + ",\n".join(lines) + "]",
+        "fenced": "Here you go:\n```json\n" + "\n".join(lines) + "\n```",
+    }[layout]
+    rng = random.Random(7)
+    for _ in range(25):
+        cuts = sorted(rng.sample(range(1, len(text)), 40))
+        out, _ = _scan(text, cuts)
+        assert [json.loads(o) for o in out] == TASKS
+    # One character per delta, the worst case for the old rescanning loop
+    out, _ = _scan(text, list(range(1, len(text))))
+    assert len(out) == len(TASKS)
+
+
+def test_scanner_drops_malformed_objects_and_keeps_remainder():
+    scanner = NDJSONObjectScanner()
+    assert scanner.feed('{"id": 1}\n{"id": 2,}\n{"id"') == ['{"id": 1}']
+    assert scanner.invalid == 1
+    assert scanner.remainder() == '{"id"'
+    assert scanner.feed(': 3}') == ['{"id": 3}']
+    assert scanner.remainder() == ""
+
+    prose = NDJSONObjectScanner()
+    assert prose.feed("no tasks ") == []
+    assert prose.feed("here") == []
+    assert prose.remainder() == "no tasks here"
+
+
+class FakeStream:
+    def __init__(self, deltas, delay, tracker):
+        self._events = [SimpleNamespace(type="response.output_text.delta", delta=d) for d in deltas]
+        self._events.append(SimpleNamespace(type="response.completed", response=SimpleNamespace(output_text="".join(deltas))))
+        self._delay = delay
+        self._tracker = tracker
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        self._tracker.open += 1
+        self._tracker.peak = max(self._tracker.peak, self._tracker.open)
+        try:
+            for event in self._events:
+                await asyncio.sleep(self._delay)
+                yield event
+        finally:
+            self._tracker.open -= 1
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeAsyncOpenAI:
+    """Stands in for AsyncOpenAI; every stream emits the same NDJSON tasks."""
+
+    def __init__(self, deltas, delay=0.0):
+        self.base_url = "https://example.invalid/openai/v1/"
+        self.open = 0
+        self.peak = 0
+        self.streams = []
+        self.calls = 0
+        self._deltas = deltas
+        self._delay = delay
+        self.responses = SimpleNamespace(create=self._create)
+
+    async def _create(self, stream=False, **kwargs):
+        self.calls += 1
+        if not stream:
+            await asyncio.sleep(self._delay)
+            return SimpleNamespace(output_text="".join(self._deltas))
+        s = FakeStream(self._deltas, self._delay, self)
+        self.streams.append(s)
+        return s
+
+
+def _task_deltas(n=3, size=7):
+    text = "\n".join(json.dumps(t) for t in TASKS[:n]) + "\n"
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.fixture()
+def fake_llm():
+    from app.main import app
+    from app.api.dependencies import get_llm_clients
+
+    fake = FakeAsyncOpenAI(_task_deltas())
+    app.dependency_overrides[get_llm_clients] = lambda: SimpleNamespace(responses=lambda: fake)
+    return fake
+
+
+CUSTOMIZATION = {
+    "customer_scenario": "Support triage", "brand_theme": "Modern", "primary_color": "#0078d4",
+    "company_name": "Contoso", "industry": "Retail", "use_case": "Agents", "additional_requirements": "",
+}
+
+
+def _spec_id(client):
+    return client.get("/api/specs").json()[0]["id"]
+
+
+def test_breakdown_streams_tasks_from_async_client(client, fake_llm):
+    resp = client.post(f"/api/specs/{_spec_id(client)}/breakdown?stream=true", json=CUSTOMIZATION)
+    assert resp.status_code == 200
+    lines = [json.loads(line) for line in resp.text.splitlines() if line.strip()]
+    assert [t["id"] for t in lines] == ["task-0", "task-1", "task-2"]
+    assert all(s.closed for s in fake_llm.streams)
+
+
+def test_hundreds_of_concurrent_breakdown_streams(client, fake_llm):
+    """Load test: streams wait on the event loop, not on threadpool threads (40 by default)."""
+    from app.main import app
+
+    streams = 300
+    fake_llm._delay = 0.005
+    spec_id = _spec_id(client)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as ac:
+            async def one(i):
+                # Distinct requests; identical ones would share a single upstream stream
+                body = dict(CUSTOMIZATION, company_name=f"Contoso {i}")
+                r = await ac.post(f"/api/specs/{spec_id}/breakdown?stream=true", json=body)
+                return [line for line in r.text.splitlines() if line.strip()]
+            return await asyncio.gather(*(one(i) for i in range(streams)))
+
+    results = asyncio.run(run())
+    assert all(len(lines) == 3 for lines in results)
+    assert fake_llm.peak == streams
+    assert fake_llm.open == 0
+
+
+def test_identical_concurrent_breakdowns_share_one_upstream_stream(client, fake_llm):
+    from app.main import app
+    from app.services.single_flight import llm_flights
+
+    fake_llm._delay = 0.01
+    spec_id = _spec_id(client)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as ac:
+            async def one(delay):
+                await asyncio.sleep(delay)
+                r = await ac.post(f"/api/specs/{spec_id}/breakdown?stream=true", json=CUSTOMIZATION)
+                return r.text
+            # Late joiners still receive the objects emitted before they subscribed
+            return await asyncio.gather(*(one(i * 0.002) for i in range(50)))
+
+    results = asyncio.run(run())
+    assert len(fake_llm.streams) == 1
+    assert len(set(results)) == 1
+    assert [json.loads(line)["id"] for line in results[0].splitlines() if line.strip()] == ["task-0", "task-1", "task-2"]
+    assert llm_flights.in_flight == 0
+
+
+def test_enhance_does_not_coalesce_specs_with_identical_content(client, fake_llm):
+    from app.main import app
+
+    fake_llm._delay = 0.02
+    body = {"title": "Copy", "description": "d", "content": "c"}
+    ids = [client.post("/api/specs", json=body).json()["id"] for _ in range(2)]
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as ac:
+            return await asyncio.gather(*(ac.post(f"/api/specs/{spec_id}/enhance") for spec_id in ids))
+
+    responses = asyncio.run(run())
+    assert fake_llm.calls == 2
+    assert [r.json()["spec"]["id"] for r in responses] == ids
+    assert all(client.get(f"/api/specs/{spec_id}").json()["content"] != "c" for spec_id in ids)
+
+
+def test_shared_stream_cancels_upstream_when_last_subscriber_leaves():
+    from app.services.single_flight import SingleFlight
+
+    async def run():
+        flights = SingleFlight()
+        closed = []
+
+        async def upstream():
+            try:
+                yield "first"
+                await asyncio.sleep(60)
+                yield "never"
+            finally:
+                closed.append(True)
+
+        a, b = flights.stream("k", upstream), flights.stream("k", upstream)
+        assert await a.__anext__() == "first"
+        assert await b.__anext__() == "first"
+        await a.aclose()
+        assert closed == []
+        await b.aclose()
+        await asyncio.sleep(0)
+        return closed, flights
+
+    closed, flights = asyncio.run(asyncio.wait_for(run(), timeout=5))
+    assert closed == [True] and flights.coalesced == 1 and flights.in_flight == 0
+
+
+def test_disconnect_cancels_upstream_stream():
+    from app.api.streaming import stream_until_disconnect
+
+    async def run():
+        gone = asyncio.Event()
+        closed = []
+
+        async def receive():
+            await gone.wait()
+            return {"type": "http.disconnect"}
+
+        async def upstream():
+            try:
+                yield "first"
+                await asyncio.sleep(60)
+                yield "never"
+            finally:
+                closed.append(True)
+
+        relay = stream_until_disconnect(SimpleNamespace(receive=receive), upstream())
+        assert await relay.__anext__() == "first"
+        gone.set()
+        rest = [chunk async for chunk in relay]
+        return rest, closed
+
+    rest, closed = asyncio.run(asyncio.wait_for(run(), timeout=5))
+    assert rest == [] and closed == [True]
+
+
+def test_llm_clients_share_one_connection_pool(monkeypatch):
+    from app.core.config import settings
+    from app.services.llm_client import LLMClientPool
+
+    monkeypatch.setattr(settings, "AZURE_OPENAI_KEY", "test-key")
+    async def run():
+        pool = LLMClientPool()
+        responses, azure = pool.responses(), pool.azure()
+        assert pool.responses() is responses
+        assert responses._client is azure._client
+        await pool.aclose()
+        assert responses._client.is_closed
+        return pool
+
+    pool = asyncio.run(run())
+    # A new event loop gets a fresh pool rather than connections bound to the old loop
+    assert asyncio.run(_responses_http(pool)) is not None
+
+
+def test_llm_clients_close_client_left_by_previous_loop(monkeypatch):
+    from app.core.config import settings
+    from app.services.llm_client import LLMClientPool
+
+    monkeypatch.setattr(settings, "AZURE_OPENAI_KEY", "test-key")
+    pool = LLMClientPool()
+
+    async def open_client():
+        return pool.responses()._client
+
+    async def replace_client():
+        client = pool.responses()._client
+        await asyncio.sleep(0)  # let the scheduled close run
+        return client
+
+    stale = asyncio.run(open_client())
+    fresh = asyncio.run(replace_client())
+    assert stale is not fresh
+    assert stale.is_closed and not fresh.is_closed
+
+
+async def _responses_http(pool):
+    client = pool.responses()._client
+    assert not client.is_closed
+    await pool.aclose()
+    return client
+
+
+def test_repeated_breakdown_replays_from_cache(client, fake_llm):
+    spec_id = _spec_id(client)
+    first = client.post(f"/api/specs/{spec_id}/breakdown?stream=true", json=CUSTOMIZATION)
+    replay = client.post(f"/api/specs/{spec_id}/breakdown?stream=true", json=CUSTOMIZATION)
+    assert len(fake_llm.streams) == 1
+    assert replay.text == first.text
+    assert replay.text.startswith("\n")
+
+    # The non-streaming route shares the entry; no-cache forces a fresh generation
+    assert [t["id"] for t in client.post(f"/api/specs/{spec_id}/breakdown", json=CUSTOMIZATION).json()["tasks"]] == ["task-0", "task-1", "task-2"]
+    client.post(f"/api/specs/{spec_id}/breakdown?stream=true", json=CUSTOMIZATION, headers={"Cache-Control": "no-cache"})
+    assert len(fake_llm.streams) == 2
+
+    changed = dict(CUSTOMIZATION, company_name="Fabrikam")
+    client.post(f"/api/specs/{spec_id}/breakdown?stream=true", json=changed)
+    assert len(fake_llm.streams) == 3
+
+
+def test_no_cache_regenerates_cached_constitution_and_template_breakdown(client):
+    from app.main import app
+    from app.api.dependencies import get_llm_clients
+
+    calls = []
+
+    async def respond(**kwargs):
+        calls.append("responses")
+        return SimpleNamespace(output_text=f"# Constitution {len(calls)}")
+
+    async def complete(**kwargs):
+        calls.append("chat")
+        task = dict(TASKS[0], id=f"task-{len(calls)}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps([task])))])
+
+    fake = SimpleNamespace(
+        responses=lambda: SimpleNamespace(responses=SimpleNamespace(create=respond)),
+        azure=lambda: SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=complete))),
+    )
+    app.dependency_overrides[get_llm_clients] = lambda: fake
+    body = {"project_name": "Demo", "project_description": "A demo project"}
+
+    def constitution(**headers):
+        return client.post("/api/specs/constitution/populate", json=body, headers=headers).json()["constitution"]
+
+    assert constitution() == "# Constitution 1"
+    assert constitution() == "# Constitution 1"
+    # Regenerating skips the lookup but still stores the fresh result
+    assert constitution(**{"Cache-Control": "no-cache"}) == "# Constitution 2"
+    assert constitution() == "# Constitution 2"
+
+    template_id = client.get("/api/templates").json()[0]["id"]
+
+    def breakdown(**headers):
+        resp = client.post(f"/api/templates/{template_id}/breakdown", json=CUSTOMIZATION, headers=headers)
+        return [t["id"] for t in resp.json()["tasks"]]
+
+    assert breakdown() == breakdown() == ["task-3"]
+    assert breakdown(**{"Cache-Control": "no-cache"}) == ["task-4"]
+    assert breakdown() == ["task-4"]
+    assert calls == ["responses", "responses", "chat", "chat"]
+
+
+def test_llm_cache_expires_evicts_and_matches_near_duplicates():
+    from app.services.llm_cache import LLMResponseCache
+
+    now = [0.0]
+    cache = LLMResponseCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # evicts "b", the least recently used
+    assert cache.get("b") is None and cache.get("a") == 1
+    now[0] = 11
+    assert cache.get("a") is None
+
+    vectors = {"blue widgets": [1.0, 0.1], "blue widget": [1.0, 0.12], "red gadgets": [0.0, 1.0]}
+
+    async def embed(text):
+        return vectors[text]
+
+    similar = LLMResponseCache(similarity=0.99, embed=embed)
+
+    async def run():
+        value, vector = await similar.lookup("k1", "spec", "blue widgets")
+        assert value is None
+        similar.put("k1", "tasks", "spec", vector)
+        assert (await similar.lookup("k2", "spec", "blue widget"))[0] == "tasks"
+        assert (await similar.lookup("k3", "spec", "red gadgets"))[0] is None
+        assert (await similar.lookup("k2", "other-spec", "blue widget"))[0] is None
+
+    asyncio.run(run())
+
+
+def test_aimd_limiter_adapts_to_throttling_and_quota_headers():
+    from app.services.llm_limiter import AIMDLimiter
+
+    now = [0.0]
+    limiter = AIMDLimiter(initial=4, max_limit=5, token_floor=1000, clock=lambda: now[0])
+    limiter.observe(200, {"x-ratelimit-remaining-requests": "100", "x-ratelimit-remaining-tokens": "90000"})
+    assert limiter.limit == 4.25
+    limiter.observe(429, {"retry-after": "2"})
+    limiter.observe(429, {})  # same burst, still within the cooldown
+    assert limiter.limit == 2.125 and limiter.throttled == 2 and limiter.decreases == 1
+    assert not limiter._can_admit()  # paused by Retry-After
+    now[0] = 2.5
+    assert limiter._can_admit()
+    limiter.observe(200, {"x-ratelimit-remaining-tokens": "500"})
+    assert limiter.limit == 1.0625
+    limiter.observe(200, {"x-ratelimit-remaining-requests": "0", "x-ratelimit-remaining-tokens": "90000"})
+    assert limiter.limit == 1.0625  # at the request quota edge: hold
+    assert limiter.snapshot()["remaining_requests"] == 0
+
+
+def test_limiter_queue_admits_interactive_calls_first():
+    from app.services.llm_limiter import AIMDLimiter, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, llm_priority
+
+    async def run():
+        limiter = AIMDLimiter(initial=1, max_limit=1)
+        order = []
+
+        async def call(name, level):
+            with llm_priority(level):
+                await limiter.acquire()
+            order.append(name)
+            await asyncio.sleep(0)
+            await limiter.release()
+
+        await limiter.acquire()
+        tasks = [asyncio.ensure_future(call("fallback", PRIORITY_BACKGROUND))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.ensure_future(call("stream", PRIORITY_INTERACTIVE)))
+        await asyncio.sleep(0)
+        assert limiter.queue_depth == 2
+        await limiter.release()
+        await asyncio.gather(*tasks)
+        return order, limiter
+
+    order, limiter = asyncio.run(asyncio.wait_for(run(), timeout=5))
+    assert order == ["stream", "fallback"]
+    assert limiter.in_flight == 0 and limiter.queue_depth == 0 and limiter.max_queue_depth == 2
+
+
+def test_limited_transport_holds_slot_until_body_closed(client):
+    from app.services.llm_limiter import AIMDLimiter, LimitedTransport
+
+    class Body(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield b'{"error": "throttled"}'
+
+    def handle(request):
+        return httpx.Response(429, headers={"x-ratelimit-remaining-tokens": "0"}, stream=Body())
+
+    async def run():
+        limiter = AIMDLimiter(initial=2)
+        async with httpx.AsyncClient(transport=LimitedTransport(httpx.MockTransport(handle), limiter)) as http:
+            async with http.stream("POST", "https://example.invalid/openai/v1/responses") as response:
+                assert response.status_code == 429
+                assert limiter.in_flight == 1
+            return limiter
+
+    limiter = asyncio.run(run())
+    assert limiter.in_flight == 0 and limiter.throttled == 1 and limiter.limit == 1.0
+
+    metrics = client.get("/api/llm/metrics").json()
+    assert {"limit", "queue_depth", "wait_seconds_avg"} <= set(metrics["limiter"])
+
+
+def test_queued_calls_progress_while_long_streams_are_open():
+    from app.services.llm_limiter import AIMDLimiter, LimitedTransport
+
+    finish = None
+
+    class LongBody(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield b"data: first\n\n"
+            await finish.wait()
+            yield b"data: done\n\n"
+
+    def handle(request):
+        if request.url.path.endswith("/stream"):
+            return httpx.Response(200, stream=LongBody())
+        return httpx.Response(200, json={"ok": True})
+
+    async def run():
+        nonlocal finish
+        finish = asyncio.Event()
+        limiter = AIMDLimiter(initial=2, max_limit=2)
+        async with httpx.AsyncClient(transport=LimitedTransport(httpx.MockTransport(handle), limiter)) as http:
+            streams = []
+            for _ in range(4):  # twice the limit
+                response = await http.send(http.build_request("POST", "https://example.invalid/stream"), stream=True)
+                chunks = response.aiter_bytes()
+                assert await chunks.__anext__() == b"data: first\n\n"
+                streams.append((response, chunks))
+            # Every stream is still open, yet a queued call is admitted right away
+            quick = await asyncio.wait_for(http.post("https://example.invalid/quick"), timeout=1)
+            in_flight = limiter.in_flight
+            finish.set()
+            for response, chunks in streams:
+                assert [chunk async for chunk in chunks] == [b"data: done\n\n"]
+                await response.aclose()
+            return quick, in_flight, limiter
+
+    quick, in_flight, limiter = asyncio.run(asyncio.wait_for(run(), timeout=5))
+    assert quick.json() == {"ok": True}
+    assert in_flight == 0 and limiter.in_flight == 0
+
+
+def test_slow_breakdown_is_hedged_on_secondary_deployment(client, fake_llm, monkeypatch):
+    from app.core.config import settings
+    from app.services.llm_limiter import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, _priority
+
+    monkeypatch.setattr(settings, "BREAKDOWN_HEDGE_AFTER", 0.05)
+    monkeypatch.setattr(settings, "BREAKDOWN_HEDGE_MODEL", "backup-deployment")
+    models = []
+    priorities = []
+
+    async def create(stream=False, model=None, **kwargs):
+        models.append(model)
+        priorities.append(_priority.get())
+        s = FakeStream(_task_deltas(), 5 if model == settings.MODEL_NAME else 0, fake_llm)
+        fake_llm.streams.append(s)
+        return s
+    fake_llm.responses.create = create
+
+    resp = client.post(f"/api/specs/{_spec_id(client)}/breakdown?stream=true", json=CUSTOMIZATION)
+    assert [json.loads(line)["id"] for line in resp.text.splitlines() if line.strip()] == ["task-0", "task-1", "task-2"]
+    assert models == [settings.MODEL_NAME, "backup-deployment"]
+    assert priorities == [PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND]
+    assert all(s.closed for s in fake_llm.streams)
+    assert fake_llm.open == 0  # the slow primary was cancelled
+
+
+def test_empty_breakdown_stream_falls_back_without_hedging(client, fake_llm, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "BREAKDOWN_HEDGE_AFTER", 0.05)
+    streamed = []
+    create = fake_llm.responses.create
+
+    async def empty_stream(stream=False, **kwargs):
+        if not stream:
+            return await create(stream=False, **kwargs)
+        streamed.append(kwargs["model"])
+        fake_llm.calls += 1
+        return FakeStream([], 0, fake_llm)
+    fake_llm.responses.create = empty_stream
+
+    resp = client.post(f"/api/specs/{_spec_id(client)}/breakdown?stream=true", json=CUSTOMIZATION)
+    assert [json.loads(line)["id"] for line in resp.text.splitlines() if line.strip()] == ["task-0", "task-1", "task-2"]
+    # One stream that finished empty, then the non-stream fallback; no hedge
+    assert streamed == [settings.MODEL_NAME]
+    assert fake_llm.calls == 2
+
+
+def test_hedging_is_opt_in():
+    from app.core.config import Settings
+
+    assert Settings().BREAKDOWN_HEDGE_AFTER == 0
+
+
+def test_failed_attempt_starts_hedge_without_waiting_for_deadline():
+    from app.api.streaming import first_to_yield
+
+    async def failing():
+        raise RuntimeError("429")
+        yield  # pragma: no cover
+
+    async def working():
+        yield "a"
+        yield "b"
+
+    async def run():
+        return [chunk async for chunk in first_to_yield([failing, working], hedge_after=60)]
+
+    assert asyncio.run(asyncio.wait_for(run(), timeout=5)) == ["a", "b"]
+
+
+def test_empty_attempt_does_not_start_hedge_before_deadline():
+    from app.api.streaming import first_to_yield
+
+    started = []
+
+    def attempt(name):
+        async def generate():
+            started.append(name)
+            return
+            yield  # pragma: no cover
+        return generate
+
+    async def run():
+        return [chunk async for chunk in first_to_yield([attempt("primary"), attempt("hedge")], hedge_after=60)]
+
+    assert asyncio.run(asyncio.wait_for(run(), timeout=5)) == []
+    assert started == ["primary"]
+
+
+def test_prompt_budget_shortens_largest_sections_and_keeps_headings():
+    from app.services.prompt_budget import count_tokens, fit_sections
+
+    doc = "Intro line.\n" + "## Goals\nShip it.\n" + "## Details\n" + "word " * 4000 + "\n## Risks\nNone.\n"
+    fitted = fit_sections(doc, 300)
+    assert count_tokens(fitted) <= 300
+    for kept in ("Intro line.", "## Goals\nShip it.", "## Details\nword", "## Risks\nNone."):
+        assert kept in fitted
+    assert fit_sections("short", 300) == "short"
+
+
+def test_prompt_budget_keeps_every_heading_and_marker_within_budget():
+    from app.services.prompt_budget import OMITTED, count_tokens, fit_sections
+
+    headings = [f"## Section {i}" for i in range(12)]
+    doc = "".join(f"{h}\n" + "detail " * (50 * (i + 1)) + "\n" for i, h in enumerate(headings))
+    for measure in (count_tokens, len):
+        budget_for_headings = measure("".join(f"{h}{OMITTED}" for h in headings))
+        for budget in (budget_for_headings, budget_for_headings + 7, budget_for_headings * 2, measure(doc) - 1):
+            fitted = fit_sections(doc, budget, measure)
+            assert measure(fitted) <= budget
+            # Squeezed sections keep their heading and say they were shortened
+            assert all(h + "\n" in fitted for h in headings)
+            assert fitted.count(OMITTED) >= 1 and fitted.endswith(OMITTED)
+
+    tiny = fit_sections(doc, 40)
+    assert count_tokens(tiny) <= 40 and tiny.endswith(OMITTED) and tiny.startswith(headings[0])
+
+
+def test_devin_prompt_fits_free_text_and_keeps_repository():
+    from app.services.agent_service import DEVIN_PROMPT_LIMIT, _devin_prompt
+
+    customization = SimpleNamespace(**dict(CUSTOMIZATION, customer_scenario="scenario " * 5000, additional_requirements="Use SSO."))
+    prompt = _devin_prompt("Chat", "template", customization, "https://github.com/contoso/chat")
+    assert len(prompt) <= DEVIN_PROMPT_LIMIT
+    assert "Use SSO." in prompt
+    assert prompt.endswith("- Document changes in the PR description.")
+    assert "https://github.com/contoso/chat" in prompt
+
+
+def test_spec_prompt_text_is_cached_per_spec_version(monkeypatch):
+    from app.services import prompt_budget as budget_module
+
+    calls = []
+    real = budget_module.fit_sections
+    monkeypatch.setattr(budget_module, "fit_sections", lambda text, budget: calls.append(text) or real(text, budget))
+    budgeter = budget_module.PromptBudgeter()
+    spec = SimpleNamespace(id="s1", version=1, content="# Spec\n" + "x " * 3000)
+    first = budgeter.spec_field(spec, "content", 100)
+    assert budgeter.spec_field(spec, "content", 100) == first and len(calls) == 1
+    spec.version, spec.content = 2, "# Spec\nshort"
+    assert budgeter.spec_field(spec, "content", 100) == "# Spec\nshort" and len(calls) == 2
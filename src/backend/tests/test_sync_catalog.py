@@ -0,0 +1,370 @@
+import asyncio
+import base64
+import hashlib
+import json
+
+import httpx
+import pytest
+
+from app import sync_catalog
+
+
+DETAIL = """<html><head>{meta}</head>
+<body><h1>{title}</h1><a href="https://github.com/{owner}/{repo}">repo</a>
+<span class="chip">Python</span><span class="chip">GPT-4o</span><span class="chip">Azure Cosmos DB</span>
+</body></html>"""
+
+
+def _sitemap(slugs, lastmod=None):
+    mod = f"<lastmod>{lastmod}</lastmod>" if lastmod else ""
+    locs = "".join(
+        f"<url><loc>{sync_catalog.HOME}repo/{slug}/</loc>{mod}</url>" for slug in slugs
+    )
+    return f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{locs}</urlset>'
+
+
+def _handler(slugs, calls, lastmod=None):
+    def handle(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        host, path = request.url.host, request.url.path
+        if path == "/graphql":
+            return _graphql(request)
+        response = _respond(host, path, slugs, lastmod)
+        if response.status_code == 200:
+            etag = f'"{hashlib.sha1(response.content).hexdigest()[:12]}"'
+            if request.headers.get("If-None-Match") == etag:
+                return httpx.Response(304, headers={"ETag": etag})
+            response.headers["ETag"] = etag
+        return response
+    return handle
+
+
+def _graphql(request):
+    body = json.loads(request.content)
+    variables = body["variables"]
+    data = {"rateLimit": {"cost": 1, "remaining": 4999, "resetAt": "2025-01-01T00:00:00Z"}}
+    for key, name in variables.items():
+        if not key.startswith("n"):
+            continue
+        alias = "r" + key[1:]
+        if name == "missing":
+            data[alias] = None
+        elif "readme" in body["query"]:
+            data[alias] = {"readme": {"text": "# T\nGraphQL readme blurb"}, "readmeLower": None}
+        else:
+            data[alias] = {
+                "description": "" if name.startswith("empty") else f"{name} via graphql",
+                "stargazerCount": 42,
+                "forkCount": 7,
+                "primaryLanguage": {"name": "TypeScript"},
+                "repositoryTopics": {"nodes": [{"topic": {"name": "rag"}}]},
+            }
+    return httpx.Response(200, json={"data": data})
+
+
+def _respond(host, path, slugs, lastmod):
+    if path.endswith("sitemap.xml"):
+        return httpx.Response(200, text=_sitemap(slugs, lastmod))
+    if host == "azure.github.io" and "/repo/" in path:
+        owner, repo = path.split("/repo/")[-1].strip("/").split("/")
+        meta = "" if repo.startswith("empty") else '<meta name="description" content="Site blurb">'
+        return httpx.Response(200, text=DETAIL.format(meta=meta, title=repo.title(), owner=owner, repo=repo))
+    if host == "api.github.com" and path.endswith("/readme"):
+        content = base64.b64encode(b"# Title\nA readme blurb that is long enough\n").decode()
+        return httpx.Response(200, json={"content": content})
+    if host == "api.github.com":
+        repo = path.rstrip("/").split("/")[-1]
+        if repo.startswith("empty"):
+            return httpx.Response(200, json={"description": "", "stargazers_count": 1})
+        return httpx.Response(200, json={
+            "description": f"{repo} agent sample",
+            "stargazers_count": 10,
+            "forks_count": 3,
+            "language": "Python",
+            "topics": ["agents"],
+        })
+    return httpx.Response(404)
+
+
+@pytest.fixture()
+def no_featured(monkeypatch, tmp_path):
+    featured = tmp_path / "featured.json"
+    featured.write_text("[]")
+    monkeypatch.setattr(sync_catalog, "FEATURED", featured)
+    monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+    return featured
+
+
+def test_fetch_async_builds_enriched_catalog(tmp_path, no_featured):
+    slugs = ["azure-samples/alpha", "azure-samples/empty-beta", "azure-samples/alpha"]
+    calls = []
+    out = tmp_path / "catalog.json"
+    items = asyncio.run(sync_catalog.fetch_async(
+        out, transport=httpx.MockTransport(_handler(slugs, calls)), cache_dir=None
+    ))
+
+    assert [o["id"] for o in items] == ["alpha", "empty-beta"]
+    alpha, beta = items
+    assert alpha["star_count"] == 10 and alpha["fork_count"] == 3
+    assert alpha["description"] == "alpha agent sample"
+    assert "agents" in alpha["tags"] and "Python" in alpha["languages"]
+    assert alpha["models"] == ["GPT-4o"] and alpha["databases"] == ["Azure Cosmos DB"]
+    # No site or GitHub description: falls back to the README
+    assert beta["description"] == "A readme blurb that is long enough"
+    assert json.loads(out.read_text()) == items
+
+
+def test_incremental_sync_revalidates_and_merges(tmp_path, no_featured):
+    slugs = ["azure-samples/alpha", "azure-samples/gamma"]
+    out = tmp_path / "catalog.json"
+    cache_dir = tmp_path / "cache"
+    calls = []
+    transport = httpx.MockTransport(_handler(slugs, calls, lastmod="2025-01-01"))
+    asyncio.run(sync_catalog.fetch_async(out, transport=transport, cache_dir=cache_dir))
+
+    # Hand-curated fields survive an incremental merge
+    catalog = json.loads(out.read_text())
+    catalog[0]["planning"] = {"tech_stack": "FastAPI"}
+    out.write_text(json.dumps(catalog))
+
+    calls.clear()
+    items = asyncio.run(sync_catalog.fetch_async(
+        out, transport=transport, cache_dir=cache_dir, incremental=True
+    ))
+    assert [o["id"] for o in items] == ["alpha", "gamma"]
+    assert items[0]["planning"] == {"tech_stack": "FastAPI"}
+    assert items[0]["star_count"] == 10
+    # Unchanged lastmod: detail pages are not fetched again
+    assert not any("/repo/" in u for u in calls)
+
+    calls.clear()
+    transport = httpx.MockTransport(_handler(slugs + ["azure-samples/delta"], calls, lastmod="2025-02-01"))
+    items = asyncio.run(sync_catalog.fetch_async(
+        out, transport=transport, cache_dir=cache_dir, incremental=True
+    ))
+    assert [o["id"] for o in items] == ["alpha", "delta", "gamma"]
+    assert items[0]["planning"] == {"tech_stack": "FastAPI"}
+
+
+def test_graphql_batch_enrichment_with_rest_fallback(tmp_path, no_featured):
+    slugs = ["azure-samples/alpha", "azure-samples/empty-beta", "azure-samples/missing"]
+    calls = []
+    items = asyncio.run(sync_catalog.fetch_async(
+        tmp_path / "catalog.json",
+        transport=httpx.MockTransport(_handler(slugs, calls)),
+        cache_dir=None,
+        github_token="token",
+    ))
+    by_id = {o["id"]: o for o in items}
+    assert by_id["alpha"]["star_count"] == 42
+    assert by_id["alpha"]["description"] == "alpha via graphql"
+    assert "rag" in by_id["alpha"]["tags"] and "TypeScript" in by_id["alpha"]["languages"]
+    assert by_id["empty-beta"]["description"] == "GraphQL readme blurb"
+    # Only the repo GraphQL could not resolve goes through REST
+    assert by_id["missing"]["description"] == "missing agent sample"
+    rest = [u for u in calls if "api.github.com/repos/" in u]
+    assert rest == ["https://api.github.com/repos/azure-samples/missing"]
+    assert sum(1 for u in calls if u.endswith("/graphql")) == 2
+
+
+def test_description_fallbacks_share_order_and_rest_is_authenticated(tmp_path, no_featured):
+    slugs = ["azure-samples/empty-beta", "azure-samples/missing", "azure-samples/empty-missing"]
+    calls, auth = [], {}
+    base = _handler(slugs, calls)
+
+    def handle(request):
+        if request.url.host == "api.github.com" and request.url.path.startswith("/repos/"):
+            auth[request.url.path] = request.headers.get("Authorization")
+        if request.url.host == "github.com":
+            return httpx.Response(200, text='<meta property="og:description" content="Page meta blurb">')
+        return base(request)
+
+    items = asyncio.run(sync_catalog.fetch_async(
+        tmp_path / "catalog.json", transport=httpx.MockTransport(handle), cache_dir=None, github_token="token",
+    ))
+    by_id = {o["id"]: o for o in items}
+    # As on the REST path, the page meta wins over the GraphQL README
+    assert by_id["empty-beta"]["description"] == "Page meta blurb"
+    assert by_id["empty-missing"]["description"] == "Page meta blurb"
+    assert not any("readme" in u for u in calls if "api.github.com" in u)
+    # Repos GraphQL could not resolve fall back to REST with the same token
+    assert auth and set(auth.values()) == {"Bearer token"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def _scheduler(clock, **kwargs):
+    from app.sync.scheduler import RateLimitScheduler
+    return RateLimitScheduler(clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_scheduler_paces_from_headers_and_waits_out_reset():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, burst=2)
+
+    async def run():
+        for _ in range(2):
+            await scheduler.acquire("api.github.com")
+        assert clock.slept == []
+        # 10 requests left over 100s: one token every 10s
+        ok = httpx.Response(200, headers={"X-RateLimit-Remaining": "10", "X-RateLimit-Reset": "1100"})
+        assert scheduler.observe("api.github.com", ok) is False
+        await scheduler.acquire("api.github.com")
+        assert clock.slept == [pytest.approx(10.0)]
+
+        exhausted = httpx.Response(403, headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1200"})
+        assert scheduler.observe("api.github.com", exhausted) is True
+        await scheduler.acquire("api.github.com")
+        assert clock.now >= 1201
+        # Other hosts are unaffected
+        before = clock.now
+        await scheduler.acquire("github.com")
+        assert clock.now == before
+
+    asyncio.run(run())
+    assert scheduler.throttled == 1
+
+
+def _limited(handler, limited):
+    """Answer 403 + Retry-After for REST calls on repos in ``limited``."""
+    def handle(request):
+        repo = request.url.path.rstrip("/").split("/")[-1]
+        if request.url.host == "api.github.com" and repo in limited:
+            limited[repo] -= 1
+            if limited[repo] >= 0:
+                return httpx.Response(403, headers={"Retry-After": "30"}, json={"message": "secondary rate limit"})
+        return handler(request)
+    return handle
+
+
+def test_rate_limited_requests_are_retried_not_dropped(tmp_path, no_featured):
+    clock = FakeClock()
+    handler = _limited(_handler(["azure-samples/alpha"], []), {"alpha": 2})
+    items = asyncio.run(sync_catalog.fetch_async(
+        tmp_path / "catalog.json",
+        transport=httpx.MockTransport(handler),
+        cache_dir=None,
+        scheduler=_scheduler(clock),
+    ))
+    assert items[0]["star_count"] == 10
+    assert items[0]["description"] == "alpha agent sample"
+    assert sum(s for s in clock.slept if s >= 30) >= 60
+
+
+def test_sync_stops_on_long_limit_and_resumes(tmp_path, no_featured):
+    from app.sync.scheduler import RateLimitExceeded
+
+    slugs = ["azure-samples/alpha", "azure-samples/gamma"]
+    out = tmp_path / "catalog.json"
+    cache_dir = tmp_path / "cache"
+    calls = []
+    handler = _limited(_handler(slugs, calls), {"gamma": 100})
+    with pytest.raises(RateLimitExceeded):
+        asyncio.run(sync_catalog.fetch_async(
+            out, transport=httpx.MockTransport(handler), cache_dir=cache_dir,
+            scheduler=_scheduler(FakeClock(), max_wait=10),
+        ))
+    # No partial catalog; finished work is checkpointed
+    assert not out.exists()
+    assert (cache_dir / sync_catalog.QUEUE_FILE).exists()
+
+    calls.clear()
+    items = asyncio.run(sync_catalog.fetch_async(
+        out, transport=httpx.MockTransport(_handler(slugs, calls)), cache_dir=cache_dir,
+        resume=True, scheduler=_scheduler(FakeClock()),
+    ))
+    assert [o["description"] for o in items] == ["alpha agent sample", "gamma agent sample"]
+    assert not any(u.endswith("/repos/azure-samples/alpha") for u in calls)
+    assert not (cache_dir / sync_catalog.QUEUE_FILE).exists()
+
+
+@pytest.mark.parametrize("html", [
+    DETAIL.format(meta='<meta name="description" content="Site blurb">', title="Alpha", owner="o", repo="r"),
+    "<html><body><div class='post-title'> Post <i>Title</i> </div><h1>Later</h1><p> first <b>para</b></p>"
+    "<a href='https://GITHUB.com/x'>no</a><a href=' https://github.com/o/r '>r</a>"
+    "<span class='Label x'>GPT-4o</span><span class='label'>skip</span><em class='badge'><!-- c -->Redis</em></body></html>",
+    "<html><head><meta name='description'></head><body><p>ignored</p></body></html>",
+    "",
+])
+def test_xpath_parser_matches_beautifulsoup(html):
+    from app.sync.detail_parser import extract_fields, extract_fields_soup
+    assert extract_fields(html) == extract_fields_soup(html)
+
+
+def test_parse_stage_in_worker_processes(tmp_path, no_featured):
+    items = asyncio.run(sync_catalog.fetch_async(
+        tmp_path / "catalog.json",
+        transport=httpx.MockTransport(_handler(["azure-samples/alpha"], [])),
+        cache_dir=None,
+        parse_workers=2,
+    ))
+    assert items[0]["title"] == "Alpha"
+    assert items[0]["models"] == ["GPT-4o"]
+
+
+def test_record_then_replay_through_stand_in_server(tmp_path, no_featured):
+    from app.sync import replay
+
+    slugs = ["azure-samples/alpha", "azure-samples/empty-beta"]
+    root = tmp_path / "fixtures"
+    fixtures = replay.Fixtures(root)
+    recorder = replay.RecordingTransport(fixtures, httpx.MockTransport(_handler(slugs, [])))
+    recorded = asyncio.run(sync_catalog.fetch_async(
+        root / replay.CATALOG_FILE, transport=recorder, cache_dir=None, parse_workers=0
+    ))
+    assert len(fixtures) > 0
+
+    # GitHub REST allows 2 requests per window; the crawler has to pace itself across windows
+    clock = FakeClock()
+    app = replay.StandInServer(
+        fixtures, rate_limits={"api.github.com": replay.RateLimit(2, 60)}, clock=clock
+    )
+    items = asyncio.run(sync_catalog.fetch_async(
+        tmp_path / "replayed.json",
+        transport=httpx.ASGITransport(app=app),
+        cache_dir=None,
+        parse_workers=0,
+        scheduler=_scheduler(clock),
+    ))
+    assert clock.now >= 1060 and app.misses == 0
+    assert replay.compare_catalogs(recorded, items) == []
+
+
+def test_compare_catalogs_ignores_list_order():
+    from app.sync import replay
+
+    recorded = [{"github_url": "https://github.com/a/b", "tags": ["x", "y"], "languages": ["Python", "Go"]}]
+    replayed = [{"github_url": "https://github.com/a/b", "tags": ["y", "x"], "languages": ["Go", "Python"]}]
+    assert replay.compare_catalogs(recorded, replayed) == []
+    replayed[0]["tags"] = ["x"]
+    assert replay.compare_catalogs(recorded, replayed) == ["https://github.com/a/b: tags ['x', 'y'] != ['x']"]
+
+
+def test_bench_against_local_server(tmp_path, no_featured):
+    from app.sync import replay
+
+    root = tmp_path / "fixtures"
+    fixtures = replay.Fixtures(root)
+    recorder = replay.RecordingTransport(fixtures, httpx.MockTransport(_handler(["azure-samples/alpha"], [])))
+    asyncio.run(sync_catalog.fetch_async(root / replay.CATALOG_FILE, transport=recorder, cache_dir=None))
+
+    app = replay.StandInServer(fixtures, latency=0.01)
+    server, base_url = replay.serve(app)
+    try:
+        result = asyncio.run(replay.bench(root, replay.LocalServerTransport(base_url), app, parse_workers=0))
+    finally:
+        server.should_exit = True
+    assert result["templates"] == 1
+    assert result["not_recorded"] == 0
+    assert result["differences"] == []
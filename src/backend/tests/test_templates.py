@@ -0,0 +1,271 @@
+import pytest
+
+from app.models.schemas import Template
+from app.services.search_index import SearchIndex, tokenize
+
+
+def _template(id, title, description="", **kwargs):
+    data = {
+        "id": id,
+        "title": title,
+        "description": description,
+        "tags": [],
+        "languages": [],
+        "models": [],
+        "databases": [],
+        "collection": "Azure AI App Templates",
+        "task": "Agent",
+        "github_url": f"https://github.com/example/{id}",
+        "fork_count": 0,
+        "star_count": 0,
+        "is_featured": False,
+        "icon": "🤖",
+        "created_at": "2025-01-01",
+    }
+    data.update(kwargs)
+    return Template(**data)
+
+
+@pytest.fixture()
+def index():
+    return SearchIndex([
+        _template("a", "Customer Support Agent", "Routes tickets with sentiment analysis",
+                  languages=["Python"], databases=["PostgreSQL"]),
+        _template("b", "Chat with your data", "RAG over documents",
+                  languages=[".NET/C#"], models=["GPT-4o"]),
+        _template("c", "Python chatbot", "Simple assistant", tags=["chat"]),
+    ])
+
+
+def test_tokenize_keeps_language_symbols():
+    assert tokenize(".NET/C# and GPT-4o") == ["net", "c#", "and", "gpt", "4o"]
+
+
+def test_search_prefix_and_intersection(index):
+    assert index.search("chat") == [1, 2]
+    assert index.search("pyth chat") == [2]
+    assert index.search("postgres") == [0]
+    assert index.search("c#") == [1]
+
+
+def test_search_tolerates_single_typo(index):
+    assert index.search("sentimnet") == [0]
+    assert index.search("pyhton") == [0, 2]
+    assert index.search("zzzz") == []
+
+
+def test_search_without_terms_returns_none(index):
+    assert index.search("  --  ") is None
+
+
+def test_templates_endpoint_search(client):
+    resp = client.get("/api/templates", params={"search": "customer support"})
+    assert resp.status_code == 200
+    ids = [t["id"] for t in resp.json()]
+    assert "ai-powered-customer-support-system" in ids
+
+
+def test_filter_bitmaps_match_linear_scan():
+    from app.services.template_service import TemplateService
+
+    service = TemplateService()
+    templates = service.get_all_templates()
+    options = service.get_filter_options()
+    for language in options.languages:
+        expected = {t.id for t in templates if language in t.languages}
+        got = {t.id for t in service.filter_templates(language=language)}
+        assert got == expected
+    for task in options.tasks:
+        for database in options.databases:
+            expected = {
+                t.id for t in templates
+                if (task == t.task or task in t.tags) and database in t.databases
+            }
+            got = {t.id for t in service.filter_templates(task=task, database=database)}
+            assert got == expected
+
+
+def test_filter_counts_endpoint(client):
+    resp = client.get("/api/filters/counts", params={"language": "Python"})
+    assert resp.status_code == 200
+    data = resp.json()
+    listed = client.get("/api/templates", params={"language": "Python"}).json()
+    assert data["total"] == len(listed)
+    # The selected facet still counts its alternatives
+    assert len(data["languages"]) > 1
+    assert sum(data["tasks"].values()) == data["total"]
+
+
+@pytest.mark.parametrize("sort,key", [
+    ("Most Popular", "star_count"),
+    ("Most Recent", "created_at"),
+    ("Most Forked", "fork_count"),
+])
+def test_presorted_orders_match_sort(sort, key):
+    from app.services.template_service import TemplateService
+
+    service = TemplateService()
+    expected = sorted(service.get_all_templates(), key=lambda t: getattr(t, key), reverse=True)
+    assert [t.id for t in service.filter_templates(sort=sort)] == [t.id for t in expected]
+    python = [t for t in expected if "Python" in t.languages]
+    assert [t.id for t in service.filter_templates(language="Python", sort=sort)] == [t.id for t in python]
+
+
+def test_templates_cursor_pagination(client):
+    everything = client.get("/api/templates", params={"limit": 500}).json()
+    seen = []
+    params = {"limit": 7}
+    while True:
+        resp = client.get("/api/templates", params=params)
+        assert resp.status_code == 200
+        assert int(resp.headers["X-Total-Count"]) == len(everything)
+        seen.extend(t["id"] for t in resp.json())
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params = {"limit": 7, "cursor": cursor}
+    assert seen == [t["id"] for t in everything]
+
+    offset_page = client.get("/api/templates", params={"limit": 5, "offset": 10}).json()
+    assert [t["id"] for t in offset_page] == seen[10:15]
+
+
+def test_templates_pagination_headers_are_exposed_to_browsers(client):
+    resp = client.get("/api/templates", params={"limit": 2}, headers={"Origin": "http://localhost:5173"})
+    exposed = {h.strip().lower() for h in resp.headers["access-control-expose-headers"].split(",")}
+    assert {"x-total-count", "x-next-cursor"} <= exposed
+
+
+def test_templates_invalid_cursor(client):
+    resp = client.get("/api/templates", params={"cursor": "not-a-cursor"})
+    assert resp.status_code == 400
+
+
+def test_templates_without_limit_returns_every_match(client):
+    resp = client.get("/api/templates")
+    assert len(resp.json()) == int(resp.headers["X-Total-Count"])
+    assert "X-Next-Cursor" not in resp.headers
+
+
+def test_cursor_is_rejected_after_catalog_reload(tmp_path):
+    import json
+    import os
+    from app.services.template_service import TemplateService
+
+    catalog = tmp_path / "catalog.json"
+    featured = tmp_path / "featured.json"
+    catalog.write_text(json.dumps([_template(i, f"Template {i}").model_dump() for i in "abc"]))
+    featured.write_text("[]")
+
+    service = TemplateService(catalog_path=catalog, featured_path=featured)
+    cursor = service.page_templates(limit=1).next_cursor
+    assert len(service.page_templates(limit=1, cursor=cursor).items) == 1
+
+    catalog.write_text(json.dumps([_template(i, f"Template {i}").model_dump() for i in "xabc"]))
+    os.utime(catalog, ns=(0, 1))
+    assert service.reload_if_changed() is True
+    # The old position would repeat an entry in the new order
+    with pytest.raises(ValueError, match="catalog changed"):
+        service.page_templates(limit=1, cursor=cursor)
+    assert len(service.page_templates(limit=1).items) == 1
+
+
+def test_catalog_reload_swaps_snapshot(tmp_path):
+    import json
+    import os
+    from app.services.template_service import TemplateService
+
+    catalog = tmp_path / "catalog.json"
+    featured = tmp_path / "featured.json"
+    catalog.write_text(json.dumps([_template("a", "First").model_dump()]))
+    featured.write_text("[]")
+
+    service = TemplateService(catalog_path=catalog, featured_path=featured)
+    old = service.snapshot
+    assert service.reload_if_changed() is False
+
+    catalog.write_text(json.dumps([
+        _template("a", "First").model_dump(),
+        _template("b", "Second chatbot").model_dump(),
+    ]))
+    os.utime(catalog, ns=(0, 1))
+    assert service.reload_if_changed() is True
+    assert service.catalog_version != old.version
+    assert [t.id for t in service.filter_templates(search="chatbot")] == ["b"]
+    # A reader holding the old snapshot still sees a consistent catalog
+    assert [old.template(i).id for i in range(len(old))] == ["a"]
+
+    catalog.write_text("{not json")
+    os.utime(catalog, ns=(0, 2))
+    assert service.reload_if_changed() is False
+    assert len(service.get_all_templates()) == 2
+
+
+@pytest.mark.parametrize("path", [
+    "/api/templates",
+    "/api/templates/featured",
+    "/api/filters",
+    "/api/patterns",
+    "/api/learning-resources",
+])
+def test_catalog_endpoints_etag_revalidation(client, path):
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+
+    second = client.get(path, headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["ETag"] == etag
+
+    assert client.get(path).json() == first.json()
+
+
+def test_templates_gzip_response(client):
+    resp = client.get("/api/templates", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    assert isinstance(resp.json(), list)
+    plain = client.get("/api/templates", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.headers["ETag"] != resp.headers["ETag"]
+    assert plain.json() == resp.json()
+
+
+def test_catalog_store_round_trip():
+    import json
+    from pathlib import Path
+    from app.services.catalog_store import CatalogStore
+
+    raw = json.loads((Path(__file__).parent.parent / "app" / "catalog.json").read_text(encoding="utf-8"))
+    store = CatalogStore()
+    originals = []
+    for obj in raw:
+        t = Template(**obj)
+        originals.append(t)
+        store.append(t)
+    assert len(store) == len(originals)
+    for i, t in enumerate(originals):
+        assert store.materialize(i).model_dump() == t.model_dump()
+        assert store.row(i).languages == t.languages
+
+
+def test_lifespan_stops_catalog_watcher():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.api.dependencies import get_template_service
+
+    get_template_service.cache_clear()  # a fresh service starts its watcher on first use
+    with TestClient(app) as c:
+        c.get("/api/templates", params={"limit": 1})
+        service = get_template_service()
+        assert service._watcher is not None
+    assert service._watcher is None
+    # A later start (e.g. a second app lifespan in the same process) watches again
+    service.start_watching(60)
+    try:
+        assert service._watcher.is_alive()
+    finally:
+        service.stop_watching()